@@ -0,0 +1,143 @@
+import argparse
+import time
+from datetime import date, datetime, timedelta
+from typing import Any, Callable, Dict, List
+
+from ..package_cloud_statistics_collector import (
+    PC_DOWNLOAD_DETAIL_DATE_FORMAT,
+    PackageCloudRepo,
+    is_ignored_package,
+    save_package_download_details,
+)
+
+DEFAULT_ROW_COUNT = 100000
+DEFAULT_REPEAT_COUNT = 3
+
+BENCHMARK_PACKAGE_INFO = {
+    "name": "citus-12.1",
+    "filename": "citus-12.1-1.el8.x86_64.rpm",
+    "distro_version": "el/8",
+    "version": "12.1",
+    "release": "1",
+    "type": "rpm",
+    "epoch": "0",
+    "downloads_detail_url": "api/v1/repos/citusdata/community/package/rpm/el/8/citus/stats/detail.json",
+}
+
+
+class CountingInsertBuffer:
+    """Stands in for BulkInsertBuffer to measure the ingestion loop without database round trips"""
+
+    def __init__(self):
+        self.row_count = 0
+        self.last_row = None
+
+    def add(self, row: Dict[str, Any]):
+        self.row_count = self.row_count + 1
+        self.last_row = row
+
+
+def generate_download_details(row_count: int) -> List[Dict[str, Any]]:
+    first_download_time = datetime.combine(
+        date.today(), datetime.min.time()
+    ) - timedelta(days=365)
+    return [
+        {
+            "downloaded_at": (
+                first_download_time + timedelta(minutes=i % 500000)
+            ).strftime(PC_DOWNLOAD_DETAIL_DATE_FORMAT),
+            "ip_address": f"10.0.{i % 256}.{i % 100}",
+            "user_agent": "Debian APT-HTTP/1.3 (2.2.4)",
+            "source": "cli",
+            "read_token": None,
+        }
+        for i in range(row_count)
+    ]
+
+
+def legacy_save_package_download_details(
+    package_info, download_details, details_buffer, repo_name, stat_keys
+):
+    """Ingestion loop before the per-package precomputation, kept as the baseline of the benchmark"""
+    for download_detail in download_details:
+        downloaded_at = datetime.strptime(
+            download_detail["downloaded_at"], PC_DOWNLOAD_DETAIL_DATE_FORMAT
+        )
+        download_date = downloaded_at.date()
+        if (
+            download_date != date.today()
+            and not is_ignored_package(package_info["name"])
+            and (
+                download_date,
+                package_info["filename"],
+                package_info["distro_version"],
+            )
+            not in stat_keys
+        ):
+            details_buffer.add(
+                {
+                    "fetch_date": datetime.now(),
+                    "repo": repo_name,
+                    "package_full_name": package_info["filename"],
+                    "package_name": package_info["name"],
+                    "distro_version": package_info["distro_version"],
+                    "package_version": package_info["version"],
+                    "package_release": package_info["release"],
+                    "package_type": package_info["type"],
+                    "epoch": package_info["epoch"],
+                    "download_date": download_date,
+                    "downloaded_at": downloaded_at,
+                    "ip_address": download_detail["ip_address"],
+                    "user_agent": download_detail["user_agent"],
+                    "source": download_detail["source"],
+                    "read_token": download_detail["read_token"],
+                }
+            )
+
+
+def rows_per_second(
+    ingestion_function: Callable,
+    download_details: List[Dict[str, Any]],
+    repeat_count: int,
+) -> float:
+    """Returns the best throughput of the given ingestion function among repeat_count runs"""
+    best_elapsed_time = None
+    for _ in range(repeat_count):
+        details_buffer = CountingInsertBuffer()
+        start = time.perf_counter()
+        ingestion_function(
+            BENCHMARK_PACKAGE_INFO,
+            download_details,
+            details_buffer,
+            PackageCloudRepo.community,
+            set(),
+        )
+        elapsed_time = time.perf_counter() - start
+        if details_buffer.row_count != len(download_details):
+            raise ValueError(
+                f"Expected {len(download_details)} rows to be added but {details_buffer.row_count} rows were added"
+            )
+        if best_elapsed_time is None or elapsed_time < best_elapsed_time:
+            best_elapsed_time = elapsed_time
+    return len(download_details) / best_elapsed_time
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--row_count", type=int, default=DEFAULT_ROW_COUNT)
+    parser.add_argument("--repeat_count", type=int, default=DEFAULT_REPEAT_COUNT)
+
+    arguments = parser.parse_args()
+
+    benchmark_details = generate_download_details(arguments.row_count)
+    legacy_rows_per_second = rows_per_second(
+        legacy_save_package_download_details,
+        benchmark_details,
+        arguments.repeat_count,
+    )
+    current_rows_per_second = rows_per_second(
+        save_package_download_details, benchmark_details, arguments.repeat_count
+    )
+    print(f"Before: {legacy_rows_per_second:,.0f} rows/sec")
+    print(f"After:  {current_rows_per_second:,.0f} rows/sec")
+    print(f"Speedup: {current_rows_per_second / legacy_rows_per_second:.1f}x")
@@ -0,0 +1,178 @@
+import argparse
+import time
+from typing import Tuple
+
+from sqlalchemy import text
+
+from ..common_tool_methods import (
+    DEFAULT_HTTP_POOL_SIZE,
+    HttpSessionParams,
+    configure_http_session,
+)
+from ..dbconfig import (
+    DbParams,
+    RequestLogResponseMode,
+    db_engine,
+    db_session,
+)
+from ..migrate_stats_db import migrate_stats_db
+from ..package_cloud_statistics_collector import (
+    DEFAULT_DETAIL_PAGE_RECORD_COUNT,
+    DEFAULT_PAGE_RECORD_COUNT,
+    DetailQueryParams,
+    PackageCloudCollectionCheckpoint,
+    PackageCloudDetailWatermark,
+    PackageCloudDownloadDetails,
+    PackageCloudDownloadStats,
+    PackageCloudOrganization,
+    PackageCloudParams,
+    PackageCloudRepo,
+    PackageCloudWorkItem,
+    ParallelExecutionParams,
+    fetch_and_save_package_cloud_stats,
+)
+from .package_cloud_simulator import PackageCloudSimulator, SimulatorParams
+
+BENCHMARK_TABLES = (
+    PackageCloudDownloadStats.__tablename__,
+    PackageCloudDownloadDetails.__tablename__,
+    PackageCloudDetailWatermark.__tablename__,
+    PackageCloudCollectionCheckpoint.__tablename__,
+    PackageCloudWorkItem.__tablename__,
+)
+
+
+def reset_package_cloud_tables(db_params: DbParams):
+    """Drops and recreates the package cloud tables of the test database, so that every benchmark run starts from
+    scratch"""
+    with db_engine(db_params=db_params, is_test=True).connect() as conn:
+        for table_name in BENCHMARK_TABLES:
+            conn.execute(text(f"DROP TABLE IF EXISTS {table_name}"))
+        conn.commit()
+    migrate_stats_db(db_params, is_test=True)
+
+
+def saved_row_counts(db_params: DbParams) -> Tuple[int, int]:
+    session = db_session(db_params=db_params, is_test=True)
+    detail_count = session.query(PackageCloudDownloadDetails).count()
+    stat_count = session.query(PackageCloudDownloadStats).count()
+    session.close()
+    return detail_count, stat_count
+
+
+# pylint: disable=too-many-arguments,too-many-locals
+def run_benchmark(
+    db_params: DbParams,
+    simulator_params: SimulatorParams,
+    parallel_execution_params: ParallelExecutionParams,
+    detail_query_params: DetailQueryParams,
+    request_log_response_mode: RequestLogResponseMode,
+    reset_tables: bool = True,
+):
+    """Runs fetch_and_save_package_cloud_stats against a local packagecloud simulator and the test database of the
+    given database and prints wall time, request rate and saved row rate of the run"""
+    if reset_tables:
+        reset_package_cloud_tables(db_params)
+    initial_detail_count, initial_stat_count = saved_row_counts(db_params)
+    with PackageCloudSimulator(simulator_params) as simulator:
+        package_cloud_params = PackageCloudParams(
+            admin_api_token="admin-token",
+            standard_api_token="standard-token",
+            organization=PackageCloudOrganization.citusdata,
+            repo_name=PackageCloudRepo.community,
+            base_url=simulator.base_url,
+        )
+        start = time.perf_counter()
+        fetch_and_save_package_cloud_stats(
+            db_params,
+            package_cloud_params=package_cloud_params,
+            parallel_execution_params=parallel_execution_params,
+            is_test=True,
+            request_log_response_mode=request_log_response_mode,
+            resume_from_checkpoint=False,
+            detail_query_params=detail_query_params,
+        )
+        wall_time = time.perf_counter() - start
+        request_counts = dict(simulator.request_counts)
+    detail_count, stat_count = saved_row_counts(db_params)
+    detail_count = detail_count - initial_detail_count
+    stat_count = stat_count - initial_stat_count
+
+    request_count = sum(request_counts.values())
+    print(f"Wall time: {wall_time:.2f} s")
+    print(
+        f"Requests: {request_count} ({request_count / wall_time:,.1f} requests/s) "
+        + ", ".join(
+            f"{endpoint}: {count}" for endpoint, count in sorted(request_counts.items())
+        )
+    )
+    print(
+        f"Saved rows: {detail_count} details, {stat_count} stats "
+        f"({(detail_count + stat_count) / wall_time:,.0f} rows/s)"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Runs the packagecloud statistics collector against a local packagecloud simulator. Records "
+        "are saved into the test database i.e. '<db_name>-test' whose package cloud tables are dropped before "
+        "the run"
+    )
+    parser.add_argument("--db_user_name", required=True)
+    parser.add_argument("--db_password", required=True)
+    parser.add_argument("--db_host_and_port", required=True)
+    parser.add_argument("--db_name", required=True)
+    parser.add_argument("--package_count", type=int, default=100)
+    parser.add_argument("--detail_count_per_package", type=int, default=1000)
+    parser.add_argument("--series_day_count", type=int, default=30)
+    parser.add_argument("--latency_ms", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument(
+        "--page_record_count", type=int, default=DEFAULT_PAGE_RECORD_COUNT
+    )
+    parser.add_argument(
+        "--detail_page_record_count", type=int, default=DEFAULT_DETAIL_PAGE_RECORD_COUNT
+    )
+    parser.add_argument("--stream_detail_pages", action="store_true")
+    parser.add_argument(
+        "--request_log_response_mode",
+        choices=[m.name for m in RequestLogResponseMode],
+        default=RequestLogResponseMode.full.name,
+    )
+    parser.add_argument(
+        "--keep_tables",
+        action="store_true",
+        help="Run on top of the records saved by the previous run to measure an incremental collection",
+    )
+
+    arguments = parser.parse_args()
+
+    configure_http_session(
+        HttpSessionParams(pool_size=max(arguments.concurrency, DEFAULT_HTTP_POOL_SIZE))
+    )
+    run_benchmark(
+        DbParams(
+            user_name=arguments.db_user_name,
+            password=arguments.db_password,
+            host_and_port=arguments.db_host_and_port,
+            db_name=arguments.db_name,
+        ),
+        SimulatorParams(
+            package_count=arguments.package_count,
+            detail_count_per_package=arguments.detail_count_per_package,
+            series_day_count=arguments.series_day_count,
+            latency_seconds=arguments.latency_ms / 1000,
+        ),
+        ParallelExecutionParams(
+            parallel_count=1,
+            parallel_exec_index=0,
+            page_record_count=arguments.page_record_count,
+            concurrency=arguments.concurrency,
+        ),
+        DetailQueryParams(
+            page_record_count=arguments.detail_page_record_count,
+            stream_pages=arguments.stream_detail_pages,
+        ),
+        RequestLogResponseMode[arguments.request_log_response_mode],
+        reset_tables=not arguments.keep_tables,
+    )
@@ -0,0 +1,261 @@
+import argparse
+import json
+import threading
+import time
+import urllib.parse
+from collections import Counter
+from datetime import date, datetime, timedelta
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+
+from attr import dataclass
+
+from ..package_cloud_statistics_collector import (
+    PC_DOWNLOAD_DATE_FORMAT,
+    PC_DOWNLOAD_DETAIL_DATE_FORMAT,
+    PC_PACKAGE_COUNT_SUFFIX,
+    PackageCloudOrganization,
+    PackageCloudRepo,
+)
+
+SIMULATOR_HOST = "127.0.0.1"
+SECONDS_IN_DAY = 24 * 60 * 60
+
+
+@dataclass
+class SimulatorParams:
+    package_count: int = 100
+    # details of a package are spread evenly over the days of its download series
+    detail_count_per_package: int = 1000
+    series_day_count: int = 30
+    # delay added to every response to simulate the round trip time of packagecloud
+    latency_seconds: float = 0
+    port: int = 0
+
+
+class PackageCloudSimulator:
+    """Local stand-in for the packagecloud api endpoints used by package_cloud_statistics_collector. Repos list,
+    package list pages, download series and download detail pages are generated from SimulatorParams. Every
+    package has the same download history, which ends yesterday, so serialized series and detail pages are
+    cached to keep the cost of the simulator low in the benchmarks. Served request counts are kept per endpoint
+    """
+
+    def __init__(self, params: SimulatorParams):
+        self.params = params
+        self.request_counts = Counter()
+        self.request_count_lock = threading.Lock()
+        first_download_time = datetime.combine(
+            date.today() - timedelta(days=params.series_day_count), datetime.min.time()
+        )
+        download_interval = (
+            params.series_day_count * SECONDS_IN_DAY / params.detail_count_per_package
+            if params.detail_count_per_package
+            else 0
+        )
+        self.download_times = [
+            first_download_time + timedelta(seconds=int(i * download_interval))
+            for i in range(params.detail_count_per_package)
+        ]
+        self.download_series_content = json_content(
+            {
+                "value": dict(
+                    Counter(
+                        download_time.strftime(PC_DOWNLOAD_DATE_FORMAT)
+                        for download_time in self.download_times
+                    )
+                )
+            }
+        )
+        self.detail_page_contents: Dict[Tuple[int, int, Optional[str]], bytes] = {}
+        self.server = ThreadingHTTPServer(
+            (SIMULATOR_HOST, params.port), simulator_request_handler(self)
+        )
+        self.server.daemon_threads = True
+        self.server_thread = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{SIMULATOR_HOST}:{self.server.server_port}"
+
+    def start(self):
+        self.server_thread = threading.Thread(
+            target=self.server.serve_forever, daemon=True
+        )
+        self.server_thread.start()
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def count_request(self, endpoint: str):
+        with self.request_count_lock:
+            self.request_counts[endpoint] = self.request_counts[endpoint] + 1
+
+    def repos(self) -> List[Dict[str, Any]]:
+        return [
+            {
+                "fqname": f"{organization.name}/{repo.value}",
+                "package_count_human": f"{self.params.package_count}{PC_PACKAGE_COUNT_SUFFIX}",
+            }
+            for organization in PackageCloudOrganization
+            for repo in PackageCloudRepo
+        ]
+
+    def package_list_page(
+        self, organization: str, repo: str, per_page: int, page: int
+    ) -> List[Dict[str, Any]]:
+        first_package_index = (page - 1) * per_page
+        return [
+            self.package_info(organization, repo, package_index)
+            for package_index in range(
+                first_package_index,
+                min(first_package_index + per_page, self.params.package_count),
+            )
+        ]
+
+    @staticmethod
+    def package_info(organization: str, repo: str, package_index: int):
+        package_name = f"simulated-package-{package_index}"
+        package_path = f"/api/v1/repos/{organization}/{repo}/package/deb/debian/bookworm/{package_name}/amd64/1.0.0"
+        return {
+            "name": package_name,
+            "filename": f"{package_name}_1.0.0_amd64.deb",
+            "distro_version": "debian/bookworm",
+            "version": "1.0.0",
+            "release": "1",
+            "type": "deb",
+            "epoch": "0",
+            "downloads_series_url": f"{package_path}/stats/downloads/series/daily.json",
+            "downloads_detail_url": f"{package_path}/stats/downloads/detail.json",
+        }
+
+    def download_detail_page_content(
+        self, per_page: int, page: int, start_date: Optional[str] = None
+    ) -> bytes:
+        page_key = (per_page, page, start_date)
+        if page_key not in self.detail_page_contents:
+            self.detail_page_contents[page_key] = json_content(
+                self.download_detail_page(per_page, page, start_date)
+            )
+        return self.detail_page_contents[page_key]
+
+    def download_detail_page(
+        self, per_page: int, page: int, start_date: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        download_times = self.download_times
+        if start_date:
+            start_time = datetime.strptime(start_date, PC_DOWNLOAD_DATE_FORMAT)
+            download_times = [
+                download_time
+                for download_time in download_times
+                if download_time >= start_time
+            ]
+        return [
+            {
+                "downloaded_at": download_time.strftime(PC_DOWNLOAD_DETAIL_DATE_FORMAT),
+                "ip_address": f"10.0.{detail_index // 256 % 256}.{detail_index % 256}",
+                "user_agent": "Debian APT-HTTP/1.3 (2.6.1)",
+                "source": "cli",
+                "read_token": None,
+            }
+            for detail_index, download_time in enumerate(
+                download_times[(page - 1) * per_page : page * per_page],
+                start=(page - 1) * per_page,
+            )
+        ]
+
+
+def json_content(body) -> bytes:
+    return json.dumps(body).encode("ascii")
+
+
+def simulator_request_handler(simulator: PackageCloudSimulator):
+    class SimulatorRequestHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        # Method name is defined by BaseHTTPRequestHandler
+        def do_GET(self):  # pylint: disable=invalid-name
+            if simulator.params.latency_seconds:
+                time.sleep(simulator.params.latency_seconds)
+            request_address = urllib.parse.urlsplit(self.path)
+            path = "/" + "/".join(
+                path_part for path_part in request_address.path.split("/") if path_part
+            )
+            query = dict(urllib.parse.parse_qsl(request_address.query))
+            path_parts = path.split("/")
+            if path == "/api/v1/repos.json":
+                simulator.count_request("repos")
+                self.send_json(simulator.repos())
+            elif path.endswith("/packages.json"):
+                simulator.count_request("package_list")
+                self.send_json(
+                    simulator.package_list_page(
+                        path_parts[4],
+                        path_parts[5],
+                        int(query.get("per_page", 30)),
+                        int(query.get("page", 1)),
+                    )
+                )
+            elif path.endswith("/stats/downloads/series/daily.json"):
+                simulator.count_request("series")
+                self.send_content(simulator.download_series_content)
+            elif path.endswith("/stats/downloads/detail.json"):
+                simulator.count_request("detail")
+                self.send_content(
+                    simulator.download_detail_page_content(
+                        int(query.get("per_page", 30)),
+                        int(query.get("page", 1)),
+                        query.get("start_date"),
+                    )
+                )
+            else:
+                simulator.count_request("not_found")
+                self.send_json({"error": "not found"}, HTTPStatus.NOT_FOUND)
+
+        def send_json(self, body, status: HTTPStatus = HTTPStatus.OK):
+            self.send_content(json_content(body), status)
+
+        def send_content(self, content: bytes, status: HTTPStatus = HTTPStatus.OK):
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(content)))
+            self.end_headers()
+            self.wfile.write(content)
+
+        def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+            pass
+
+    return SimulatorRequestHandler
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--package_count", type=int, default=100)
+    parser.add_argument("--detail_count_per_package", type=int, default=1000)
+    parser.add_argument("--series_day_count", type=int, default=30)
+    parser.add_argument("--latency_ms", type=int, default=0)
+    parser.add_argument("--port", type=int, default=8080)
+
+    arguments = parser.parse_args()
+
+    with PackageCloudSimulator(
+        SimulatorParams(
+            package_count=arguments.package_count,
+            detail_count_per_package=arguments.detail_count_per_package,
+            series_day_count=arguments.series_day_count,
+            latency_seconds=arguments.latency_ms / 1000,
+            port=arguments.port,
+        )
+    ) as package_cloud_simulator:
+        print(
+            f"Serving simulated packagecloud api on {package_cloud_simulator.base_url}"
+        )
+        package_cloud_simulator.server_thread.join()
@@ -0,0 +1,238 @@
+import argparse
+import contextlib
+import io
+import re
+import tempfile
+import time
+from typing import Callable, List, Tuple
+
+import yaml
+
+from ..common_tool_methods import (
+    DEFAULT_ENCODING_FOR_FILE_HANDLING,
+    DEFAULT_UNICODE_ERROR_HANDLER,
+    PackageType,
+)
+from ..packaging_warning_handler import (
+    OutputValidator,
+    PackagingWarningIgnoreType,
+    parse_ignore_lists,
+)
+
+DEFAULT_LOG_SIZE_MB = 8
+DEFAULT_EXTRA_IGNORE_PATTERN_COUNT = 200
+DEFAULT_REPEAT_COUNT = 3
+DEFAULT_IGNORE_FILE = (
+    "packaging_automation/tests/files/packaging_warning/packaging_ignore.yml"
+)
+
+BUILD_LOG_LINES = [
+    "gcc -Wall -Wmissing-prototypes -O2 -fPIC -I. -I/usr/include/postgresql/15/server -c -o commands/table.o commands/table.c",
+    "make[1]: Entering directory '/buildfiles/citus/src/backend/distributed'",
+    "warning: line 12: multiple %files for package citus_15",
+    "sh: warning: setlocale: LC_ALL: cannot change locale (C.utf8): No such file or directory",
+    "dpkg-buildpackage: warning: using a gain-root-command while being root",
+    "commands/table.c:1234:5: warning: unused variable 'colocationId' [-Wunused-variable]",
+    "/usr/bin/install -c -m 755 citus.so '/buildfiles/debian/postgresql-15-citus/usr/lib/postgresql/15/lib/citus.so'",
+]
+LINTIAN_LINES = [
+    "Now running lintian postgresql-15-citus_12.1.0.citus-1_amd64.changes ...",
+    "postgresql-15-citus: W: no-documentation",
+    "postgresql-15-citus: W: invalid-license Commercial",
+    "postgresql-15-citus: E: unstripped-binary-or-object usr/lib/postgresql/15/lib/citus.so",
+    "Finished running lintian.",
+]
+
+
+def generate_build_log(size_mb: int) -> List[str]:
+    """Returns the lines of a synthetic deb build log having the given size, in which the build lines are repeated
+    and the lintian output is at the end as in the real build logs"""
+    build_log_lines = []
+    log_size = 0
+    while log_size < size_mb * 1024 * 1024:
+        for build_log_line in BUILD_LOG_LINES:
+            build_log_lines.append(build_log_line)
+            log_size = log_size + len(build_log_line) + 1
+    return build_log_lines + LINTIAN_LINES
+
+
+def legacy_filter_warning_lines(
+    output_lines: List[str], package_type: PackageType
+) -> Tuple[List[str], List[str]]:
+    """filter_warning_lines before the incremental filter with the compiled patterns, kept as the baseline of the
+    benchmark"""
+    rpm_warning_summary = (
+        r"\d+ packages and \d+ specfiles checked; \d+ errors, \d+ warnings."
+    )
+    rpm_lintian_starter = 'Executing "/usr/bin/rpmlint -f /rpmlintrc'
+    debian_lintian_starter = "Now running lintian"
+    lintian_warning_error_pattern = r".*: [W|E]: .*"
+
+    base_warning_lines = []
+    package_specific_warning_lines = []
+    is_deb_warning_line = False
+    is_rpm_warning_line = False
+    for output_line in output_lines:
+        if package_type == PackageType.deb:
+            if debian_lintian_starter in output_line:
+                is_deb_warning_line = True
+            elif "warning" in output_line.lower() or is_deb_warning_line:
+                if is_deb_warning_line:
+                    match = re.match(lintian_warning_error_pattern, output_line)
+                    if match:
+                        package_specific_warning_lines.append(output_line)
+                    else:
+                        is_deb_warning_line = False
+                else:
+                    base_warning_lines.append(output_line)
+        else:
+            if rpm_lintian_starter in output_line:
+                is_rpm_warning_line = True
+            elif "warning" in output_line.lower() or is_rpm_warning_line:
+                if is_rpm_warning_line and re.match(rpm_warning_summary, output_line):
+                    is_rpm_warning_line = False
+                    continue
+                if re.match(lintian_warning_error_pattern, output_line):
+                    package_specific_warning_lines.append(output_line)
+                else:
+                    base_warning_lines.append(output_line)
+
+    return base_warning_lines, package_specific_warning_lines
+
+
+def legacy_get_warnings_to_be_raised(
+    ignore_list: List[str], warning_lines: List[str]
+) -> List[str]:
+    """get_warnings_to_be_raised before the combined ignore regex, kept as the baseline of the benchmark"""
+    warnings_to_be_raised = []
+    for warning_line in warning_lines:
+        has_ignore_match = False
+        for ignore_line in ignore_list:
+            if re.match(ignore_line, warning_line):
+                has_ignore_match = True
+                break
+        if not has_ignore_match:
+            warnings_to_be_raised.append(warning_line)
+    return warnings_to_be_raised
+
+
+def write_ignore_file(
+    ignore_file_path: str, source_ignore_file: str, extra_ignore_pattern_count: int
+):
+    """Writes the ignore lists of the source file with extra patterns, which do not match the log lines, in front of
+    them to simulate growing ignore files"""
+    base_ignore_list, debian_ignore_list = parse_ignore_lists(
+        source_ignore_file, PackageType.deb
+    )
+    extra_ignore_list = [
+        f"^/buildfiles/extension_{i}/.*: warning: ignoring old recipe for target '.*'"
+        for i in range(extra_ignore_pattern_count)
+    ]
+    with open(
+        ignore_file_path,
+        "w",
+        encoding=DEFAULT_ENCODING_FOR_FILE_HANDLING,
+        errors=DEFAULT_UNICODE_ERROR_HANDLER,
+    ) as writer:
+        yaml.dump(
+            {
+                PackagingWarningIgnoreType.base.name: extra_ignore_list
+                + base_ignore_list,
+                PackagingWarningIgnoreType.debian.name: extra_ignore_list
+                + debian_ignore_list,
+            },
+            writer,
+        )
+
+
+def legacy_warnings_to_be_raised(
+    build_log_lines: List[str], ignore_file_path: str
+) -> List[str]:
+    base_ignore_list, debian_ignore_list = parse_ignore_lists(
+        ignore_file_path, PackageType.deb
+    )
+    base_warning_lines, debian_warning_lines = legacy_filter_warning_lines(
+        build_log_lines, PackageType.deb
+    )
+    return legacy_get_warnings_to_be_raised(
+        base_ignore_list, base_warning_lines
+    ) + legacy_get_warnings_to_be_raised(debian_ignore_list, debian_warning_lines)
+
+
+def current_warnings_to_be_raised(
+    build_log_lines: List[str], ignore_file_path: str
+) -> List[str]:
+    # ignore lists are printed by the validator
+    with contextlib.redirect_stdout(io.StringIO()):
+        output_validator = OutputValidator(ignore_file_path, PackageType.deb)
+    for build_log_line in build_log_lines:
+        output_validator.add_line(build_log_line)
+    return (
+        output_validator.base_warnings_to_be_raised
+        + output_validator.package_type_specific_warnings_to_be_raised
+    )
+
+
+def megabytes_per_second(
+    validation_function: Callable,
+    build_log_lines: List[str],
+    ignore_file_path: str,
+    repeat_count: int,
+) -> Tuple[float, List[str]]:
+    """Returns the best throughput of the given validation function among repeat_count runs and the warnings it
+    found"""
+    log_size_mb = sum(len(line) + 1 for line in build_log_lines) / (1024 * 1024)
+    best_elapsed_time = None
+    warnings_to_be_raised = []
+    for _ in range(repeat_count):
+        start = time.perf_counter()
+        warnings_to_be_raised = validation_function(build_log_lines, ignore_file_path)
+        elapsed_time = time.perf_counter() - start
+        if best_elapsed_time is None or elapsed_time < best_elapsed_time:
+            best_elapsed_time = elapsed_time
+    return log_size_mb / best_elapsed_time, warnings_to_be_raised
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--log_size_mb", type=int, default=DEFAULT_LOG_SIZE_MB)
+    parser.add_argument(
+        "--extra_ignore_pattern_count",
+        type=int,
+        default=DEFAULT_EXTRA_IGNORE_PATTERN_COUNT,
+    )
+    parser.add_argument("--ignore_file", default=DEFAULT_IGNORE_FILE)
+    parser.add_argument("--repeat_count", type=int, default=DEFAULT_REPEAT_COUNT)
+
+    arguments = parser.parse_args()
+
+    benchmark_log_lines = generate_build_log(arguments.log_size_mb)
+    with tempfile.TemporaryDirectory() as temp_dir:
+        benchmark_ignore_file = f"{temp_dir}/packaging_ignore.yml"
+        write_ignore_file(
+            benchmark_ignore_file,
+            arguments.ignore_file,
+            arguments.extra_ignore_pattern_count,
+        )
+        legacy_megabytes_per_second, legacy_warnings = megabytes_per_second(
+            legacy_warnings_to_be_raised,
+            benchmark_log_lines,
+            benchmark_ignore_file,
+            arguments.repeat_count,
+        )
+        current_megabytes_per_second, current_warnings = megabytes_per_second(
+            current_warnings_to_be_raised,
+            benchmark_log_lines,
+            benchmark_ignore_file,
+            arguments.repeat_count,
+        )
+    if legacy_warnings != current_warnings:
+        raise ValueError(
+            f"Warnings to be raised differ. Before: {len(legacy_warnings)} After: {len(current_warnings)}"
+        )
+    print(
+        f"Log: {len(benchmark_log_lines):,} lines, {len(current_warnings):,} warnings to be raised"
+    )
+    print(f"Before: {legacy_megabytes_per_second:,.1f} MB/sec")
+    print(f"After:  {current_megabytes_per_second:,.1f} MB/sec")
+    print(f"Speedup: {current_megabytes_per_second / legacy_megabytes_per_second:.1f}x")
@@ -1,10 +1,18 @@
 import argparse
+import collections
 import glob
 import os
+import shlex
 import subprocess
+import sys
+import threading
+import time
+import uuid
 from enum import Enum
 from typing import Dict
 from typing import List
+from typing import Optional
+from typing import TextIO
 from typing import Tuple
 
 import docker
@@ -26,13 +34,23 @@ from .common_tool_methods import (
     supported_platforms,
     transform_key_into_base64_str,
 )
-from .packaging_warning_handler import validate_output
+from .package_build_cache import (
+    artifact_snapshot,
+    build_cache_key,
+    docker_image_digest,
+    nightly_source_revision,
+    restore_build_artifacts,
+    save_build_artifacts,
+)
+from .packaging_warning_handler import OutputValidator, validate_output
 
 GPG_KEY_NAME = "packaging@citusdata.com"
 
 POSTGRES_VERSION_FILE = "supported-postgres"
 POSTGRES_MATRIX_FILE_NAME = "postgres-matrix.yml"
 POSTGRES_EXCLUDE_FILE_NAME = "pg_exclude.yml"
+# Last lines of the standard error of a failed build, which are added to the raised error
+BUILD_ERROR_LINE_COUNT = 20
 
 docker_image_names = {
     "almalinux": "almalinux",
@@ -188,7 +206,11 @@ def get_signing_credentials(
 
 
 def write_postgres_versions_into_file(
-    input_files_dir: str, package_version: str, os_name: str = "", platform: str = ""
+    input_files_dir: str,
+    package_version: str,
+    os_name: str = "",
+    platform: str = "",
+    versions_file_path: str = "",
 ):
     # In ADO pipelines function without os_name and platform is used. If these parameters are unset
     if not os_name:
@@ -209,8 +231,10 @@ def write_postgres_versions_into_file(
     print(
         f"Release versions: {release_version_str}, Nightly versions: {nightly_version_str}"
     )
+    # Versions are written into a separate file instead of the input files directory when builds of multiple
+    # platforms share the same directory
     with open(
-        f"{input_files_dir}/{POSTGRES_VERSION_FILE}",
+        versions_file_path or f"{input_files_dir}/{POSTGRES_VERSION_FILE}",
         "w",
         encoding=DEFAULT_ENCODING_FOR_FILE_HANDLING,
         errors=DEFAULT_UNICODE_ERROR_HANDLER,
@@ -219,41 +243,85 @@ def write_postgres_versions_into_file(
         f.write(f"nightly_versions={nightly_version_str}\n")
 
 
+signer_docker_images = {
+    PackageType.rpm: "citusdata/packaging:rpmsigner",
+    PackageType.deb: "citusdata/packaging:debsigner",
+}
+
+
+@dataclass
+class SigningResult:
+    package_type: PackageType
+    duration_seconds: float
+    file_durations: Dict[str, float]
+
+
 def sign_packages(
     sub_folder: str,
     signing_credentials: SigningCredentials,
     input_output_parameters: InputOutputParameters,
 ):
-    output_path = f"{input_output_parameters.output_dir}/{sub_folder}"
-    deb_files = glob.glob(f"{output_path}/*.deb", recursive=True)
-    rpm_files = glob.glob(f"{output_path}/*.rpm", recursive=True)
-    os.environ["PACKAGING_PASSPHRASE"] = signing_credentials.passphrase
-    os.environ["PACKAGING_SECRET_KEY"] = signing_credentials.secret_key
-
-    if len(rpm_files) > 0:
-        print("Started RPM Signing...")
-        result = run_with_output(
-            f"docker run --rm -v {output_path}:/packages/{sub_folder} -e PACKAGING_SECRET_KEY -e "
-            f"PACKAGING_PASSPHRASE citusdata/packaging:rpmsigner",
-            text=True,
+    sign_packages_in_batch([sub_folder], signing_credentials, input_output_parameters)
+
+
+def signed_file_durations(file_paths: List[str], start_time: float) -> Dict[str, float]:
+    """Signers sign the files one after another, so signing duration of a file is approximated with the time between
+    the modification of the file and the file signed before it. Duration of the first file includes the startup of
+    the signer container"""
+    file_durations = {}
+    previous_modification_time = start_time
+    for file_path in sorted(file_paths, key=os.path.getmtime):
+        modification_time = os.path.getmtime(file_path)
+        file_durations[file_path] = max(
+            0.0, modification_time - previous_modification_time
         )
-        output = result.stdout
-        print(f"Result:{output}")
+        previous_modification_time = max(previous_modification_time, modification_time)
+    return file_durations
 
-        if result.returncode != 0:
-            raise ValueError(f"Error while signing rpm files.Err:{result.stderr}")
-        if input_output_parameters.output_validation:
-            validate_output(
-                output,
-                f"{input_output_parameters.input_files_dir}/packaging_ignore.yml",
-                PackageType.rpm,
-            )
 
-        print("RPM signing finished successfully.")
+def format_signing_report(signing_results: List[SigningResult]) -> str:
+    report_lines = []
+    for signing_result in signing_results:
+        file_count = len(signing_result.file_durations)
+        report_lines.append(
+            f"{file_count} {signing_result.package_type.name} files are signed in "
+            f"{signing_result.duration_seconds:.1f} s ({signing_result.duration_seconds / file_count:.1f} s per file)"
+        )
+        report_lines.extend(
+            f"  {file_path}: {file_duration:.1f} s"
+            for file_path, file_duration in signing_result.file_durations.items()
+        )
+    return "\n".join(report_lines)
 
-    if len(deb_files) > 0:
-        print("Started DEB Signing...")
 
+def sign_packages_in_batch(
+    sub_folders: List[str],
+    signing_credentials: SigningCredentials,
+    input_output_parameters: InputOutputParameters,
+) -> List[SigningResult]:
+    """Signs the packages in all the given output sub folders with a single signer container for each package type,
+    so that the startup of the signer is not repeated for each platform"""
+    os.environ["PACKAGING_PASSPHRASE"] = signing_credentials.passphrase
+    os.environ["PACKAGING_SECRET_KEY"] = signing_credentials.secret_key
+
+    signing_results = []
+    for package_type, signer_docker_image in signer_docker_images.items():
+        volume_arguments = []
+        package_files = []
+        for sub_folder in sub_folders:
+            output_path = f"{input_output_parameters.output_dir}/{sub_folder}"
+            sub_folder_package_files = glob.glob(f"{output_path}/*.{package_type.name}")
+            if sub_folder_package_files:
+                volume_arguments.extend(["-v", f"{output_path}:/packages/{sub_folder}"])
+                package_files.extend(sub_folder_package_files)
+        if not package_files:
+            continue
+
+        print(f"Started {package_type.name.upper()} Signing...")
+        start_time = time.time()
+        # Standard error of the deb signer is validated together with its output, while only the standard output
+        # of the rpm signer is validated
+        merges_errors_into_output = package_type == PackageType.deb
         # output is required to understand the error if any so check parameter is not used
         # pylint: disable=subprocess-run-check
         result = subprocess.run(
@@ -261,33 +329,44 @@ def sign_packages(
                 "docker",
                 "run",
                 "--rm",
-                "-v",
-                f"{output_path}:/packages/{sub_folder}",
+                *volume_arguments,
                 "-e",
                 "PACKAGING_SECRET_KEY",
                 "-e",
                 "PACKAGING_PASSPHRASE",
-                "citusdata/packaging:debsigner",
+                signer_docker_image,
             ],
             text=True,
             stdout=subprocess.PIPE,
-            stderr=subprocess.STDOUT,
+            stderr=subprocess.STDOUT if merges_errors_into_output else subprocess.PIPE,
             input=signing_credentials.passphrase,
         )
         output = result.stdout
         print(f"Result:{output}")
 
         if result.returncode != 0:
-            raise ValueError(f"Error while signing deb files.Err:{result.stdout}")
-
+            error_output = result.stdout if merges_errors_into_output else result.stderr
+            raise ValueError(
+                f"Error while signing {package_type.name} files.Err:{error_output}"
+            )
         if input_output_parameters.output_validation:
             validate_output(
-                result.stdout,
+                output,
                 f"{input_output_parameters.input_files_dir}/packaging_ignore.yml",
-                PackageType.deb,
+                package_type,
+            )
+
+        signing_results.append(
+            SigningResult(
+                package_type=package_type,
+                duration_seconds=time.time() - start_time,
+                file_durations=signed_file_durations(package_files, start_time),
             )
+        )
+        print(f"{package_type.name.upper()} signing finished successfully.")
 
-        print("DEB signing finished successfully.")
+    print(format_signing_report(signing_results))
+    return signing_results
 
 
 def get_postgres_versions(
@@ -337,7 +416,17 @@ def build_package(
     postgres_version: str,
     input_output_parameters: InputOutputParameters,
     is_test: bool = False,
+    log_path: str = "",
+    postgres_versions_file: str = "",
+    build_cache_dir: str = "",
+    source_revision: str = "",
 ):
+    """Builds the packages of the platform in the packaging docker image. Build output is written into log_path
+    if given and printed otherwise. postgres_versions_file is mounted in place of the postgres versions file of
+    the input files directory if given.
+    Packages are restored from build_cache_dir instead of being built if a build with the same input files, build
+    type, postgres version and docker image is cached. Nightly builds are cached only if the commit of the nightly
+    ref is given with source_revision"""
     docker_image_name = "packaging" if not is_test else "packaging-test"
     postgres_extension = "all" if postgres_version == "all" else f"pg{postgres_version}"
     os.environ["GITHUB_TOKEN"] = github_token
@@ -345,28 +434,149 @@ def build_package(
     if not os.path.exists(input_output_parameters.output_dir):
         os.makedirs(input_output_parameters.output_dir)
 
+    docker_image = f"citus/{docker_image_name}:{docker_platform}-{postgres_extension}"
+    cache_key = ""
+    if build_cache_dir and (build_type == BuildType.release or source_revision):
+        image_digest = docker_image_digest(docker_image)
+        if image_digest:
+            cache_key = build_cache_key(
+                input_output_parameters.input_files_dir,
+                build_type.name,
+                postgres_version,
+                image_digest,
+                source_revision,
+                postgres_versions_file,
+            )
+    if cache_key and restore_build_artifacts(
+        build_cache_dir, cache_key, input_output_parameters.output_dir
+    ):
+        cache_hit_message = (
+            f"Packages of {docker_image} are restored from the build cache {cache_key}"
+        )
+        print(cache_hit_message)
+        if log_path:
+            with open(
+                log_path,
+                "w",
+                encoding=DEFAULT_ENCODING_FOR_FILE_HANDLING,
+                errors=DEFAULT_UNICODE_ERROR_HANDLER,
+            ) as log_file:
+                log_file.write(f"{cache_hit_message}\n")
+        return
+    artifacts_before_build = artifact_snapshot(input_output_parameters.output_dir)
+
+    versions_file_mount = (
+        f"-v {postgres_versions_file}:/buildfiles/{POSTGRES_VERSION_FILE}:ro "
+        if postgres_versions_file
+        else ""
+    )
+    container_name = f"citus-package-build-{uuid.uuid4().hex}"
     docker_command = (
-        f"docker run --rm -v {input_output_parameters.output_dir}:/packages -v "
-        f"{input_output_parameters.input_files_dir}:/buildfiles:ro "
+        f"docker run --rm --name {container_name} -v {input_output_parameters.output_dir}:/packages -v "
+        f"{input_output_parameters.input_files_dir}:/buildfiles:ro {versions_file_mount}"
         f"-e GITHUB_TOKEN -e PACKAGE_ENCRYPTION_KEY -e UNENCRYPTED_PACKAGE -e CONTAINER_BUILD_RUN_ENABLED "
         f"-e MSRUSTUP_PAT -e CRATES_IO_MIRROR_FEED_TOKEN -e INSTALL_RUST -e CI "
-        f"citus/{docker_image_name}:{docker_platform}-{postgres_extension} {build_type.name}"
+        f"{docker_image} {build_type.name}"
     )
 
+    output_validator = (
+        OutputValidator(
+            f"{input_output_parameters.input_files_dir}/packaging_ignore.yml",
+            get_package_type_by_docker_image_name(docker_platform),
+        )
+        if input_output_parameters.output_validation
+        else None
+    )
     print(f"Executing docker command: {docker_command}")
-    output = run_with_output(docker_command, text=True)
+    if log_path:
+        # log file is line buffered so that the build progress can be followed from the file
+        with open(
+            log_path,
+            "w",
+            buffering=1,
+            encoding=DEFAULT_ENCODING_FOR_FILE_HANDLING,
+            errors=DEFAULT_UNICODE_ERROR_HANDLER,
+        ) as log_file:
+            log_file.write(f"Executing docker command: {docker_command}\n")
+            return_code, build_errors = run_build_container(
+                docker_command, container_name, log_file, output_validator
+            )
+    else:
+        return_code, build_errors = run_build_container(
+            docker_command, container_name, sys.stdout, output_validator
+        )
 
-    if output.stdout:
-        print("Output:" + output.stdout)
-    if output.returncode != 0:
-        raise ValueError(output.stderr)
+    # Build is stopped at the first warning to be raised, so the warnings are reported before the exit code
+    if output_validator:
+        if output_validator.has_warnings_to_be_raised() or return_code == 0:
+            output_validator.check()
+    if return_code != 0:
+        log_message = f" Build output is in {log_path}" if log_path else ""
+        raise ValueError(
+            f"Package build failed with exit code {return_code}.{log_message}\n{build_errors}"
+        )
 
-    if input_output_parameters.output_validation:
-        validate_output(
-            output.stdout,
-            f"{input_output_parameters.input_files_dir}/packaging_ignore.yml",
-            get_package_type_by_docker_image_name(docker_platform),
+    # Packages are cached after their validation, so that restored packages do not skip the validation
+    if cache_key:
+        cached_artifact_count = save_build_artifacts(
+            build_cache_dir,
+            cache_key,
+            input_output_parameters.output_dir,
+            artifacts_before_build,
         )
+        print(f"{cached_artifact_count} packages are saved into the build cache")
+
+
+def run_build_container(
+    docker_command: str,
+    container_name: str,
+    output_file: TextIO,
+    output_validator: Optional[OutputValidator],
+) -> Tuple[int, str]:
+    """Runs the build container and writes its output into output_file line by line, while the lines of the
+    standard output are checked with output_validator. Container is killed at the first warning to be raised.
+    Returns the exit code of the docker command and the last lines of its standard error
+    """
+    output_lock = threading.Lock()
+    error_lines = collections.deque(maxlen=BUILD_ERROR_LINE_COUNT)
+
+    def write_error_lines(stderr: TextIO):
+        for error_line in stderr:
+            with output_lock:
+                output_file.write(error_line)
+            error_lines.append(error_line)
+
+    with subprocess.Popen(
+        shlex.split(docker_command),
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=True,
+        encoding=DEFAULT_ENCODING_FOR_FILE_HANDLING,
+        errors=DEFAULT_UNICODE_ERROR_HANDLER,
+    ) as process:
+        # standard error is read in a separate thread, so that docker is not blocked on a full pipe of it
+        error_reader = threading.Thread(
+            target=write_error_lines, args=(process.stderr,), daemon=True
+        )
+        error_reader.start()
+        is_container_killed = False
+        # rest of the output is still read after the container is killed, so that docker is not blocked on a full pipe
+        for output_line in process.stdout:
+            with output_lock:
+                output_file.write(output_line)
+            if (
+                output_validator
+                and not is_container_killed
+                and output_validator.add_line(output_line.rstrip("\n"))
+            ):
+                print(
+                    f"Stopping the build since a warning is found in the build output: {output_line.rstrip()}"
+                )
+                # Signals are not handled by the build process, which is the init process of the container
+                run_with_output(f"docker kill {container_name}")
+                is_container_killed = True
+        error_reader.join()
+        return process.wait(), "".join(error_lines)
 
 
 def get_release_package_folder_name(os_name: str, os_version: str) -> str:
@@ -399,6 +609,8 @@ def build_packages(
     signing_credentials: SigningCredentials,
     input_output_parameters: InputOutputParameters,
     is_test: bool = False,
+    build_cache_dir: str = "",
+    source_repo: str = "",
 ) -> None:
     os_name, os_version = decode_os_and_release(platform)
     release_versions, nightly_versions = get_postgres_versions(
@@ -431,6 +643,13 @@ def build_packages(
     else:
         postgres_docker_extension_iterator = postgress_versions_to_process
 
+    source_revision = (
+        nightly_source_revision(
+            github_token, source_repo, input_output_parameters.input_files_dir
+        )
+        if build_cache_dir and source_repo and build_type == BuildType.nightly
+        else ""
+    )
     docker_image_name = get_docker_image_name(platform)
     output_sub_folder = get_release_package_folder_name(os_name, os_version)
     input_output_parameters.output_dir = (
@@ -447,6 +666,8 @@ def build_packages(
             postgres_docker_extension,
             input_output_parameters,
             is_test,
+            build_cache_dir=build_cache_dir,
+            source_revision=source_revision,
         )
         print(
             f"Package build for {os_name}-{os_version} for postgres {postgres_docker_extension} finished "
@@ -532,6 +753,18 @@ if __name__ == "__main__":
     parser.add_argument("--input_files_dir", required=True)
     parser.add_argument("--output_validation", action="store_true")
     parser.add_argument("--is_test", action="store_true")
+    parser.add_argument(
+        "--build_cache_dir",
+        required=False,
+        default="",
+        help="Directory in which the built packages are cached. Builds are not cached if not set",
+    )
+    parser.add_argument(
+        "--source_repo",
+        required=False,
+        default="",
+        help="Repository of the packaged project e.g. citusdata/citus. Nightly builds are cached only if it is set",
+    )
 
     args = parser.parse_args()
 
@@ -550,4 +783,6 @@ if __name__ == "__main__":
         sign_credentials,
         io_parameters,
         args.is_test,
+        args.build_cache_dir,
+        args.source_repo,
     )
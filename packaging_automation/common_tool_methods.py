@@ -1,24 +1,34 @@
 import base64
+import email.utils
 import os
+import queue
+import random
 import re
 import shlex
 import subprocess
+import threading
+import time
+import urllib.parse
 from datetime import datetime
 from enum import Enum
-from typing import Dict, List, Tuple
+from http import HTTPStatus
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
 
 import git
 import gnupg
 import pathlib2
 import requests
 import yaml
+from attr import dataclass
 from git import GitCommandError, Repo
 from github import Commit, Github, PullRequest, Repository
 from jinja2 import Environment, FileSystemLoader
 from parameters_validation import validate_parameters
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 from .common_validations import is_tag, is_version
-from .dbconfig import RequestLog, RequestType
+from .dbconfig import RequestLog, RequestLogWriter, RequestType
 
 BASE_GIT_PATH = pathlib2.Path(__file__).parents[1]
 PATCH_VERSION_MATCH_FROM_MINOR_SUFFIX = r"\.\d{1,3}"
@@ -31,6 +41,25 @@ PATCH_VERSION_MATCH_FROM_MINOR_SUFFIX = r"\.\d{1,3}"
 DEFAULT_ENCODING_FOR_FILE_HANDLING = "utf8"
 DEFAULT_UNICODE_ERROR_HANDLER = "surrogateescape"
 
+DEFAULT_HTTP_POOL_SIZE = 10
+DEFAULT_HTTP_RETRY_COUNT = 3
+DEFAULT_HTTP_BACKOFF_FACTOR = 0.5
+DEFAULT_HTTP_TIMEOUT = 60
+HTTP_RETRY_STATUS_CODES = (500, 502, 503, 504)
+DEFAULT_THROTTLE_RETRY_COUNT = 6
+DEFAULT_THROTTLE_BACKOFF_FACTOR = 1
+MAX_THROTTLE_BACKOFF_SECONDS = 120
+BACKGROUND_ITERATOR_POLL_SECONDS = 1
+# Variable path segments of the request addresses, which are replaced with placeholders in the endpoints of the
+# request logs, so that the requests for different packages are reported as a single endpoint. Package cloud
+# package paths contain the type, distro, version and name of the package before the stats path.
+ENDPOINT_PATH_PLACEHOLDERS = [
+    (
+        re.compile(r"^(/api/v1/repos/[^/]+/[^/]+/package)/.+?(/stats/)"),
+        r"\1/{package}\2",
+    ),
+]
+
 # When using GitPython library Repo objects should be closed to be able to delete cloned sources
 # referenced by Repo objects.References are stored in below array to be able to close
 # all resources after the code execution.
@@ -54,6 +83,193 @@ def platform_names() -> List[str]:
     return platforms
 
 
+@dataclass
+class HttpSessionParams:
+    pool_size: int = DEFAULT_HTTP_POOL_SIZE
+    retry_count: int = DEFAULT_HTTP_RETRY_COUNT
+    backoff_factor: float = DEFAULT_HTTP_BACKOFF_FACTOR
+
+
+# All http calls share a single keep-alive session so that connections are reused instead of paying tcp and tls
+# handshake for each request. Session is stored in a list to be able to replace it with configure_http_session
+shared_http_sessions: List[requests.Session] = []
+http_session_lock = threading.Lock()
+
+
+def create_http_session(http_session_params: HttpSessionParams) -> requests.Session:
+    retry = Retry(
+        total=http_session_params.retry_count,
+        backoff_factor=http_session_params.backoff_factor,
+        status_forcelist=HTTP_RETRY_STATUS_CODES,
+        # Responses with error status codes are returned to the callers after all the retries are done, since
+        # callers check the status codes of the responses
+        raise_on_status=False,
+        # Throttled requests are retried by rate_limited_get to be able to adjust the request rate
+        respect_retry_after_header=False,
+    )
+    adapter = HTTPAdapter(
+        pool_connections=http_session_params.pool_size,
+        pool_maxsize=http_session_params.pool_size,
+        max_retries=retry,
+    )
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def configure_http_session(http_session_params: HttpSessionParams):
+    with http_session_lock:
+        for session in shared_http_sessions:
+            session.close()
+        shared_http_sessions.clear()
+        shared_http_sessions.append(create_http_session(http_session_params))
+
+
+def http_session() -> requests.Session:
+    with http_session_lock:
+        if not shared_http_sessions:
+            shared_http_sessions.append(create_http_session(HttpSessionParams()))
+        return shared_http_sessions[0]
+
+
+class RateLimiter:
+    """Token bucket rate limiter shared by the threads sending requests to the same host. Rate is halved when the
+    host throttles the requests and it is increased step by step on successful responses up to max_rate, so that
+    request rate converges to the limit of the host"""
+
+    def __init__(
+        self, max_rate: float, min_rate: float = 1, rate_increase_step: float = 0.1
+    ):
+        if min_rate <= 0 or max_rate < min_rate:
+            raise ValueError("Rates should satisfy 0 < min_rate <= max_rate")
+        self.max_rate = max_rate
+        self.min_rate = min_rate
+        self.rate_increase_step = rate_increase_step
+        self.rate = max_rate
+        self.tokens = 1.0
+        self.last_refill_time = time.monotonic()
+        self.paused_until = 0.0
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Blocks until a request could be sent without exceeding the current rate"""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(
+                    max(self.rate, 1),
+                    self.tokens + (now - self.last_refill_time) * self.rate,
+                )
+                self.last_refill_time = now
+                if now >= self.paused_until and self.tokens >= 1:
+                    self.tokens = self.tokens - 1
+                    return
+                wait_time = max(self.paused_until - now, (1 - self.tokens) / self.rate)
+            time.sleep(wait_time)
+
+    def on_success(self):
+        with self.lock:
+            self.rate = min(self.max_rate, self.rate + self.rate_increase_step)
+
+    def on_throttled(self, retry_after: float):
+        """Decreases the rate and pauses all the requests for retry_after seconds"""
+        with self.lock:
+            self.rate = max(self.min_rate, self.rate / 2)
+            self.tokens = 0
+            self.paused_until = max(self.paused_until, time.monotonic() + retry_after)
+
+
+# Rate limiters are keyed by host names. Requests to the hosts without a rate limiter are not limited
+rate_limiters: Dict[str, RateLimiter] = {}
+
+
+def configure_rate_limiter(host: str, rate_limiter: RateLimiter):
+    rate_limiters[host] = rate_limiter
+
+
+def throttle_backoff_seconds(response, attempt: int) -> float:
+    """Returns the wait time before retrying a throttled request. Retry-After header is used if the host sends it,
+    otherwise exponential backoff with jitter is used"""
+    retry_after = response.headers.get("Retry-After")
+    if retry_after:
+        try:
+            return min(float(retry_after), MAX_THROTTLE_BACKOFF_SECONDS)
+        except ValueError:
+            try:
+                retry_time = email.utils.parsedate_to_datetime(retry_after)
+                return min(
+                    max(
+                        (retry_time - datetime.now(retry_time.tzinfo)).total_seconds(),
+                        0,
+                    ),
+                    MAX_THROTTLE_BACKOFF_SECONDS,
+                )
+            except (TypeError, ValueError):
+                pass
+    backoff = DEFAULT_THROTTLE_BACKOFF_FACTOR * (2**attempt)
+    return min(backoff + random.uniform(0, backoff / 2), MAX_THROTTLE_BACKOFF_SECONDS)
+
+
+class BackgroundIterator:
+    """Iterates the iterables submitted with submit() concurrently in the threads of the executor and hands over
+    their items through a single bounded queue, so that at most max_buffered_items items are held in memory when
+    the consumer falls behind. Items are yielded as (iterable_index, item) tuples in the order they are produced,
+    where iterable_index is the index returned by submit(). Iteration ends when all the submitted iterables are
+    exhausted, so all the iterables should be submitted before starting the iteration. Exceptions raised while
+    iterating are re-raised in the consumer. cancel() should be called if the consumer stops before reaching the
+    end, otherwise the producer threads block on the full queue"""
+
+    end_of_items = object()
+
+    def __init__(self, executor, max_buffered_items: int = 1000):
+        self.executor = executor
+        self.items = queue.Queue(maxsize=max_buffered_items)
+        self.cancelled = threading.Event()
+        self.iterable_count = 0
+
+    def submit(self, iterable_function: Callable[[], Iterable[Any]]) -> int:
+        iterable_index = self.iterable_count
+        self.iterable_count = self.iterable_count + 1
+        self.executor.submit(self._produce, iterable_index, iterable_function)
+        return iterable_index
+
+    def _produce(
+        self, iterable_index: int, iterable_function: Callable[[], Iterable[Any]]
+    ):
+        try:
+            for item in iterable_function():
+                if not self._put((iterable_index, item, None)):
+                    return
+            self._put((iterable_index, self.end_of_items, None))
+        # Exception is passed to the consumer thread
+        except Exception as e:  # pylint: disable=broad-except
+            self._put((iterable_index, self.end_of_items, e))
+
+    def _put(self, entry) -> bool:
+        while not self.cancelled.is_set():
+            try:
+                self.items.put(entry, timeout=BACKGROUND_ITERATOR_POLL_SECONDS)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def __iter__(self) -> Iterator[Tuple[int, Any]]:
+        remaining_iterable_count = self.iterable_count
+        while remaining_iterable_count > 0:
+            iterable_index, item, error = self.items.get()
+            if error:
+                raise error
+            if item is self.end_of_items:
+                remaining_iterable_count = remaining_iterable_count - 1
+                continue
+            yield iterable_index, item
+
+    def cancel(self):
+        self.cancelled.set()
+
+
 def get_new_repo(working_dir: str) -> Repo:
     repo = Repo(working_dir)
     referenced_repos.append(repo)
@@ -696,27 +912,130 @@ def create_pr_with_repo(
     return repo.create_pull(title=pr_title, base=base_branch, head=pr_branch, body="")
 
 
-def stat_get_request(request_address: str, request_type: RequestType, session):
-    request_log = RequestLog(request_time=datetime.now(), request_type=request_type)
-    session.add(request_log)
-    session.commit()
+def stat_get_request(
+    request_address: str,
+    request_type: RequestType,
+    session,
+    request_log_writer: Optional[RequestLogWriter] = None,
+    stream: bool = False,
+):
+    """Executes a get request and logs it into request_log table with its duration, response size and retry count.
+    If request_log_writer is given, log is written asynchronously by the writer and session is not used. Otherwise,
+    log is saved and committed with the session before and after the request. If stream is set, response body is
+    not read, so that the caller could parse it incrementally from response.raw. In that case, response body is
+    not logged and response size is logged only if the host sends Content-Length header
+    """
+    request_log = RequestLog(
+        request_time=datetime.now(),
+        request_type=request_type,
+        endpoint=normalize_endpoint(request_address),
+    )
+    if not request_log_writer:
+        session.add(request_log)
+        session.commit()
+    start = time.monotonic()
+    result = None
+    throttle_retry_count = 0
+    unexpected_error = None
     try:
-        result = requests.get(request_address, timeout=60)
+        result, throttle_retry_count = rate_limited_get(request_address, stream)
         request_log.status_code = result.status_code
-        request_log.response = result.content.decode("ascii")
+        if not stream:
+            request_log.response = result.content.decode("ascii")
     except requests.exceptions.RequestException as e:
         result = e.response
         request_log.status_code = -1
         request_log.response = (
             e.response.content.decode("ascii")
-            if e.response.content.decode("ascii")
+            if e.response is not None and e.response.content.decode("ascii")
             else str(e)
         )
+    except Exception as e:
+        unexpected_error = e
+        request_log.status_code = -1
+        request_log.response = repr(e)
+        raise
     finally:
-        session.commit()
+        request_log.duration_ms = int((time.monotonic() - start) * 1000)
+        request_log.response_size = response_size(result, stream)
+        request_log.retry_count = response_retry_count(result) + throttle_retry_count
+        try:
+            if request_log_writer:
+                request_log_writer.add(request_log)
+            else:
+                session.commit()
+        # Error of the request is raised instead of the error of its log
+        except Exception as log_error:  # pylint: disable=broad-except
+            if unexpected_error is None:
+                raise
+            print(f"Request log of {request_address} could not be saved: {log_error!r}")
     return result
 
 
+def rate_limited_get(
+    request_address: str, stream: bool = False
+) -> Tuple[requests.Response, int]:
+    """Executes a get request obeying the rate limiter of the host if exists. Throttled requests (i.e. status code
+    429) are retried after the wait time sent by the host or after exponential backoff. Returns the response and
+    the number of throttled attempts"""
+    rate_limiter = rate_limiters.get(urllib.parse.urlsplit(request_address).hostname)
+    attempt = 0
+    while True:
+        if rate_limiter:
+            rate_limiter.acquire()
+        result = http_session().get(
+            request_address, timeout=DEFAULT_HTTP_TIMEOUT, stream=stream
+        )
+        if (
+            result.status_code != HTTPStatus.TOO_MANY_REQUESTS
+            or attempt >= DEFAULT_THROTTLE_RETRY_COUNT
+        ):
+            break
+        backoff_seconds = throttle_backoff_seconds(result, attempt)
+        # Releases the connection of the throttled response back to the pool
+        result.close()
+        print(
+            f"Request to {normalize_endpoint(request_address)} is throttled. Retrying in {backoff_seconds:.1f} "
+            f"seconds"
+        )
+        if rate_limiter:
+            rate_limiter.on_throttled(backoff_seconds)
+        else:
+            time.sleep(backoff_seconds)
+        attempt = attempt + 1
+    if rate_limiter and result.ok:
+        rate_limiter.on_success()
+    return result, attempt
+
+
+def normalize_endpoint(request_address: str) -> str:
+    """Returns host and path of the given address without credentials and query parameters. Variable path segments
+    in ENDPOINT_PATH_PLACEHOLDERS are replaced with placeholders"""
+    parsed_address = urllib.parse.urlsplit(request_address)
+    host = parsed_address.hostname or ""
+    port = f":{parsed_address.port}" if parsed_address.port else ""
+    path = parsed_address.path
+    for path_pattern, placeholder in ENDPOINT_PATH_PLACEHOLDERS:
+        path = path_pattern.sub(placeholder, path)
+    return f"{host}{port}{path}"
+
+
+def response_size(response, stream: bool) -> Optional[int]:
+    if response is None:
+        return 0
+    if not stream:
+        return len(response.content)
+    content_length = response.headers.get("Content-Length")
+    return int(content_length) if content_length and content_length.isdigit() else None
+
+
+def response_retry_count(response) -> int:
+    if response is None or response.raw is None:
+        return 0
+    retries = getattr(response.raw, "retries", None)
+    return len(retries.history) if retries else 0
+
+
 def get_supported_postgres_release_versions(
     postgres_matrix_conf_file_path: str, package_version: is_version(str)
 ) -> List[str]:
@@ -1,12 +1,30 @@
 import enum
+import hashlib
+import queue
+import threading
+from typing import Any, Dict, List, Optional, Tuple
 
 import sqlalchemy
 from attr import dataclass
-from sqlalchemy import Column, INTEGER, TIMESTAMP, TEXT
-from sqlalchemy import create_engine
+from sqlalchemy import Column, INTEGER, TIMESTAMP, TEXT, String
+from sqlalchemy import create_engine, insert, text
+from sqlalchemy.engine import Engine
 from sqlalchemy.orm import declarative_base
+from sqlalchemy.schema import CreateIndex
 from sqlalchemy.orm import sessionmaker
 
+DEFAULT_INSERT_BATCH_SIZE = 1000
+DEFAULT_DB_POOL_SIZE = 5
+DEFAULT_DB_MAX_OVERFLOW = 10
+DEFAULT_DB_POOL_RECYCLE_SECONDS = 1800
+# Arbitrary key of the postgres advisory lock taken while migrating the database objects
+DB_MIGRATION_LOCK_ID = 20230001
+# Arbitrary key of the postgres advisory lock taken while building the indexes concurrently. Migration lock is not
+# used, since a concurrent index build waits for the transactions of the migrations waiting for the migration lock
+DB_INDEX_BUILD_LOCK_ID = 20230002
+DEFAULT_REQUEST_LOG_FLUSH_INTERVAL = 5
+REQUEST_LOG_TRUNCATED_RESPONSE_LENGTH = 1000
+
 
 @dataclass
 class DbParams:
@@ -21,16 +39,147 @@ def db_connection_string(db_params: DbParams, is_test=False):
     return f"postgresql+psycopg2://{db_params.user_name}:{db_params.password}@{db_params.host_and_port}/{database_name}"
 
 
-def db_session(db_params: DbParams, is_test: bool, create_db_objects: bool = True):
-    db_engine = create_engine(
-        db_connection_string(db_params=db_params, is_test=is_test)
-    )
+@dataclass
+class DbPoolParams:
+    pool_size: int = DEFAULT_DB_POOL_SIZE
+    max_overflow: int = DEFAULT_DB_MAX_OVERFLOW
+    # Connections older than this are replaced, so that connections closed by the server are not reused
+    pool_recycle_seconds: int = DEFAULT_DB_POOL_RECYCLE_SECONDS
+
+
+# Engines are created once per connection string and shared by all the sessions of the process, so that
+# collectors running in the same process share the connection pool. Pool parameters are stored in a list to be
+# able to replace them with configure_db_pool
+db_engines: Dict[str, Engine] = {}
+db_pool_params: List[DbPoolParams] = [DbPoolParams()]
+db_engine_lock = threading.Lock()
+
+
+def configure_db_pool(pool_params: DbPoolParams):
+    """Sets the pool parameters of the engines. Cached engines are disposed and created again when requested"""
+    with db_engine_lock:
+        db_pool_params[0] = pool_params
+        for cached_engine in db_engines.values():
+            cached_engine.dispose()
+        db_engines.clear()
+
+
+def db_engine(db_params: DbParams, is_test: bool = False) -> Engine:
+    connection_string = db_connection_string(db_params=db_params, is_test=is_test)
+    with db_engine_lock:
+        if connection_string not in db_engines:
+            pool_params = db_pool_params[0]
+            db_engines[connection_string] = create_engine(
+                connection_string,
+                pool_size=pool_params.pool_size,
+                max_overflow=pool_params.max_overflow,
+                pool_recycle=pool_params.pool_recycle_seconds,
+                pool_pre_ping=True,
+            )
+        return db_engines[connection_string]
+
+
+def db_session(db_params: DbParams, is_test: bool, create_db_objects: bool = False):
+    """Returns a new session using the shared engine of the database. Database objects are expected to be created
+    by the migration step i.e. migrate_stats_db before the collectors run. create_db_objects could be set to
+    migrate the database objects defined so far before creating the session"""
+    engine = db_engine(db_params=db_params, is_test=is_test)
     if create_db_objects:
-        Base.metadata.create_all(db_engine)
-    Session = sessionmaker(db_engine)
+        migrate_db_objects(engine)
+    Session = sessionmaker(engine)
     return Session()
 
 
+def migrate_db_objects(engine: Engine):
+    """Creates the missing tables of the models imported so far and adds the columns and the indexes introduced
+    after the tables were created, since create_all does not alter existing tables. Concurrent migrations are
+    serialized with an advisory lock since concurrent create_all calls fail while creating the same objects.
+    Indexes introduced after their tables were created are built concurrently after the lock is released, so
+    that the writes into the existing tables are not blocked while the indexes are built
+    """
+    create_index_statements = {}
+    with engine.begin() as conn:
+        conn.execute(
+            text("SELECT pg_advisory_xact_lock(:lock_id)"),
+            {"lock_id": DB_MIGRATION_LOCK_ID},
+        )
+        Base.metadata.create_all(conn)
+        for statement in DB_MIGRATION_STATEMENTS:
+            conn.execute(text(statement))
+        for table in Base.metadata.sorted_tables:
+            for index in table.indexes:
+                # Indexes of partitioned tables cannot be built concurrently
+                if is_partitioned(conn, table.name):
+                    index.create(conn, checkfirst=True)
+                else:
+                    create_index_statements[
+                        index.name
+                    ] = concurrent_create_index_statement(index, engine)
+    build_indexes_concurrently(engine, create_index_statements)
+
+
+def is_partitioned(conn, table_name: str) -> bool:
+    return conn.execute(
+        text(
+            "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(:table_name))"
+        ),
+        {"table_name": table_name},
+    ).scalar()
+
+
+def concurrent_create_index_statement(index: sqlalchemy.Index, engine: Engine) -> str:
+    # Indexes of the models are not marked as concurrent, since create_all creates them in a transaction
+    return str(CreateIndex(index).compile(dialect=engine.dialect)).replace(
+        " INDEX ", " INDEX CONCURRENTLY ", 1
+    )
+
+
+def is_index_valid(conn, index_name: str) -> Optional[bool]:
+    """Returns whether the index is valid or None if the index does not exist. Failed concurrent builds leave
+    invalid indexes behind"""
+    return conn.execute(
+        text(
+            "SELECT indisvalid FROM pg_index WHERE indexrelid = to_regclass(:index_name)"
+        ),
+        {"index_name": index_name},
+    ).scalar()
+
+
+def build_indexes_concurrently(
+    engine: Engine, create_index_statements: Dict[str, str]
+) -> bool:
+    """Builds the missing indexes with the given concurrent create index statements, which are keyed by the index
+    names. Indexes left invalid by failed builds are dropped and built again. Returns false without building the
+    indexes if indexes are being built by another migration"""
+    # Indexes cannot be built concurrently inside a transaction
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        if all(is_index_valid(conn, name) for name in create_index_statements):
+            return True
+        # Waiting for the lock could deadlock with the index build of the other migration, which waits for the
+        # transaction waiting for the lock
+        if not conn.execute(
+            text("SELECT pg_try_advisory_lock(:lock_id)"),
+            {"lock_id": DB_INDEX_BUILD_LOCK_ID},
+        ).scalar():
+            print("Indexes are being built by another migration")
+            return False
+        try:
+            for index_name, create_index_statement in create_index_statements.items():
+                is_valid = is_index_valid(conn, index_name)
+                if is_valid:
+                    continue
+                if is_valid is not None:
+                    conn.execute(text(f"DROP INDEX CONCURRENTLY {index_name}"))
+                print(f"Building index {index_name}")
+                conn.execute(text(create_index_statement))
+        finally:
+            conn.execute(
+                text("SELECT pg_advisory_unlock(:lock_id)"),
+                {"lock_id": DB_INDEX_BUILD_LOCK_ID},
+            )
+    return True
+
+
 Base = declarative_base()
 
 
@@ -50,3 +199,150 @@ class RequestLog(Base):
     request_type = Column(sqlalchemy.Enum(RequestType))
     status_code = Column(INTEGER)
     response = Column(TEXT)
+    duration_ms = Column(INTEGER)
+    response_size = Column(INTEGER)
+    retry_count = Column(INTEGER)
+    endpoint = Column(String)
+
+
+# Idempotent statements to add the columns introduced after the tables were created
+DB_MIGRATION_STATEMENTS = [
+    "ALTER TABLE request_log ADD COLUMN IF NOT EXISTS duration_ms INTEGER",
+    "ALTER TABLE request_log ADD COLUMN IF NOT EXISTS response_size INTEGER",
+    "ALTER TABLE request_log ADD COLUMN IF NOT EXISTS retry_count INTEGER",
+    "ALTER TABLE request_log ADD COLUMN IF NOT EXISTS endpoint VARCHAR",
+]
+
+
+class BulkInsertBuffer:
+    """Accumulates rows of the given model as plain dictionaries and inserts them with multi-row insert statements
+    once batch_size rows are accumulated. Rows are not visible to queries before they are flushed, so flush should
+    be called before commit"""
+
+    def __init__(self, session, model, batch_size: int = DEFAULT_INSERT_BATCH_SIZE):
+        if batch_size < 1:
+            raise ValueError("batch_size should be greater than 0")
+        self.session = session
+        self.model = model
+        self.batch_size = batch_size
+        self.rows: List[Dict[str, Any]] = []
+        self.inserted_row_count = 0
+
+    def add(self, row: Dict[str, Any]):
+        self.rows.append(row)
+        if len(self.rows) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if not self.rows:
+            return
+        self.session.execute(insert(self.model), self.rows)
+        self.inserted_row_count = self.inserted_row_count + len(self.rows)
+        self.rows = []
+
+
+class RequestLogResponseMode(enum.Enum):
+    full = 1
+    truncated = 2
+    hashed = 3
+    none = 4
+
+
+def request_log_response(response: str, response_mode: RequestLogResponseMode) -> str:
+    if response is None or response_mode == RequestLogResponseMode.full:
+        return response
+    if response_mode == RequestLogResponseMode.truncated:
+        return response[:REQUEST_LOG_TRUNCATED_RESPONSE_LENGTH]
+    if response_mode == RequestLogResponseMode.hashed:
+        return hashlib.sha256(response.encode("utf-8")).hexdigest()
+    return None
+
+
+class RequestLogWriter:
+    """Buffers request logs and writes them into database in batches from a background thread so that http calls
+    do not wait for database round trips. Responses are stored according to the given response mode to limit the
+    size of the request log table. Writer should be closed to write the remaining logs
+    """
+
+    def __init__(
+        self,
+        engine,
+        response_mode: RequestLogResponseMode = RequestLogResponseMode.full,
+        batch_size: int = DEFAULT_INSERT_BATCH_SIZE,
+        flush_interval: float = DEFAULT_REQUEST_LOG_FLUSH_INTERVAL,
+    ):
+        self.session_factory = sessionmaker(engine)
+        self.response_mode = response_mode
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.log_queue = queue.Queue()
+        self.closed = threading.Event()
+        self.writer_thread = threading.Thread(target=self._write_logs, daemon=True)
+        self.writer_thread.start()
+
+    def add(self, request_log: RequestLog):
+        if self.closed.is_set():
+            raise ValueError("Request log writer is already closed")
+        self.log_queue.put(
+            {
+                "request_time": request_log.request_time,
+                "request_type": request_log.request_type,
+                "status_code": request_log.status_code,
+                "response": request_log_response(
+                    request_log.response, self.response_mode
+                ),
+                "duration_ms": request_log.duration_ms,
+                "response_size": request_log.response_size,
+                "retry_count": request_log.retry_count,
+                "endpoint": request_log.endpoint,
+            }
+        )
+
+    def flush(self):
+        """Blocks until all the logs added so far are written into database"""
+        self.log_queue.join()
+
+    def close(self):
+        if self.closed.is_set():
+            return
+        self.closed.set()
+        # None is put as a stop marker to wake up the writer thread
+        self.log_queue.put(None)
+        self.writer_thread.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def _write_logs(self):
+        is_stopped = False
+        while not is_stopped:
+            request_logs, is_stopped = self._next_batch()
+            if not request_logs:
+                continue
+            try:
+                with self.session_factory() as session:
+                    session.execute(insert(RequestLog), request_logs)
+                    session.commit()
+            except Exception as e:  # pylint: disable=broad-except
+                # Request logs are auxiliary data. Collection should not fail because of logging errors
+                print(f"Error while writing {len(request_logs)} request logs: {e}")
+            finally:
+                for _ in request_logs:
+                    self.log_queue.task_done()
+
+    def _next_batch(self) -> Tuple[List[Dict[str, Any]], bool]:
+        request_logs = []
+        try:
+            request_log = self.log_queue.get(timeout=self.flush_interval)
+            while request_log is not None:
+                request_logs.append(request_log)
+                if len(request_logs) >= self.batch_size:
+                    return request_logs, False
+                request_log = self.log_queue.get_nowait()
+        except queue.Empty:
+            return request_logs, False
+        self.log_queue.task_done()
+        return request_logs, True
@@ -1,9 +1,10 @@
-import requests
 import json
 from datetime import datetime
 import argparse
 from enum import Enum
 
+from .common_tool_methods import DEFAULT_HTTP_TIMEOUT, http_session
+
 PAGE_RECORD_COUNT = 100
 PACKAGE_DELETION_DAYS_THRESHOLD = 10
 
@@ -24,7 +25,7 @@ def delete_packages(repo: PackageRepository, package_cloud_api_token: str) -> No
             f"{url_prefix}/api/v1/repos/citusdata/{repo.value}"
             f"/packages.json?per_page={PAGE_RECORD_COUNT}&page=0"
         )
-        result = requests.get(list_url, timeout=60)
+        result = http_session().get(list_url, timeout=DEFAULT_HTTP_TIMEOUT)
         package_info_list = json.loads(result.content)
         if len(package_info_list) == 0 or end_of_limits_reached:
             break
@@ -36,7 +37,9 @@ def delete_packages(repo: PackageRepository, package_cloud_api_token: str) -> No
             if diff.days > PACKAGE_DELETION_DAYS_THRESHOLD:
                 delete_url = f"{url_prefix}{package_info['destroy_url']}"
 
-                del_result = requests.delete(delete_url, timeout=60)
+                del_result = http_session().delete(
+                    delete_url, timeout=DEFAULT_HTTP_TIMEOUT
+                )
                 if del_result.status_code == 200:
                     print(f"{package_info['filename']} deleted successfully")
                     successful_count = successful_count + 1
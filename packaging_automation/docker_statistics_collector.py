@@ -1,11 +1,9 @@
 import argparse
-import sys
 from datetime import datetime, timedelta
 
-import requests
 from sqlalchemy import Column, DATE, INTEGER, TIMESTAMP, desc
 
-from .common_tool_methods import str_array_to_str
+from .common_tool_methods import DEFAULT_HTTP_TIMEOUT, http_session, str_array_to_str
 from .dbconfig import Base, DbParams, db_session
 
 
@@ -38,9 +36,9 @@ def fetch_and_store_docker_statistics(
             "parameters. Please don't use these parameters other than testing."
         )
 
-    result = requests.get(
+    result = http_session().get(
         f"https://hub.docker.com/v2/repositories/citusdata/{repository_name}/",
-        timeout=60,
+        timeout=DEFAULT_HTTP_TIMEOUT,
     )
     total_pull_count = (
         int(result.json()["pull_count"])
@@ -48,12 +46,14 @@ def fetch_and_store_docker_statistics(
         else test_total_pull_count
     )
 
-    session = db_session(
-        db_params=db_parameters, is_test=is_test, create_db_objects=True
-    )
+    session = db_session(db_params=db_parameters, is_test=is_test)
 
     fetch_date = datetime.now() + timedelta(days=test_day_shift_index)
-    validate_same_day_record_existence(fetch_date, session)
+    if same_day_record_exists(fetch_date, session):
+        print(
+            f"Docker download record for date {fetch_date.date()} already exists. No need to add record."
+        )
+        return
     day_diff, mod_pull_diff, pull_diff = calculate_diff_params(
         fetch_date, session, total_pull_count
     )
@@ -89,15 +89,11 @@ def calculate_diff_params(fetch_date, session, total_pull_count):
     return day_diff, mod_pull_diff, pull_diff
 
 
-def validate_same_day_record_existence(fetch_date, session):
+def same_day_record_exists(fetch_date, session) -> bool:
     same_day_record = (
         session.query(DockerStats).filter_by(stat_date=fetch_date.date()).first()
     )
-    if same_day_record:
-        print(
-            f"Docker download record for date {fetch_date.date()} already exists. No need to add record."
-        )
-        sys.exit(0)
+    return same_day_record is not None
 
 
 if __name__ == "__main__":
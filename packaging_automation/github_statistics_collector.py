@@ -1,7 +1,8 @@
 import argparse
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from enum import Enum
-from typing import Dict, Any
+from typing import Any, Dict, List, Optional
 
 from github import Github
 from sqlalchemy import (
@@ -10,9 +11,11 @@ from sqlalchemy import (
     INTEGER,
     TIMESTAMP,
     ForeignKey,
+    Index,
     String,
     UniqueConstraint,
 )
+from sqlalchemy.dialects import postgresql
 from sqlalchemy.orm import relationship
 
 from .dbconfig import Base, DbParams, db_session
@@ -70,18 +73,14 @@ class GitHubReleases(Base):
     fetch_time = Column(TIMESTAMP, nullable=False)
     tag_name = Column(String, nullable=False)
     release_time = Column(TIMESTAMP, nullable=False)
-
-
-def clone_record_exists(record_time: datetime.date, session) -> bool:
-    db_record = (
-        session.query(GithubCloneStats).filter_by(clone_date=record_time).first()
+    __table_args__ = (
+        Index(
+            "ux_github_releases_repo_name_tag_name",
+            "repo_name",
+            "tag_name",
+            unique=True,
+        ),
     )
-    return db_record is not None
-
-
-def release_record_exists(tag_name: str, session) -> bool:
-    db_record = session.query(GitHubReleases).filter_by(tag_name=tag_name).first()
-    return db_record is not None
 
 
 def github_clone_stats(
@@ -105,45 +104,49 @@ def fetch_and_store_github_stats(
     github_token: str,
     is_test: bool,
 ):
-    fetch_and_store_github_clones(
-        organization_name, repo_name, db_parameters, github_token, is_test
-    )
-    fetch_and_store_github_releases(
-        organization_name, repo_name, db_parameters, github_token, is_test
-    )
+    """Fetches clone statistics and releases of the repo and saves them in a single transaction. Records existing
+    in the database are updated instead of being checked one by one before inserting"""
+    contents = github_clone_stats(github_token, organization_name, repo_name)
+    releases = list(github_releases(github_token, organization_name, repo_name))
+    session = db_session(db_parameters, is_test)
+    save_github_clone_stats(repo_name, contents, datetime.now(), session)
+    save_github_releases(repo_name, releases, session)
+    session.commit()
+    session.close()
 
 
-def fetch_and_store_github_releases(
+def fetch_and_store_all_github_stats(
     organization_name: str,
-    repo_name: str,
     db_parameters: DbParams,
     github_token: str,
     is_test: bool,
+    repo_names: Optional[List[str]] = None,
 ):
-    releases = github_releases(github_token, organization_name, repo_name)
-    session = db_session(db_parameters, is_test)
-    for release in releases:
-        if not release_record_exists(release.tag_name, session):
-            github_release = GitHubReleases(
-                repo_name=repo_name,
-                fetch_time=datetime.now(),
-                tag_name=release.tag_name,
-                release_time=release.created_at,
+    """Fetches and saves the statistics of the given repos, all repos in GithubRepos by default, concurrently"""
+    repo_names = (
+        [repo.value for repo in GithubRepos] if repo_names is None else repo_names
+    )
+    if not repo_names:
+        return
+    with ThreadPoolExecutor(max_workers=len(repo_names)) as executor:
+        futures = [
+            executor.submit(
+                fetch_and_store_github_stats,
+                organization_name,
+                repo_name,
+                db_parameters,
+                github_token,
+                is_test,
             )
-            session.add(github_release)
-    session.commit()
+            for repo_name in repo_names
+        ]
+        for future in futures:
+            future.result()
 
 
-def fetch_and_store_github_clones(
-    organization_name: str,
-    repo_name: str,
-    db_parameters: DbParams,
-    github_token: str,
-    is_test: bool,
+def save_github_clone_stats(
+    repo_name: str, contents: Dict[str, Any], fetch_time: datetime, session
 ):
-    contents = github_clone_stats(github_token, organization_name, repo_name)
-    session = db_session(db_parameters, is_test)
-    fetch_time = datetime.now()
     main_transaction = GithubCloneStatsTransactionsMain(
         fetch_time=fetch_time,
         count=contents["count"],
@@ -151,34 +154,73 @@ def fetch_and_store_github_clones(
         uniques=contents["uniques"],
     )
     for daily_record in contents["clones"]:
-        detail_transaction = GithubCloneStatsTransactionsDetail(
-            clone_date=daily_record.timestamp,
-            count=daily_record.count,
-            uniques=daily_record.uniques,
+        main_transaction.details.append(
+            GithubCloneStatsTransactionsDetail(
+                clone_date=daily_record.timestamp,
+                count=daily_record.count,
+                uniques=daily_record.uniques,
+            )
         )
-        main_transaction.details.append(detail_transaction)
-        # current date's record is skipped since statistics continue to change until end of the day
-        # stat record will not be added if it exists in 'github_clone_stats' table
-        if daily_record.timestamp.date() == fetch_time.date() or clone_record_exists(
-            daily_record.timestamp.date(), session=session
-        ):
-            continue
-        stats_record = GithubCloneStats(
-            fetch_time=fetch_time,
-            clone_date=daily_record.timestamp,
-            count=daily_record.count,
-            uniques=daily_record.uniques,
-            repo_name=repo_name,
+    session.add(main_transaction)
+
+    # current date's record is skipped since statistics continue to change until end of the day
+    stat_values = [
+        {
+            "repo_name": repo_name,
+            "fetch_time": fetch_time,
+            "clone_date": daily_record.timestamp.date(),
+            "count": daily_record.count,
+            "uniques": daily_record.uniques,
+        }
+        for daily_record in contents["clones"]
+        if daily_record.timestamp.date() != fetch_time.date()
+    ]
+    if not stat_values:
+        return
+    statement = postgresql.insert(GithubCloneStats).values(stat_values)
+    session.execute(
+        statement.on_conflict_do_update(
+            constraint="repo_name_clone_date_uq",
+            set_={
+                "fetch_time": statement.excluded.fetch_time,
+                "count": statement.excluded.count,
+                "uniques": statement.excluded.uniques,
+            },
         )
+    )
 
-        session.add(stats_record)
-    session.add(main_transaction)
-    session.commit()
+
+def save_github_releases(repo_name: str, releases, session):
+    if not releases:
+        return
+    fetch_time = datetime.now()
+    session.execute(
+        postgresql.insert(GitHubReleases)
+        .values(
+            [
+                {
+                    "repo_name": repo_name,
+                    "fetch_time": fetch_time,
+                    "tag_name": release.tag_name,
+                    "release_time": release.created_at,
+                }
+                for release in releases
+            ]
+        )
+        .on_conflict_do_nothing(
+            index_elements=[GitHubReleases.repo_name, GitHubReleases.tag_name]
+        )
+    )
 
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
-    parser.add_argument("--repo_name", choices=[r.value for r in GithubRepos])
+    parser.add_argument(
+        "--repo_name",
+        choices=[r.value for r in GithubRepos],
+        required=False,
+        help="Statistics of all the repos are collected if not set",
+    )
     parser.add_argument("--db_user_name", required=True)
     parser.add_argument("--db_password", required=True)
     parser.add_argument("--db_host_and_port", required=True)
@@ -195,10 +237,10 @@ if __name__ == "__main__":
         db_name=arguments.db_name,
     )
 
-    fetch_and_store_github_stats(
+    fetch_and_store_all_github_stats(
         organization_name=ORGANIZATION_NAME,
-        repo_name=arguments.repo_name,
         github_token=arguments.github_token,
         db_parameters=db_params,
         is_test=arguments.is_test,
+        repo_names=[arguments.repo_name] if arguments.repo_name else None,
     )
@@ -0,0 +1,342 @@
+import argparse
+import re
+from datetime import date
+from typing import Optional
+
+from sqlalchemy import text
+
+from .dbconfig import (
+    DB_MIGRATION_LOCK_ID,
+    DbParams,
+    build_indexes_concurrently,
+    db_engine,
+    is_partitioned,
+    migrate_db_objects,
+)
+
+# Models of the collectors are added into the metadata of the database when their modules are imported.
+# pylint: disable=unused-import
+from . import (
+    docker_statistics_collector,
+    github_statistics_collector,
+    homebrew_statistics_collector,
+    package_cloud_rollups,
+    package_cloud_statistics_collector,
+    pypi_stats_collector,
+)
+from .package_cloud_statistics_collector import PackageCloudDownloadDetails
+
+DOWNLOAD_DETAILS_TABLE = PackageCloudDownloadDetails.__tablename__
+# Rows of the table existing before partitioning are kept in this partition, which covers all the dates up to the
+# first monthly partition
+UNPARTITIONED_DOWNLOAD_DETAILS_TABLE = f"{DOWNLOAD_DETAILS_TABLE}_unpartitioned"
+DEFAULT_DOWNLOAD_DETAILS_PARTITION = f"{DOWNLOAD_DETAILS_TABLE}_default"
+# Check constraint matching the range of the unpartitioned partition, which lets postgres skip scanning the table
+# while attaching it
+DOWNLOAD_DATE_RANGE_CHECK = f"{DOWNLOAD_DETAILS_TABLE}_download_date_range_check"
+# Unique index on (id, download_date), which is built before partitioning and becomes the primary key of the
+# unpartitioned partition
+PARTITION_KEY_INDEX = f"{DOWNLOAD_DETAILS_TABLE}_partition_key"
+DEFAULT_PARTITION_MONTHS_AHEAD = 3
+
+
+def migrate_stats_db(
+    db_params: DbParams,
+    is_test: bool = False,
+    partition_download_details: bool = False,
+    partition_months_ahead: int = DEFAULT_PARTITION_MONTHS_AHEAD,
+):
+    """Creates the missing database objects of all the statistics collectors. It should be run once before the
+    collectors, which do not create their database objects themselves. Monthly partitions of the download details
+    are created partition_months_ahead months in advance if the table is partitioned.
+    Converting the download details into a partitioned table does not scan the table or build an index while
+    holding the exclusive lock on it. Range check of the table is validated and the index of the new primary key
+    is built concurrently before the conversion"""
+    engine = db_engine(db_params=db_params, is_test=is_test)
+    # Duplicate records should be removed before the unique index of the pypi downloads is created
+    with engine.begin() as conn:
+        conn.execute(
+            text("SELECT pg_advisory_xact_lock(:lock_id)"),
+            {"lock_id": DB_MIGRATION_LOCK_ID},
+        )
+        pypi_stats_collector.deduplicate_download_numbers(conn)
+    migrate_db_objects(engine)
+    first_partition_start = None
+    if partition_download_details:
+        # Constraint is validated in its own transaction, since validation does not block the writes into the
+        # table unlike attaching the table, which is done while holding an exclusive lock on it
+        with engine.begin() as conn:
+            conn.execute(
+                text("SELECT pg_advisory_xact_lock(:lock_id)"),
+                {"lock_id": DB_MIGRATION_LOCK_ID},
+            )
+            if not is_partitioned(conn, DOWNLOAD_DETAILS_TABLE):
+                first_partition_start = add_download_date_range_check(conn)
+        if first_partition_start:
+            with engine.begin() as conn:
+                conn.execute(
+                    text("SELECT pg_advisory_xact_lock(:lock_id)"),
+                    {"lock_id": DB_MIGRATION_LOCK_ID},
+                )
+                # Table may be converted by a concurrent migration in the meantime
+                if not is_partitioned(conn, DOWNLOAD_DETAILS_TABLE):
+                    conn.execute(
+                        text(
+                            f"ALTER TABLE {DOWNLOAD_DETAILS_TABLE} VALIDATE CONSTRAINT {DOWNLOAD_DATE_RANGE_CHECK}"
+                        )
+                    )
+            create_partition_key_index(engine)
+    with engine.begin() as conn:
+        conn.execute(
+            text("SELECT pg_advisory_xact_lock(:lock_id)"),
+            {"lock_id": DB_MIGRATION_LOCK_ID},
+        )
+        if first_partition_start and not is_partitioned(conn, DOWNLOAD_DETAILS_TABLE):
+            convert_download_details_to_partitioned(conn, first_partition_start)
+        if is_partitioned(conn, DOWNLOAD_DETAILS_TABLE):
+            create_download_details_partitions(conn, partition_months_ahead)
+
+
+def month_start(day: date, month_shift: int = 0) -> date:
+    month_index = day.year * 12 + day.month - 1 + month_shift
+    return date(month_index // 12, month_index % 12 + 1, 1)
+
+
+def add_download_date_range_check(conn) -> date:
+    """Adds a check constraint, which is not validated yet, limiting the download dates of the table to the range
+    of the partition it will be attached as. Range covers the dates up to the month after the last download date
+    and the current date. Returns the end of the range"""
+    last_download_date = conn.execute(
+        text(f"SELECT max(download_date) FROM {DOWNLOAD_DETAILS_TABLE}")
+    ).scalar()
+    range_end = month_start(
+        max(last_download_date or date.today(), date.today()), month_shift=1
+    )
+    # Constraint of a failed conversion is replaced, since its range may be different
+    conn.execute(
+        text(
+            f"ALTER TABLE {DOWNLOAD_DETAILS_TABLE} DROP CONSTRAINT IF EXISTS {DOWNLOAD_DATE_RANGE_CHECK}"
+        )
+    )
+    conn.execute(
+        text(
+            f"ALTER TABLE {DOWNLOAD_DETAILS_TABLE} ADD CONSTRAINT {DOWNLOAD_DATE_RANGE_CHECK} "
+            f"CHECK (download_date IS NOT NULL AND download_date < '{range_end.isoformat()}') NOT VALID"
+        )
+    )
+    return range_end
+
+
+def create_partition_key_index(engine):
+    """Builds the unique index of the primary key (id, download_date) of the partitioned table on the table to be
+    partitioned. Index is built concurrently, since building it while converting the table would block the writes
+    into the table until it is built"""
+    with engine.connect() as conn:
+        if is_partitioned(conn, DOWNLOAD_DETAILS_TABLE):
+            return
+    if not build_indexes_concurrently(
+        engine,
+        {
+            PARTITION_KEY_INDEX: f"CREATE UNIQUE INDEX CONCURRENTLY {PARTITION_KEY_INDEX} ON "
+            f"{DOWNLOAD_DETAILS_TABLE} (id, download_date)"
+        },
+    ):
+        raise ValueError(
+            f"{PARTITION_KEY_INDEX} could not be built while indexes are built by another migration. "
+            f"{DOWNLOAD_DETAILS_TABLE} should be partitioned after the other migration ends"
+        )
+
+
+def convert_download_details_to_partitioned(conn, first_partition_start: date):
+    """Converts package_cloud_download_details into a table partitioned by download_date ranges. Existing table is
+    attached as a partition covering the dates up to first_partition_start, so that its rows are not copied. Table
+    should have the validated range check constraint, so that its rows are not scanned while attaching it.
+    Partitioned table has the primary key (id, download_date), since primary keys of partitioned tables should
+    contain the partition key. Primary key of the existing table is replaced using the partition key index, which
+    should be built beforehand"""
+    conn.execute(
+        text(
+            f"ALTER TABLE {DOWNLOAD_DETAILS_TABLE} RENAME TO {UNPARTITIONED_DOWNLOAD_DETAILS_TABLE}"
+        )
+    )
+    # Index names are unique in a schema, so indexes of the old table are renamed to create the same indexes on
+    # the partitioned table
+    index_names = conn.execute(
+        text("SELECT indexname FROM pg_indexes WHERE tablename = :table_name"),
+        {"table_name": UNPARTITIONED_DOWNLOAD_DETAILS_TABLE},
+    ).scalars()
+    for index_name in list(index_names):
+        conn.execute(
+            text(f"ALTER INDEX {index_name} RENAME TO {index_name}_unpartitioned")
+        )
+    # A partition can have only the primary key of the partitioned table
+    primary_key_name = conn.execute(
+        text(
+            "SELECT conname FROM pg_constraint WHERE conrelid = to_regclass(:table_name) AND contype = 'p'"
+        ),
+        {"table_name": UNPARTITIONED_DOWNLOAD_DETAILS_TABLE},
+    ).scalar()
+    conn.execute(
+        text(
+            f"ALTER TABLE {UNPARTITIONED_DOWNLOAD_DETAILS_TABLE} DROP CONSTRAINT {primary_key_name}, "
+            f"ADD CONSTRAINT {UNPARTITIONED_DOWNLOAD_DETAILS_TABLE}_pkey PRIMARY KEY USING INDEX "
+            f"{PARTITION_KEY_INDEX}_unpartitioned"
+        )
+    )
+    conn.execute(
+        text(
+            f"CREATE TABLE {DOWNLOAD_DETAILS_TABLE} (LIKE {UNPARTITIONED_DOWNLOAD_DETAILS_TABLE} INCLUDING DEFAULTS "
+            f"INCLUDING CONSTRAINTS) PARTITION BY RANGE (download_date)"
+        )
+    )
+    # Range check is copied together with the other constraints, but it should only be on the old table
+    conn.execute(
+        text(
+            f"ALTER TABLE {DOWNLOAD_DETAILS_TABLE} DROP CONSTRAINT {DOWNLOAD_DATE_RANGE_CHECK}, "
+            f"ADD PRIMARY KEY (id, download_date)"
+        )
+    )
+    # id sequence would be dropped together with the old table otherwise
+    conn.execute(
+        text(
+            f"ALTER SEQUENCE {DOWNLOAD_DETAILS_TABLE}_id_seq OWNED BY {DOWNLOAD_DETAILS_TABLE}.id"
+        )
+    )
+    conn.execute(
+        text(
+            f"ALTER TABLE {DOWNLOAD_DETAILS_TABLE} ATTACH PARTITION {UNPARTITIONED_DOWNLOAD_DETAILS_TABLE} "
+            f"FOR VALUES FROM (MINVALUE) TO ('{first_partition_start.isoformat()}')"
+        )
+    )
+    conn.execute(
+        text(
+            f"ALTER TABLE {UNPARTITIONED_DOWNLOAD_DETAILS_TABLE} DROP CONSTRAINT {DOWNLOAD_DATE_RANGE_CHECK}"
+        )
+    )
+    conn.execute(
+        text(
+            f"CREATE TABLE {DEFAULT_DOWNLOAD_DETAILS_PARTITION} PARTITION OF {DOWNLOAD_DETAILS_TABLE} DEFAULT"
+        )
+    )
+    for index in PackageCloudDownloadDetails.__table__.indexes:
+        index.create(conn)
+
+
+def download_details_partition_name(partition_start: date) -> str:
+    return (
+        f"{DOWNLOAD_DETAILS_TABLE}_y{partition_start.year}m{partition_start.month:02d}"
+    )
+
+
+def unpartitioned_range_end(conn) -> Optional[date]:
+    """Returns the end of the date range covered by the partition holding the rows saved before partitioning"""
+    partition_bound = conn.execute(
+        text(
+            "SELECT pg_get_expr(relpartbound, oid) FROM pg_class WHERE oid = to_regclass(:table_name)"
+        ),
+        {"table_name": UNPARTITIONED_DOWNLOAD_DETAILS_TABLE},
+    ).scalar()
+    range_end = re.search(r"TO \('(\d{4}-\d{2}-\d{2})'\)", partition_bound or "")
+    return date.fromisoformat(range_end.group(1)) if range_end else None
+
+
+def create_download_details_partitions(conn, months_ahead: int):
+    """Creates the missing monthly partitions from the current month up to months_ahead months later"""
+    first_partition_start = max(
+        month_start(date.today()), unpartitioned_range_end(conn) or date.min
+    )
+    for month_shift in range(months_ahead + 1):
+        create_download_details_partition(
+            conn, month_start(first_partition_start, month_shift)
+        )
+
+
+def create_download_details_partition(conn, partition_start: date):
+    """Creates the monthly partition starting at partition_start if it does not exist. A partition cannot be
+    created while the default partition has rows in its range, so these rows are moved into the new partition
+    before it is attached"""
+    partition_name = download_details_partition_name(partition_start)
+    if conn.execute(
+        text("SELECT to_regclass(:table_name)"), {"table_name": partition_name}
+    ).scalar():
+        return
+    range_start = partition_start.isoformat()
+    range_end = month_start(partition_start, 1).isoformat()
+    range_condition = (
+        f"download_date >= '{range_start}' AND download_date < '{range_end}'"
+    )
+    has_default_partition_rows = (
+        conn.execute(
+            text("SELECT to_regclass(:table_name)"),
+            {"table_name": DEFAULT_DOWNLOAD_DETAILS_PARTITION},
+        ).scalar()
+        and conn.execute(
+            text(
+                f"SELECT EXISTS (SELECT 1 FROM {DEFAULT_DOWNLOAD_DETAILS_PARTITION} WHERE {range_condition})"
+            )
+        ).scalar()
+    )
+    if not has_default_partition_rows:
+        conn.execute(
+            text(
+                f"CREATE TABLE {partition_name} PARTITION OF {DOWNLOAD_DETAILS_TABLE} "
+                f"FOR VALUES FROM ('{range_start}') TO ('{range_end}')"
+            )
+        )
+        return
+
+    print(
+        f"Moving the rows of {partition_name} from {DEFAULT_DOWNLOAD_DETAILS_PARTITION}"
+    )
+    conn.execute(
+        text(
+            f"CREATE TABLE {partition_name} (LIKE {DOWNLOAD_DETAILS_TABLE} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"
+        )
+    )
+    conn.execute(
+        text(
+            f"WITH moved_rows AS (DELETE FROM {DEFAULT_DOWNLOAD_DETAILS_PARTITION} WHERE {range_condition} "
+            f"RETURNING *) INSERT INTO {partition_name} SELECT * FROM moved_rows"
+        )
+    )
+    conn.execute(
+        text(
+            f"ALTER TABLE {DOWNLOAD_DETAILS_TABLE} ATTACH PARTITION {partition_name} "
+            f"FOR VALUES FROM ('{range_start}') TO ('{range_end}')"
+        )
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--db_user_name", required=True)
+    parser.add_argument("--db_password", required=True)
+    parser.add_argument("--db_host_and_port", required=True)
+    parser.add_argument("--db_name", required=True)
+    parser.add_argument(
+        "--partition_download_details",
+        action="store_true",
+        help="Convert package_cloud_download_details into a table partitioned by months of download_date",
+    )
+    parser.add_argument(
+        "--partition_months_ahead",
+        type=int,
+        required=False,
+        default=DEFAULT_PARTITION_MONTHS_AHEAD,
+    )
+    parser.add_argument("--is_test", action="store_true")
+
+    arguments = parser.parse_args()
+
+    migrate_stats_db(
+        DbParams(
+            user_name=arguments.db_user_name,
+            password=arguments.db_password,
+            host_and_port=arguments.db_host_and_port,
+            db_name=arguments.db_name,
+        ),
+        is_test=arguments.is_test,
+        partition_download_details=arguments.partition_download_details,
+        partition_months_ahead=arguments.partition_months_ahead,
+    )
+    print("Statistics database objects are migrated")
@@ -0,0 +1,129 @@
+import functools
+import glob
+import hashlib
+import os
+import shutil
+import tempfile
+from typing import Dict, Optional, Tuple
+
+import docker
+from dotenv import dotenv_values
+from github import Github
+
+# Packages produced by the builds, which are stored in the cache
+ARTIFACT_PATTERNS = ("*.deb", "*.rpm")
+# Contents of these directories do not change the build output
+IGNORED_INPUT_DIRECTORIES = (".git",)
+
+
+def input_files_digest(input_files_dir: str) -> str:
+    """Returns a hash of the relative paths and contents of all the files in the input files directory"""
+    hasher = hashlib.sha256()
+    for root, dirs, files in os.walk(input_files_dir):
+        dirs[:] = sorted(d for d in dirs if d not in IGNORED_INPUT_DIRECTORIES)
+        for file_name in sorted(files):
+            file_path = os.path.join(root, file_name)
+            hasher.update(os.path.relpath(file_path, input_files_dir).encode())
+            hasher.update(b"\0")
+            with open(file_path, "rb") as reader:
+                for chunk in iter(functools.partial(reader.read, 1024 * 1024), b""):
+                    hasher.update(chunk)
+            hasher.update(b"\0")
+    return hasher.hexdigest()
+
+
+# pylint: disable=too-many-arguments
+def build_cache_key(
+    input_files_dir: str,
+    build_type_name: str,
+    postgres_version: str,
+    image_digest: str,
+    source_revision: str = "",
+    postgres_versions_file: str = "",
+) -> str:
+    hasher = hashlib.sha256()
+    for part in (
+        input_files_digest(input_files_dir),
+        build_type_name,
+        postgres_version,
+        image_digest,
+        source_revision,
+    ):
+        hasher.update(part.encode())
+        hasher.update(b"\0")
+    if postgres_versions_file:
+        with open(postgres_versions_file, "rb") as reader:
+            hasher.update(reader.read())
+    return hasher.hexdigest()
+
+
+def docker_image_digest(image_name: str) -> Optional[str]:
+    """Returns the id of the local docker image, which is pulled if it does not exist, since the build would pull
+    it as well. None is returned if the image cannot be found"""
+    docker_client = docker.from_env()
+    try:
+        try:
+            return docker_client.images.get(image_name).id
+        except docker.errors.ImageNotFound:
+            return docker_client.images.pull(image_name).id
+    except docker.errors.APIError as error:
+        print(f"Digest of the image {image_name} could not be found: {error}")
+        return None
+
+
+def nightly_source_revision(
+    github_token: str, source_repo: str, input_files_dir: str
+) -> str:
+    """Returns the commit sha of the nightly ref in pkgvars, since builds of the same ref produce different packages
+    after new commits"""
+    nightly_ref = dotenv_values(f"{input_files_dir}/pkgvars")["nightlyref"]
+    return Github(github_token).get_repo(source_repo).get_commit(nightly_ref).sha
+
+
+def artifact_snapshot(output_dir: str) -> Dict[str, Tuple[float, int]]:
+    return {
+        file_path: (os.path.getmtime(file_path), os.path.getsize(file_path))
+        for pattern in ARTIFACT_PATTERNS
+        for file_path in glob.glob(f"{output_dir}/{pattern}")
+    }
+
+
+def restore_build_artifacts(cache_dir: str, cache_key: str, output_dir: str) -> bool:
+    """Copies the artifacts of the cached build into output_dir and returns whether the build is in the cache"""
+    cached_build_dir = f"{cache_dir}/{cache_key}"
+    if not os.path.isdir(cached_build_dir):
+        return False
+    os.makedirs(output_dir, exist_ok=True)
+    for file_name in os.listdir(cached_build_dir):
+        shutil.copy2(f"{cached_build_dir}/{file_name}", f"{output_dir}/{file_name}")
+    return True
+
+
+def save_build_artifacts(
+    cache_dir: str,
+    cache_key: str,
+    output_dir: str,
+    artifacts_before_build: Dict[str, Tuple[float, int]],
+) -> int:
+    """Stores the artifacts created or changed in output_dir by the build into the cache and returns their count.
+    Artifacts are copied into a temporary directory first, so that a build is either fully cached or not cached
+    """
+    built_artifacts = [
+        file_path
+        for file_path, file_state in artifact_snapshot(output_dir).items()
+        if artifacts_before_build.get(file_path) != file_state
+    ]
+    cached_build_dir = f"{cache_dir}/{cache_key}"
+    if not built_artifacts or os.path.isdir(cached_build_dir):
+        return 0
+    os.makedirs(cache_dir, exist_ok=True)
+    temp_dir = tempfile.mkdtemp(dir=cache_dir, prefix=f".{cache_key}-")
+    for file_path in built_artifacts:
+        shutil.copy2(file_path, temp_dir)
+    try:
+        os.rename(temp_dir, cached_build_dir)
+    except OSError:
+        # Same build is cached concurrently
+        shutil.rmtree(temp_dir)
+        return 0
+    return len(built_artifacts)
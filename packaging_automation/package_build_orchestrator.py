@@ -0,0 +1,392 @@
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+
+import attr
+from attr import dataclass
+
+from .citus_package import (
+    POSTGRES_VERSION_FILE,
+    BuildType,
+    InputOutputParameters,
+    PostgresVersionDockerImageType,
+    SigningCredentials,
+    build_package,
+    decode_os_and_release,
+    get_docker_image_name,
+    get_package_version_without_release_stage_from_pkgvars,
+    get_postgres_versions,
+    get_release_package_folder_name,
+    get_signing_credentials,
+    platform_postgres_version_source,
+    sign_packages_in_batch,
+    write_postgres_versions_into_file,
+)
+from .common_tool_methods import (
+    DEFAULT_ENCODING_FOR_FILE_HANDLING,
+    DEFAULT_UNICODE_ERROR_HANDLER,
+    platform_names,
+)
+from .package_build_cache import nightly_source_revision
+
+# Resources reserved for a single docker build while calculating the default job limit
+DEFAULT_CPUS_PER_BUILD = 2
+DEFAULT_MEMORY_PER_BUILD_GB = 4
+MEMINFO_PATH = "/proc/meminfo"
+
+
+@dataclass
+class BuildJob:
+    platform: str
+    postgres_version: str
+    docker_image_name: str
+    output_sub_folder: str
+    postgres_versions_file: str = ""
+
+    @property
+    def name(self) -> str:
+        return f"{self.output_sub_folder}-{self.postgres_version}"
+
+
+@dataclass
+class BuildJobResult:
+    job: BuildJob
+    duration_seconds: float
+    log_path: str
+    error: Optional[str] = None
+
+    @property
+    def succeeded(self) -> bool:
+        return self.error is None
+
+
+def available_memory_bytes() -> Optional[int]:
+    if not os.path.exists(MEMINFO_PATH):
+        return None
+    with open(
+        MEMINFO_PATH,
+        "r",
+        encoding=DEFAULT_ENCODING_FOR_FILE_HANDLING,
+        errors=DEFAULT_UNICODE_ERROR_HANDLER,
+    ) as reader:
+        for line in reader:
+            if line.startswith("MemAvailable:"):
+                # value is given in kB
+                return int(line.split()[1]) * 1024
+    return None
+
+
+def default_job_limit(
+    cpus_per_build: int = DEFAULT_CPUS_PER_BUILD,
+    memory_per_build_gb: int = DEFAULT_MEMORY_PER_BUILD_GB,
+) -> int:
+    """Returns the number of builds that can run concurrently with the available cpus and memory of the host"""
+    job_limit = (os.cpu_count() or 1) // cpus_per_build
+    memory_bytes = available_memory_bytes()
+    if memory_bytes is not None:
+        job_limit = min(job_limit, memory_bytes // (memory_per_build_gb * 1024**3))
+    return max(1, job_limit)
+
+
+def positive_int(value: str) -> int:
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"{value} is not a positive integer")
+    return number
+
+
+def plan_build_jobs(
+    platforms: List[str], build_type: BuildType, input_files_dir: str, work_dir: str
+) -> List[BuildJob]:
+    """Returns a build job for each platform and postgres version to be built. Postgres versions of each platform
+    are written into a separate file in work_dir, which is mounted into the build container of the platform, so
+    that builds of different platforms do not overwrite the versions file of each other
+    """
+    os.makedirs(work_dir, exist_ok=True)
+    jobs = []
+    for platform in platforms:
+        os_name, os_version = decode_os_and_release(platform)
+        release_versions, nightly_versions = get_postgres_versions(
+            platform, input_files_dir
+        )
+        output_sub_folder = get_release_package_folder_name(os_name, os_version)
+        postgres_versions_file = ""
+        if platform != "pgxn":
+            postgres_versions_file = os.path.abspath(
+                f"{work_dir}/{output_sub_folder}.{POSTGRES_VERSION_FILE}"
+            )
+            write_postgres_versions_into_file(
+                input_files_dir,
+                get_package_version_without_release_stage_from_pkgvars(input_files_dir),
+                os_name,
+                platform,
+                versions_file_path=postgres_versions_file,
+            )
+        if (
+            platform_postgres_version_source[os_name]
+            == PostgresVersionDockerImageType.single
+        ):
+            postgres_versions = ["all"]
+        else:
+            postgres_versions = (
+                release_versions
+                if build_type == BuildType.release
+                else nightly_versions
+            )
+        jobs.extend(
+            BuildJob(
+                platform=platform,
+                postgres_version=postgres_version,
+                docker_image_name=get_docker_image_name(platform),
+                output_sub_folder=output_sub_folder,
+                postgres_versions_file=postgres_versions_file,
+            )
+            for postgres_version in postgres_versions
+        )
+    return jobs
+
+
+def move_directory_contents(source_dir: str, target_dir: str):
+    os.makedirs(target_dir, exist_ok=True)
+    for file_name in os.listdir(source_dir):
+        target_path = f"{target_dir}/{file_name}"
+        if os.path.isdir(target_path):
+            shutil.rmtree(target_path)
+        shutil.move(f"{source_dir}/{file_name}", target_path)
+    os.rmdir(source_dir)
+
+
+# pylint: disable=too-many-arguments
+def run_build_job(
+    job: BuildJob,
+    github_token: str,
+    build_type: BuildType,
+    input_output_parameters: InputOutputParameters,
+    log_dir: str,
+    is_test: bool,
+    build_cache_dir: str = "",
+    source_revision: str = "",
+) -> BuildJobResult:
+    log_path = os.path.abspath(f"{log_dir}/{job.name}.log")
+    # Builds of a platform write into a separate directory, so that packages of the concurrent builds of the
+    # platform are not cached together
+    job_output_dir = f"{input_output_parameters.output_dir}/.{job.name}"
+    print(f"Package build {job.name} started. Build output: {log_path}")
+    start = time.perf_counter()
+    try:
+        build_package(
+            github_token,
+            build_type,
+            job.docker_image_name,
+            job.postgres_version,
+            attr.evolve(input_output_parameters, output_dir=job_output_dir),
+            is_test,
+            log_path=log_path,
+            postgres_versions_file=job.postgres_versions_file,
+            build_cache_dir=build_cache_dir,
+            source_revision=source_revision,
+        )
+        move_directory_contents(
+            job_output_dir,
+            f"{input_output_parameters.output_dir}/{job.output_sub_folder}",
+        )
+    # validate_output exits when the build output has warnings, which should fail only the build job
+    except (Exception, SystemExit) as error:  # pylint: disable=broad-except
+        print(f"Package build {job.name} failed: {error!r}")
+        shutil.rmtree(job_output_dir, ignore_errors=True)
+        return BuildJobResult(
+            job=job,
+            duration_seconds=time.perf_counter() - start,
+            log_path=log_path,
+            error=repr(error),
+        )
+    print(f"Package build {job.name} finished")
+    return BuildJobResult(
+        job=job, duration_seconds=time.perf_counter() - start, log_path=log_path
+    )
+
+
+def run_build_jobs(
+    jobs: List[BuildJob],
+    github_token: str,
+    build_type: BuildType,
+    input_output_parameters: InputOutputParameters,
+    job_limit: int,
+    log_dir: str,
+    is_test: bool = False,
+    build_cache_dir: str = "",
+    source_revision: str = "",
+) -> List[BuildJobResult]:
+    """Runs the build jobs concurrently, at most job_limit at a time, and returns their results in the order of
+    the jobs. Output of each build is written into a separate log file in log_dir"""
+    os.makedirs(log_dir, exist_ok=True)
+    with ThreadPoolExecutor(max_workers=job_limit) as executor:
+        futures = [
+            executor.submit(
+                run_build_job,
+                job,
+                github_token,
+                build_type,
+                input_output_parameters,
+                log_dir,
+                is_test,
+                build_cache_dir,
+                source_revision,
+            )
+            for job in jobs
+        ]
+        return [future.result() for future in futures]
+
+
+def format_build_summary(results: List[BuildJobResult]) -> str:
+    header = ("Build", "Status", "Duration", "Log")
+    rows = [header] + [
+        (
+            result.job.name,
+            "ok" if result.succeeded else "failed",
+            f"{result.duration_seconds:.0f} s",
+            result.log_path,
+        )
+        for result in results
+    ]
+    column_widths = [max(len(row[i]) for row in rows) for i in range(len(header))]
+    return "\n".join(
+        "  ".join(
+            value.ljust(width) for value, width in zip(row, column_widths)
+        ).rstrip()
+        for row in rows
+    )
+
+
+def build_platforms(
+    github_token: str,
+    platforms: List[str],
+    build_type: BuildType,
+    signing_credentials: SigningCredentials,
+    input_output_parameters: InputOutputParameters,
+    job_limit: int,
+    log_dir: str,
+    is_test: bool = False,
+    build_cache_dir: str = "",
+    source_repo: str = "",
+) -> List[BuildJobResult]:
+    """Builds the packages of all the given platforms and postgres versions concurrently and signs the packages
+    of the platforms whose builds all succeeded with a single signer container for each package type
+    """
+    signing_credentials = get_signing_credentials(
+        signing_credentials.secret_key, signing_credentials.passphrase
+    )
+    if not signing_credentials.passphrase:
+        raise ValueError("PACKAGING_PASSPHRASE should not be null or empty")
+
+    source_revision = (
+        nightly_source_revision(
+            github_token, source_repo, input_output_parameters.input_files_dir
+        )
+        if build_cache_dir and source_repo and build_type == BuildType.nightly
+        else ""
+    )
+    os.makedirs(input_output_parameters.output_dir, exist_ok=True)
+    # Postgres versions files of the platforms are mounted into the build containers like the output directory, so
+    # they are written into a hidden directory of the output directory, which is removed after the builds
+    with tempfile.TemporaryDirectory(
+        prefix=".postgres-versions-", dir=input_output_parameters.output_dir
+    ) as versions_dir:
+        jobs = plan_build_jobs(
+            platforms,
+            build_type,
+            input_output_parameters.input_files_dir,
+            versions_dir,
+        )
+        print(
+            f"Running {len(jobs)} package builds with at most {job_limit} in parallel"
+        )
+        results = run_build_jobs(
+            jobs,
+            github_token,
+            build_type,
+            input_output_parameters,
+            job_limit,
+            log_dir,
+            is_test,
+            build_cache_dir,
+            source_revision,
+        )
+
+    print(format_build_summary(results))
+
+    failed_sub_folders = {
+        result.job.output_sub_folder for result in results if not result.succeeded
+    }
+    sign_packages_in_batch(
+        [
+            output_sub_folder
+            for output_sub_folder in dict.fromkeys(
+                job.output_sub_folder for job in jobs
+            )
+            if output_sub_folder not in failed_sub_folders
+        ],
+        signing_credentials,
+        input_output_parameters,
+    )
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Builds the packages of multiple platforms and postgres versions concurrently"
+    )
+    parser.add_argument("--gh_token", required=True)
+    parser.add_argument(
+        "--platforms", nargs="+", required=True, choices=platform_names()
+    )
+    parser.add_argument("--build_type", choices=[b.name for b in BuildType])
+    parser.add_argument("--secret_key", required=True)
+    parser.add_argument("--passphrase", required=True)
+    parser.add_argument("--output_dir", required=True)
+    parser.add_argument("--input_files_dir", required=True)
+    parser.add_argument("--log_dir", required=True)
+    parser.add_argument(
+        "--job_limit",
+        type=positive_int,
+        required=False,
+        help="Maximum number of concurrent builds. Calculated from the available cpus and memory if not set",
+    )
+    parser.add_argument("--output_validation", action="store_true")
+    parser.add_argument("--is_test", action="store_true")
+    parser.add_argument(
+        "--build_cache_dir",
+        required=False,
+        default="",
+        help="Directory in which the built packages are cached. Builds are not cached if not set",
+    )
+    parser.add_argument(
+        "--source_repo",
+        required=False,
+        default="",
+        help="Repository of the packaged project e.g. citusdata/citus. Nightly builds are cached only if it is set",
+    )
+
+    args = parser.parse_args()
+
+    build_results = build_platforms(
+        args.gh_token,
+        args.platforms,
+        BuildType[args.build_type],
+        SigningCredentials(args.secret_key, args.passphrase),
+        InputOutputParameters.build(
+            args.input_files_dir, args.output_dir, args.output_validation
+        ),
+        args.job_limit or default_job_limit(),
+        args.log_dir,
+        args.is_test,
+        args.build_cache_dir,
+        args.source_repo,
+    )
+    if not all(result.succeeded for result in build_results):
+        sys.exit(1)
@@ -0,0 +1,278 @@
+import argparse
+from datetime import date, datetime, timedelta
+from typing import Iterable, List, Optional
+
+import sqlalchemy
+from sqlalchemy import Column, DATE, INTEGER, TIMESTAMP, String, func, select, true
+from sqlalchemy.dialects import postgresql
+
+from .dbconfig import Base, DbParams, db_session
+from .package_cloud_statistics_collector import (
+    PackageCloudDownloadDetails,
+    PackageCloudDownloadStats,
+    PackageCloudRepo,
+)
+
+ROLLUP_KEY_COLUMNS = ("repo", "package_name", "package_version", "distro_version")
+
+
+class PackageCloudDailyDownloads(Base):
+    """Downloads of a package version per day. download_count is the sum of the download series of the package
+    files and detail_count, unique_ip_count are counted from the download details"""
+
+    __tablename__ = "package_cloud_daily_downloads"
+    repo = Column(sqlalchemy.Enum(PackageCloudRepo), primary_key=True)
+    package_name = Column(String, primary_key=True)
+    package_version = Column(String, primary_key=True)
+    distro_version = Column(String, primary_key=True)
+    download_date = Column(DATE, primary_key=True)
+    download_count = Column(INTEGER, nullable=False, default=0)
+    detail_count = Column(INTEGER, nullable=False, default=0)
+    unique_ip_count = Column(INTEGER, nullable=False, default=0)
+    update_time = Column(TIMESTAMP, nullable=False, default=datetime.now)
+
+
+class PackageCloudWeeklyDownloads(Base):
+    """Downloads of a package version per week starting on Monday"""
+
+    __tablename__ = "package_cloud_weekly_downloads"
+    repo = Column(sqlalchemy.Enum(PackageCloudRepo), primary_key=True)
+    package_name = Column(String, primary_key=True)
+    package_version = Column(String, primary_key=True)
+    distro_version = Column(String, primary_key=True)
+    week_start = Column(DATE, primary_key=True)
+    download_count = Column(INTEGER, nullable=False, default=0)
+    detail_count = Column(INTEGER, nullable=False, default=0)
+    unique_ip_count = Column(INTEGER, nullable=False, default=0)
+    update_time = Column(TIMESTAMP, nullable=False, default=datetime.now)
+
+
+class PackageCloudRollupWatermark(Base):
+    """Largest id of the rows of a raw statistics table included in the rollups. Rows are only inserted into the
+    raw tables, so the dates to be rolled up again are found from the rows with larger ids
+    """
+
+    __tablename__ = "package_cloud_rollup_watermarks"
+    table_name = Column(String, primary_key=True)
+    last_rolled_up_id = Column(INTEGER, nullable=False)
+    update_time = Column(TIMESTAMP, nullable=False)
+
+
+def week_start(day: date) -> date:
+    return day - timedelta(days=day.weekday())
+
+
+def week_days(week_starts: Iterable[date]) -> List[date]:
+    return [start + timedelta(days=i) for start in week_starts for i in range(7)]
+
+
+def date_filter(column, dates: Optional[List[date]]):
+    # None means all the dates i.e. rollups are rebuilt
+    return true() if dates is None else column.in_(dates)
+
+
+def rollup_watermark(table_name: str, session) -> int:
+    watermark = session.get(PackageCloudRollupWatermark, table_name)
+    return watermark.last_rolled_up_id if watermark else 0
+
+
+def save_rollup_watermark(table_name: str, last_rolled_up_id: int, session):
+    statement = postgresql.insert(PackageCloudRollupWatermark).values(
+        table_name=table_name,
+        last_rolled_up_id=last_rolled_up_id,
+        update_time=datetime.now(),
+    )
+    session.execute(
+        statement.on_conflict_do_update(
+            index_elements=[PackageCloudRollupWatermark.table_name],
+            set_={
+                "last_rolled_up_id": statement.excluded.last_rolled_up_id,
+                "update_time": statement.excluded.update_time,
+            },
+        )
+    )
+
+
+def touched_download_dates(model, since_id: int, until_id: int, session) -> List[date]:
+    """Returns the download dates of the rows inserted into the given raw table after the last rollup"""
+    return list(
+        session.scalars(
+            select(model.download_date)
+            .where(model.id > since_id, model.id <= until_id)
+            .distinct()
+        )
+    )
+
+
+def upsert_rollup(rollup_model, key_column: str, aggregate_query, session):
+    """Inserts the rows of the aggregate query into the rollup table. Aggregated columns of the existing rollup rows
+    are replaced, other aggregated columns of the rows are kept"""
+    aggregate_columns = [
+        column.name
+        for column in aggregate_query.selected_columns
+        if column.name not in ROLLUP_KEY_COLUMNS + (key_column,)
+    ]
+    statement = postgresql.insert(rollup_model).from_select(
+        [column.name for column in aggregate_query.selected_columns], aggregate_query
+    )
+    session.execute(
+        statement.on_conflict_do_update(
+            index_elements=[*ROLLUP_KEY_COLUMNS, key_column],
+            set_={
+                **{
+                    column_name: statement.excluded[column_name]
+                    for column_name in aggregate_columns
+                },
+                "update_time": statement.excluded.update_time,
+            },
+        )
+    )
+
+
+def rollup_key(model):
+    return [getattr(model, column_name) for column_name in ROLLUP_KEY_COLUMNS]
+
+
+def rollup_daily_downloads(
+    stat_dates: Optional[List[date]], detail_dates: Optional[List[date]], session
+):
+    stats = PackageCloudDownloadStats
+    upsert_rollup(
+        PackageCloudDailyDownloads,
+        "download_date",
+        select(
+            *rollup_key(stats),
+            stats.download_date,
+            func.sum(stats.download_count).label("download_count"),
+        )
+        .where(date_filter(stats.download_date, stat_dates))
+        .group_by(*rollup_key(stats), stats.download_date),
+        session,
+    )
+    details = PackageCloudDownloadDetails
+    upsert_rollup(
+        PackageCloudDailyDownloads,
+        "download_date",
+        select(
+            *rollup_key(details),
+            details.download_date,
+            func.count().label("detail_count"),
+            func.count(details.ip_address.distinct()).label("unique_ip_count"),
+        )
+        .where(date_filter(details.download_date, detail_dates))
+        .group_by(*rollup_key(details), details.download_date),
+        session,
+    )
+
+
+def rollup_weekly_downloads(week_starts: Optional[List[date]], session):
+    """Sums the daily rollups of the given weeks. Unique ips of a week are counted from the download details, since
+    they cannot be derived from the daily unique ip counts"""
+    daily = PackageCloudDailyDownloads
+    daily_week_start = sqlalchemy.cast(
+        func.date_trunc("week", daily.download_date), DATE
+    ).label("week_start")
+    upsert_rollup(
+        PackageCloudWeeklyDownloads,
+        "week_start",
+        select(
+            *rollup_key(daily),
+            daily_week_start,
+            func.sum(daily.download_count).label("download_count"),
+            func.sum(daily.detail_count).label("detail_count"),
+        )
+        .where(
+            date_filter(
+                daily.download_date,
+                None if week_starts is None else week_days(week_starts),
+            )
+        )
+        .group_by(*rollup_key(daily), daily_week_start),
+        session,
+    )
+    details = PackageCloudDownloadDetails
+    detail_week_start = sqlalchemy.cast(
+        func.date_trunc("week", details.download_date), DATE
+    ).label("week_start")
+    upsert_rollup(
+        PackageCloudWeeklyDownloads,
+        "week_start",
+        select(
+            *rollup_key(details),
+            detail_week_start,
+            func.count(details.ip_address.distinct()).label("unique_ip_count"),
+        )
+        .where(
+            date_filter(
+                details.download_date,
+                None if week_starts is None else week_days(week_starts),
+            )
+        )
+        .group_by(*rollup_key(details), detail_week_start),
+        session,
+    )
+
+
+def rollup_package_cloud_downloads(
+    db_params: DbParams, is_test: bool = False, rebuild: bool = False
+):
+    """Updates the daily and weekly rollups of the dates having download stats or details saved after the last
+    rollup. All the rollups are recomputed if rebuild is set.
+    Rollups should be updated after the collections complete, since rows of the collections which are not
+    committed yet would be skipped by the next rollup as well"""
+    session = db_session(db_params=db_params, is_test=is_test)
+    last_ids = {
+        model: session.scalar(select(func.coalesce(func.max(model.id), 0)))
+        for model in (PackageCloudDownloadStats, PackageCloudDownloadDetails)
+    }
+    if rebuild:
+        stat_dates = detail_dates = week_starts = None
+    else:
+        stat_dates, detail_dates = (
+            touched_download_dates(
+                model, rollup_watermark(model.__tablename__, session), last_id, session
+            )
+            for model, last_id in last_ids.items()
+        )
+        week_starts = sorted({week_start(day) for day in stat_dates + detail_dates})
+        print(
+            f"Rolling up {len(set(stat_dates + detail_dates))} days and {len(week_starts)} weeks of package cloud "
+            f"downloads"
+        )
+    if rebuild or week_starts:
+        rollup_daily_downloads(stat_dates, detail_dates, session)
+        rollup_weekly_downloads(week_starts, session)
+    for model, last_id in last_ids.items():
+        save_rollup_watermark(model.__tablename__, last_id, session)
+    session.commit()
+    session.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Updates the daily and weekly download rollups of the package cloud statistics"
+    )
+    parser.add_argument("--db_user_name", required=True)
+    parser.add_argument("--db_password", required=True)
+    parser.add_argument("--db_host_and_port", required=True)
+    parser.add_argument("--db_name", required=True)
+    parser.add_argument(
+        "--rebuild",
+        action="store_true",
+        help="Recompute the rollups of all the dates instead of the dates saved after the last rollup",
+    )
+    parser.add_argument("--is_test", action="store_true")
+
+    arguments = parser.parse_args()
+
+    rollup_package_cloud_downloads(
+        DbParams(
+            user_name=arguments.db_user_name,
+            password=arguments.db_password,
+            host_and_port=arguments.db_host_and_port,
+            db_name=arguments.db_name,
+        ),
+        is_test=arguments.is_test,
+        rebuild=arguments.rebuild,
+    )
+    print("Package cloud download rollups are updated")
@@ -1,22 +1,73 @@
 import argparse
 import json
+import math
+import threading
 import time
-from datetime import datetime, date
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, date, timedelta
 from enum import Enum
+from functools import lru_cache, partial
 from http import HTTPStatus
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
 
-import requests
+import ijson
 import sqlalchemy
 from attr import dataclass
-from sqlalchemy import Column, INTEGER, DATE, TIMESTAMP, String, UniqueConstraint
+from sqlalchemy import (
+    BOOLEAN,
+    Column,
+    INTEGER,
+    DATE,
+    TIMESTAMP,
+    Index,
+    String,
+)
+from sqlalchemy.dialects import postgresql
 
-from .common_tool_methods import remove_suffix, stat_get_request
-from .dbconfig import Base, db_session, DbParams, RequestType
+from .common_tool_methods import (
+    DEFAULT_HTTP_POOL_SIZE,
+    DEFAULT_HTTP_TIMEOUT,
+    BackgroundIterator,
+    HttpSessionParams,
+    RateLimiter,
+    configure_http_session,
+    configure_rate_limiter,
+    http_session,
+    remove_suffix,
+    stat_get_request,
+)
+from .dbconfig import (
+    Base,
+    BulkInsertBuffer,
+    db_session,
+    DbParams,
+    DEFAULT_INSERT_BATCH_SIZE,
+    RequestLogResponseMode,
+    RequestLogWriter,
+    RequestType,
+)
 
+PC_HOST = "packagecloud.io"
+PC_BASE_URL = f"https://{PC_HOST}"
 PC_PACKAGE_COUNT_SUFFIX = " packages"
 PC_DOWNLOAD_DATE_FORMAT = "%Y%m%dZ"
 PC_DOWNLOAD_DETAIL_DATE_FORMAT = "%Y-%m-%dT%H:%M:%S.000Z"
+PC_DOWNLOAD_DETAIL_DATE_SUFFIX = ".000Z"
+PC_DOWNLOAD_DETAIL_DATE_LENGTH = len("2023-01-01T00:00:00.000Z")
 DEFAULT_PAGE_RECORD_COUNT = 100
+DEFAULT_DETAIL_PAGE_RECORD_COUNT = 100
+DEFAULT_CONCURRENCY = 1
+# Maximum number of parsed download details waiting to be saved when detail pages are streamed
+DEFAULT_DETAIL_STREAM_BUFFER_SIZE = 1000
+# Claims of the work queue items which are not refreshed within this period are assumed to be abandoned and the
+# items are claimed again by the other executions
+DEFAULT_WORK_ITEM_CLAIM_TIMEOUT_MINUTES = 30
+# Number of times the claim of a work item is refreshed within the claim timeout while its page is processed
+WORK_ITEM_CLAIM_REFRESHES_PER_TIMEOUT = 3
+
+# (download_date, package_full_name, distro_version) key of a package cloud download stat record
+StatKey = Tuple[date, str, str]
 
 
 class PackageCloudRepo(Enum):
@@ -33,6 +84,19 @@ class PackageCloudOrganization(Enum):
     citus_bot = "citus-bot"
 
 
+class SchedulingMode(Enum):
+    # pages are assigned statically to parallel executions by striding page indexes
+    stride = "stride"
+    # parallel executions claim pages one by one from a queue table shared in the database
+    work_queue = "work_queue"
+
+
+class WorkItemStatus(Enum):
+    pending = "pending"
+    claimed = "claimed"
+    completed = "completed"
+
+
 class PackageCloudDownloadStats(Base):
     __tablename__ = "package_cloud_download_stats"
     id = Column(INTEGER, primary_key=True, autoincrement=True)
@@ -48,11 +112,14 @@ class PackageCloudDownloadStats(Base):
     download_date = Column(DATE, nullable=False)
     download_count = Column(INTEGER, nullable=False)
     detail_url = Column(String, nullable=False)
-    UniqueConstraint(
-        "package_full_name",
-        "download_date",
-        "distro_version",
-        name="ux_package_cloud_download_stats",
+    __table_args__ = (
+        # existence checks of the stat records filter by package and distro
+        Index(
+            "ix_package_cloud_download_stats_package",
+            "package_full_name",
+            "distro_version",
+            "download_date",
+        ),
     )
 
 
@@ -74,16 +141,80 @@ class PackageCloudDownloadDetails(Base):
     user_agent = Column(String)
     source = Column(String)
     read_token = Column(String)
+    __table_args__ = (
+        Index(
+            "ix_package_cloud_download_details_package",
+            "package_full_name",
+            "distro_version",
+            "download_date",
+        ),
+        # reports and rollups scan the details of a date range
+        Index(
+            "ix_package_cloud_download_details_download_date",
+            "download_date",
+            "repo",
+        ),
+    )
+
+
+class PackageCloudDetailWatermark(Base):
+    """Last download time of the download details saved for a package. Detail queries of the package fetch only
+    the details downloaded after this time"""
+
+    __tablename__ = "package_cloud_detail_watermarks"
+    repo = Column(sqlalchemy.Enum(PackageCloudRepo), primary_key=True)
+    package_full_name = Column(String, primary_key=True)
+    distro_version = Column(String, primary_key=True)
+    last_downloaded_at = Column(TIMESTAMP, nullable=False)
+    update_time = Column(TIMESTAMP, nullable=False)
+
+
+class PackageCloudCollectionCheckpoint(Base):
+    """Last page saved by a parallel execution of the collection on the given run date. Pages up to page_index are
+    skipped when the collection is restarted on the same day"""
+
+    __tablename__ = "package_cloud_collection_checkpoints"
+    repo = Column(sqlalchemy.Enum(PackageCloudRepo), primary_key=True)
+    run_date = Column(DATE, primary_key=True)
+    parallel_count = Column(INTEGER, primary_key=True)
+    parallel_exec_index = Column(INTEGER, primary_key=True)
+    page_record_count = Column(INTEGER, primary_key=True)
+    page_index = Column(INTEGER)
+    last_package_full_name = Column(String)
+    is_completed = Column(BOOLEAN, nullable=False, default=False)
+    update_time = Column(TIMESTAMP, nullable=False)
+
+
+class PackageCloudWorkItem(Base):
+    """Package list page to be collected on the given run date. Parallel executions running in work queue mode claim
+    pending items using SELECT ... FOR UPDATE SKIP LOCKED, so each page is processed by a single execution and an
+    execution continues with the next page as soon as it completes its current page"""
+
+    __tablename__ = "package_cloud_work_queue"
+    repo = Column(sqlalchemy.Enum(PackageCloudRepo), primary_key=True)
+    run_date = Column(DATE, primary_key=True)
+    page_record_count = Column(INTEGER, primary_key=True)
+    page_index = Column(INTEGER, primary_key=True)
+    status = Column(sqlalchemy.Enum(WorkItemStatus), nullable=False)
+    claimed_by = Column(String)
+    claimed_at = Column(TIMESTAMP)
+    claim_count = Column(INTEGER, nullable=False, default=0)
+    completed_at = Column(TIMESTAMP)
 
 
 def package_count(
     organization: PackageCloudOrganization,
     repo_name: PackageCloudRepo,
     package_cloud_api_token: str,
+    base_url: str = PC_BASE_URL,
 ) -> int:
-    result = requests.get(
-        f"https://{package_cloud_api_token}:@packagecloud.io/api/v1/repos.json?include_collaborations=true",
-        timeout=60,
+    result = http_session().get(
+        package_cloud_address(
+            package_cloud_api_token,
+            "api/v1/repos.json?include_collaborations=true",
+            base_url,
+        ),
+        timeout=DEFAULT_HTTP_TIMEOUT,
     )
 
     repo_list = json.loads(result.content)
@@ -105,6 +236,8 @@ class PackageCloudParams:
     standard_api_token: str
     organization: PackageCloudOrganization
     repo_name: PackageCloudRepo
+    # packagecloud api is accessed through this address. It is changed to run the collector against a simulator
+    base_url: str = PC_BASE_URL
 
 
 @dataclass
@@ -112,64 +245,603 @@ class ParallelExecutionParams:
     parallel_count: int
     parallel_exec_index: int
     page_record_count: int
+    # number of concurrent packagecloud requests executed inside a single parallel execution
+    concurrency: int = DEFAULT_CONCURRENCY
+    scheduling_mode: SchedulingMode = SchedulingMode.stride
+    work_item_claim_timeout: timedelta = timedelta(
+        minutes=DEFAULT_WORK_ITEM_CLAIM_TIMEOUT_MINUTES
+    )
+
 
+@dataclass
+class DetailQueryParams:
+    page_record_count: int = DEFAULT_DETAIL_PAGE_RECORD_COUNT
+    # If set, detail pages are parsed incrementally while they are downloaded and parsed details are passed to the
+    # insert buffer one by one instead of holding the whole page in memory
+    stream_pages: bool = False
+    # If set, detail queries are skipped for the packages which already have detail watermarks and whose download
+    # series do not have any downloads which are not saved yet
+    skip_unchanged_packages: bool = True
 
+
+@dataclass
+class StatsInsertBuffers:
+    details_buffer: BulkInsertBuffer
+    stats_buffer: BulkInsertBuffer
+
+
+# pylint: disable=too-many-arguments,too-many-locals
 def fetch_and_save_package_cloud_stats(
     db_params: DbParams,
     package_cloud_params: PackageCloudParams,
     parallel_execution_params: ParallelExecutionParams,
     is_test: bool = False,
     save_records_with_download_count_zero: bool = False,
+    insert_batch_size: int = DEFAULT_INSERT_BATCH_SIZE,
+    request_log_response_mode: RequestLogResponseMode = RequestLogResponseMode.full,
+    resume_from_checkpoint: bool = True,
+    detail_query_params: Optional[DetailQueryParams] = None,
 ):
-    """It is called directly from pipeline. Packages are queried page by page from packagecloud. Packages are queried
-    with the given index and queried packages are saved into database using
-    fetch_and_save_package_stats_for_package_list method"""
+    """It is called directly from pipeline. Packages are queried page by page from packagecloud. Pages assigned to
+    the given parallel execution index are fetched concurrently with at most 'concurrency' requests in flight and
+    for every package, download series and download detail queries are executed concurrently as well. Fetched
+    results are saved into database in the calling thread since sqlalchemy sessions are not thread-safe.
+    Records are inserted in batches of insert_batch_size rows and committed once for each page together with the
+    checkpoint of the run, so that an interrupted run of the same day continues from the page after the checkpoint.
+    Download details are fetched incrementally starting from the watermark saved for each package in the previous
+    runs. Requests are logged asynchronously and responses are logged according to request_log_response_mode.
+    Detail pages are streamed if it is set in detail_query_params, so that peak memory does not depend on the
+    detail page size.
+    In work queue scheduling mode, pages are claimed from the work queue instead of striding and checkpoints are
+    not used since completed items of the queue are not claimed again on the same day
+    """
+    if (
+        parallel_execution_params.scheduling_mode == SchedulingMode.work_queue
+        and not resume_from_checkpoint
+    ):
+        raise ValueError(
+            "Work queue scheduling mode does not use checkpoints. Pages completed today are not collected again"
+        )
     repo_package_count = package_count(
         organization=package_cloud_params.organization,
         repo_name=package_cloud_params.repo_name,
         package_cloud_api_token=package_cloud_params.standard_api_token,
+        base_url=package_cloud_params.base_url,
     )
     session = db_session(db_params=db_params, is_test=is_test)
-    page_index = parallel_execution_params.parallel_exec_index + 1
+    details_buffer = BulkInsertBuffer(
+        session, PackageCloudDownloadDetails, insert_batch_size
+    )
+    stats_buffer = BulkInsertBuffer(
+        session, PackageCloudDownloadStats, insert_batch_size
+    )
+    detail_query_params = detail_query_params or DetailQueryParams()
     start = time.time()
-    while is_page_in_range(
-        page_index, repo_package_count, parallel_execution_params.page_record_count
-    ):
-        result = stat_get_request(
-            package_list_with_pagination_request_address(
+    with RequestLogWriter(
+        session.get_bind(), request_log_response_mode
+    ) as request_log_writer, ThreadPoolExecutor(
+        max_workers=parallel_execution_params.concurrency
+    ) as executor:
+        save_page = partial(
+            save_package_list_stats,
+            package_cloud_params=package_cloud_params,
+            executor=executor,
+            request_log_writer=request_log_writer,
+            insert_buffers=StatsInsertBuffers(details_buffer, stats_buffer),
+            save_records_with_download_count_zero=save_records_with_download_count_zero,
+            detail_query_params=detail_query_params,
+        )
+        if parallel_execution_params.scheduling_mode == SchedulingMode.work_queue:
+            seed_work_queue(
+                package_cloud_params.repo_name,
+                repo_package_count,
+                parallel_execution_params.page_record_count,
+                session,
+            )
+            save_work_queue_pages(
+                package_cloud_params,
+                parallel_execution_params,
+                request_log_writer,
+                save_page,
+                session,
+            )
+        else:
+            save_shard_pages(
+                package_cloud_params,
+                parallel_execution_params,
+                repo_package_count,
+                request_log_writer,
+                save_page,
+                session,
+                executor,
+                resume_from_checkpoint,
+            )
+    end = time.time()
+
+    print(
+        f"Saved {details_buffer.inserted_row_count} download detail and {stats_buffer.inserted_row_count} "
+        f"download stat records"
+    )
+    print("Elapsed Time in seconds: " + str(end - start))
+
+
+def save_package_list_stats(
+    package_info_list: List[Dict[str, Any]],
+    package_cloud_params: PackageCloudParams,
+    executor: ThreadPoolExecutor,
+    request_log_writer: RequestLogWriter,
+    insert_buffers: StatsInsertBuffers,
+    save_records_with_download_count_zero: bool,
+    detail_query_params: Optional[DetailQueryParams] = None,
+):
+    """Fetches download details and download series of the given packages concurrently using the executor and
+    saves them with the session of the insert buffers. If skip_unchanged_packages is set, detail queries of the
+    packages whose download series do not have any unsaved downloads are skipped. Caller is responsible for
+    committing the session
+    """
+    session = insert_buffers.stats_buffer.session
+    detail_query_params = detail_query_params or DetailQueryParams()
+    watermarks = detail_watermarks(
+        package_info_list, package_cloud_params.repo_name, session
+    )
+    stats_futures = [
+        executor.submit(
+            fetch_package_download_stats,
+            package_info,
+            package_cloud_params.standard_api_token,
+            None,
+            request_log_writer,
+            package_cloud_params.base_url,
+        )
+        for package_info in package_info_list
+    ]
+    stat_keys = existing_stat_keys(package_info_list, session)
+    detail_savers = []
+    detail_futures = []
+    detail_stream = (
+        BackgroundIterator(executor, DEFAULT_DETAIL_STREAM_BUFFER_SIZE)
+        if detail_query_params.stream_pages
+        else None
+    )
+    try:
+        for package_info, stats_future in zip(package_info_list, stats_futures):
+            watermark = watermarks.get(watermark_key(package_info))
+            if (
+                detail_query_params.skip_unchanged_packages
+                and watermark
+                and not has_unsaved_downloads(
+                    package_info, stats_future.result(), stat_keys
+                )
+            ):
+                continue
+            detail_savers.append(
+                PackageDownloadDetailSaver(
+                    package_info,
+                    insert_buffers.details_buffer,
+                    package_cloud_params.repo_name,
+                    stat_keys,
+                )
+            )
+            detail_fetch_arguments = (
+                package_info,
+                package_cloud_params.admin_api_token,
+                None,
+                watermark,
+                request_log_writer,
+                detail_query_params.page_record_count,
+                package_cloud_params.base_url,
+            )
+            if detail_stream:
+                detail_stream.submit(
+                    partial(iter_package_download_details, *detail_fetch_arguments)
+                )
+            else:
+                detail_futures.append(
+                    executor.submit(
+                        fetch_package_download_details, *detail_fetch_arguments
+                    )
+                )
+        skipped_package_count = len(package_info_list) - len(detail_savers)
+        if skipped_package_count:
+            print(
+                f"Skipped download detail queries of {skipped_package_count} packages without new downloads"
+            )
+
+        if detail_stream:
+            # Details of all the packages are saved in the order they are parsed, so that detail queries of all
+            # the packages progress concurrently while only the details in the stream buffer are held in memory
+            for saver_index, download_detail in detail_stream:
+                detail_savers[saver_index].add(download_detail)
+        else:
+            for detail_saver, detail_future in zip(detail_savers, detail_futures):
+                for download_detail in detail_future.result():
+                    detail_saver.add(download_detail)
+    finally:
+        # Stops the detail queries which are not consumed because of an error
+        if detail_stream:
+            detail_stream.cancel()
+
+    updated_watermarks = {
+        watermark_key(detail_saver.package_info): detail_saver.last_downloaded_at
+        for detail_saver in detail_savers
+        if detail_saver.last_downloaded_at
+    }
+    for package_info, stats_future in zip(package_info_list, stats_futures):
+        save_package_stats(
+            package_info,
+            stats_future.result(),
+            insert_buffers.stats_buffer,
+            save_records_with_download_count_zero,
+            package_cloud_params.repo_name,
+            stat_keys,
+        )
+    insert_buffers.details_buffer.flush()
+    insert_buffers.stats_buffer.flush()
+    save_detail_watermarks(updated_watermarks, package_cloud_params.repo_name, session)
+
+
+def has_unsaved_downloads(
+    package_info, download_stats: Dict[str, Any], stat_keys: Set[StatKey]
+) -> bool:
+    """Returns true if the download series of the package has downloads on a day before today which is not saved
+    yet. Download details are saved only for the days without stat records, so detail queries of the packages
+    without unsaved downloads would not save any records. Ignored packages are never saved
+    """
+    if is_ignored_package(package_info["name"]):
+        return False
+    today = date.today()
+    for stat_date, download_count in download_stats["value"].items():
+        download_date = parse_download_date(stat_date)
+        if (
+            int(download_count) > 0
+            and download_date != today
+            and (
+                download_date,
+                package_info["filename"],
+                package_info["distro_version"],
+            )
+            not in stat_keys
+        ):
+            return True
+    return False
+
+
+def save_shard_pages(
+    package_cloud_params: PackageCloudParams,
+    parallel_execution_params: ParallelExecutionParams,
+    repo_package_count: int,
+    request_log_writer: RequestLogWriter,
+    save_page,
+    session,
+    executor: ThreadPoolExecutor,
+    resume_from_checkpoint: bool,
+):
+    """Saves the pages assigned to the parallel execution by striding. Pages are fetched concurrently using the
+    executor and saved in order with save_page. Checkpoint of the execution is committed after each page
+    """
+    checkpoint = collection_checkpoint(
+        package_cloud_params.repo_name, parallel_execution_params, session
+    )
+    if resume_from_checkpoint and checkpoint.is_completed:
+        print(
+            f"Collection for the parallel execution index {parallel_execution_params.parallel_exec_index} "
+            f"was already completed today"
+        )
+        return
+    page_indexes = shard_page_indexes(repo_package_count, parallel_execution_params)
+    if resume_from_checkpoint and checkpoint.page_index:
+        print(
+            f"Resuming from the page after {checkpoint.page_index}. Last processed package: "
+            f"{checkpoint.last_package_full_name}"
+        )
+        page_indexes = [
+            page_index
+            for page_index in page_indexes
+            if page_index > checkpoint.page_index
+        ]
+    page_futures = [
+        (
+            page_index,
+            executor.submit(
+                fetch_package_list_page,
                 package_cloud_params,
                 page_index,
                 parallel_execution_params.page_record_count,
+                request_log_writer,
             ),
-            RequestType.package_cloud_list_package,
-            session,
         )
-        package_info_list = json.loads(result.content)
+        for page_index in page_indexes
+    ]
+    # Pages are saved in order to be able to resume from the last saved page
+    for page_index, page_future in page_futures:
+        package_info_list = page_future.result()
+        save_page(package_info_list)
+        checkpoint.page_index = page_index
+        if package_info_list:
+            checkpoint.last_package_full_name = package_info_list[-1]["filename"]
+        checkpoint.update_time = datetime.now()
+        session.commit()
 
-        if len(package_info_list) > 0:
-            page_index = page_index + parallel_execution_params.parallel_count
-        else:
+    checkpoint.is_completed = True
+    checkpoint.update_time = datetime.now()
+    session.commit()
+
+
+def seed_work_queue(
+    repo_name: PackageCloudRepo,
+    repo_package_count: int,
+    page_record_count: int,
+    session,
+):
+    """Adds the pages of the repo into today's work queue. Every parallel execution seeds the queue when it starts
+    and pages already in the queue are left as they are, so the pages of the packages added after the first seed
+    are appended to the queue"""
+    page_count = math.ceil(repo_package_count / page_record_count)
+    if page_count == 0:
+        return
+    statement = postgresql.insert(PackageCloudWorkItem).values(
+        [
+            {
+                "repo": repo_name,
+                "run_date": date.today(),
+                "page_record_count": page_record_count,
+                "page_index": page_index,
+                "status": WorkItemStatus.pending,
+                "claim_count": 0,
+            }
+            for page_index in range(1, page_count + 1)
+        ]
+    )
+    session.execute(statement.on_conflict_do_nothing())
+    session.commit()
+
+
+def save_work_queue_pages(
+    package_cloud_params: PackageCloudParams,
+    parallel_execution_params: ParallelExecutionParams,
+    request_log_writer: RequestLogWriter,
+    save_page,
+    session,
+):
+    """Claims pages from today's work queue and saves them with save_page until no claimable page is left. Stats of
+    a page and completion of its work item are committed in the same transaction. Claim of the page is refreshed
+    while the page is saved, so that pages taking longer than the claim timeout are not claimed again
+    """
+    worker_id = (
+        f"{parallel_execution_params.parallel_exec_index}-{uuid.uuid4().hex[:8]}"
+    )
+    claim_timeout = parallel_execution_params.work_item_claim_timeout
+    while True:
+        work_item = claim_work_item(
+            package_cloud_params.repo_name,
+            parallel_execution_params.page_record_count,
+            worker_id,
+            session,
+            claim_timeout,
+        )
+        if work_item is None:
             break
-        for package_info in package_info_list:
-            fetch_and_save_package_download_details(
-                package_info,
-                package_cloud_params.admin_api_token,
-                session,
-                package_cloud_params.repo_name,
+        with WorkItemClaimRefresher(
+            session.get_bind(),
+            work_item,
+            worker_id,
+            claim_timeout / WORK_ITEM_CLAIM_REFRESHES_PER_TIMEOUT,
+        ):
+            package_info_list = fetch_package_list_page(
+                package_cloud_params,
+                work_item.page_index,
+                parallel_execution_params.page_record_count,
+                request_log_writer,
             )
-            fetch_and_save_package_stats(
-                package_info,
-                package_cloud_params.standard_api_token,
-                session,
-                save_records_with_download_count_zero,
-                package_cloud_params.repo_name,
+            save_page(package_info_list)
+        complete_work_item(work_item, worker_id, session)
+
+
+def claim_work_item(
+    repo_name: PackageCloudRepo,
+    page_record_count: int,
+    worker_id: str,
+    session,
+    claim_timeout: timedelta = timedelta(
+        minutes=DEFAULT_WORK_ITEM_CLAIM_TIMEOUT_MINUTES
+    ),
+) -> Optional[PackageCloudWorkItem]:
+    """Claims the first pending item of today's work queue. Items claimed by the other executions are skipped
+    without waiting for their locks. Items whose claims are not refreshed within claim_timeout are claimed again
+    since their executions are assumed to be terminated"""
+    work_item = (
+        session.query(PackageCloudWorkItem)
+        .filter(
+            PackageCloudWorkItem.repo == repo_name,
+            PackageCloudWorkItem.run_date == date.today(),
+            PackageCloudWorkItem.page_record_count == page_record_count,
+            sqlalchemy.or_(
+                PackageCloudWorkItem.status == WorkItemStatus.pending,
+                sqlalchemy.and_(
+                    PackageCloudWorkItem.status == WorkItemStatus.claimed,
+                    PackageCloudWorkItem.claimed_at < datetime.now() - claim_timeout,
+                ),
+            ),
+        )
+        .order_by(PackageCloudWorkItem.page_index)
+        .with_for_update(skip_locked=True)
+        .first()
+    )
+    if work_item is None:
+        session.commit()
+        return None
+    work_item.status = WorkItemStatus.claimed
+    work_item.claimed_by = worker_id
+    work_item.claimed_at = datetime.now()
+    work_item.claim_count = work_item.claim_count + 1
+    session.commit()
+    return work_item
+
+
+def work_item_key(work_item: PackageCloudWorkItem) -> Dict[str, Any]:
+    return {
+        "repo": work_item.repo,
+        "run_date": work_item.run_date,
+        "page_record_count": work_item.page_record_count,
+        "page_index": work_item.page_index,
+    }
+
+
+def complete_work_item(work_item: PackageCloudWorkItem, worker_id: str, session):
+    """Marks the item as completed and commits the stats saved for the item. The first execution completing the
+    item keeps its stats even if the item was claimed by another execution after the claim timeout. Stats of the
+    item are rolled back if it was already completed by another execution, since they are already saved
+    """
+    locked_work_item = (
+        session.query(PackageCloudWorkItem)
+        .filter_by(**work_item_key(work_item))
+        .with_for_update()
+        # Item could be loaded in the session before it was claimed or completed by another execution
+        .populate_existing()
+        .one()
+    )
+    if locked_work_item.status == WorkItemStatus.completed:
+        print(
+            f"Page {work_item.page_index} is already completed by {locked_work_item.claimed_by}. Rolling back its "
+            f"stats"
+        )
+        session.rollback()
+        return
+    if locked_work_item.claimed_by != worker_id:
+        print(
+            f"Completing page {work_item.page_index}, whose claim is taken over by {locked_work_item.claimed_by}"
+        )
+    locked_work_item.status = WorkItemStatus.completed
+    locked_work_item.claimed_by = worker_id
+    locked_work_item.completed_at = datetime.now()
+    session.commit()
+
+
+def refresh_work_item_claim(
+    engine, claimed_work_item_key: Dict[str, Any], worker_id: str
+) -> bool:
+    """Updates the claim time of the item if it is still claimed by the given execution. Claim time is updated
+    with a separate connection, since the session of the execution commits only when the page is completed
+    """
+    with engine.begin() as conn:
+        result = conn.execute(
+            sqlalchemy.update(PackageCloudWorkItem)
+            .filter_by(
+                **claimed_work_item_key,
+                status=WorkItemStatus.claimed,
+                claimed_by=worker_id,
             )
+            .values(claimed_at=datetime.now())
+        )
+    return result.rowcount == 1
 
-            session.commit()
 
-    end = time.time()
+class WorkItemClaimRefresher:
+    """Refreshes the claim of the work item at every refresh_interval from a background thread while the page of
+    the item is processed, so that the other executions do not claim the item of a page taking longer than the
+    claim timeout"""
+
+    def __init__(
+        self,
+        engine,
+        work_item: PackageCloudWorkItem,
+        worker_id: str,
+        refresh_interval: timedelta,
+    ):
+        self.engine = engine
+        # Key is read in the calling thread since the session of the work item is not thread-safe
+        self.work_item_key = work_item_key(work_item)
+        self.worker_id = worker_id
+        self.refresh_interval = refresh_interval
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.refresh_claim, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stopped.set()
+        self.thread.join()
+
+    def refresh_claim(self):
+        while not self.stopped.wait(self.refresh_interval.total_seconds()):
+            try:
+                if not refresh_work_item_claim(
+                    self.engine, self.work_item_key, self.worker_id
+                ):
+                    print(
+                        f"Claim of page {self.work_item_key['page_index']} is taken over by another execution"
+                    )
+                    return
+            except sqlalchemy.exc.SQLAlchemyError as error:
+                # Claim is refreshed again in the next interval
+                print(
+                    f"Claim of page {self.work_item_key['page_index']} could not be refreshed: {error}"
+                )
 
-    print("Elapsed Time in seconds: " + str(end - start))
+
+def collection_checkpoint(
+    repo_name: PackageCloudRepo,
+    parallel_execution_params: ParallelExecutionParams,
+    session,
+) -> PackageCloudCollectionCheckpoint:
+    """Returns the checkpoint of today's run for the given parallel execution. Checkpoint is created if the
+    collection is not started today"""
+    checkpoint_key = {
+        "repo": repo_name,
+        "run_date": date.today(),
+        "parallel_count": parallel_execution_params.parallel_count,
+        "parallel_exec_index": parallel_execution_params.parallel_exec_index,
+        "page_record_count": parallel_execution_params.page_record_count,
+    }
+    checkpoint = (
+        session.query(PackageCloudCollectionCheckpoint)
+        .filter_by(**checkpoint_key)
+        .first()
+    )
+    if checkpoint is None:
+        checkpoint = PackageCloudCollectionCheckpoint(
+            **checkpoint_key, is_completed=False, update_time=datetime.now()
+        )
+        session.add(checkpoint)
+        session.commit()
+    return checkpoint
+
+
+def shard_page_indexes(
+    repo_package_count: int, parallel_execution_params: ParallelExecutionParams
+) -> List[int]:
+    """Returns the page indexes assigned to the given parallel execution index. Pages are striped across parallel
+    executions i.e. execution with index 0 gets pages 1, 1 + parallel_count, 1 + 2 * parallel_count ...
+    """
+    page_indexes = []
+    page_index = parallel_execution_params.parallel_exec_index + 1
+    while is_page_in_range(
+        page_index, repo_package_count, parallel_execution_params.page_record_count
+    ):
+        page_indexes.append(page_index)
+        page_index = page_index + parallel_execution_params.parallel_count
+    return page_indexes
+
+
+def fetch_package_list_page(
+    package_cloud_params: PackageCloudParams,
+    page_index: int,
+    page_record_count: int,
+    request_log_writer: RequestLogWriter,
+) -> List[Dict[str, Any]]:
+    result = stat_get_request(
+        package_list_with_pagination_request_address(
+            package_cloud_params,
+            page_index,
+            page_record_count,
+        ),
+        RequestType.package_cloud_list_package,
+        None,
+        request_log_writer,
+    )
+    return json.loads(result.content)
 
 
 def fetch_and_save_package_stats(
@@ -180,50 +852,83 @@ def fetch_and_save_package_stats(
     repo_name: PackageCloudRepo,
 ):
     """Gets and saves the package statistics of the given packages"""
+    download_stats = fetch_package_download_stats(
+        package_info, package_cloud_api_token, session
+    )
+    stats_buffer = BulkInsertBuffer(session, PackageCloudDownloadStats)
+    save_package_stats(
+        package_info,
+        download_stats,
+        stats_buffer,
+        save_records_with_download_count_zero,
+        repo_name,
+        existing_stat_keys([package_info], session),
+    )
+    stats_buffer.flush()
+
+
+def fetch_package_download_stats(
+    package_info,
+    package_cloud_api_token: str,
+    session,
+    request_log_writer: Optional[RequestLogWriter] = None,
+    base_url: str = PC_BASE_URL,
+) -> Dict[str, Any]:
     request_result = stat_get_request(
         package_statistics_request_address(
-            package_cloud_api_token, package_info["downloads_series_url"]
+            package_cloud_api_token, package_info["downloads_series_url"], base_url
         ),
         RequestType.package_cloud_download_series_query,
         session,
+        request_log_writer,
     )
     if request_result.status_code != HTTPStatus.OK:
         raise ValueError(
             f"Error while getting package stat for package {package_info['filename']}"
         )
-    download_stats = json.loads(request_result.content)
-    for stat_date in download_stats["value"]:
-        download_date = datetime.strptime(stat_date, PC_DOWNLOAD_DATE_FORMAT).date()
-        download_count = int(download_stats["value"][stat_date])
+    return json.loads(request_result.content)
+
+
+# pylint: disable=too-many-arguments
+def save_package_stats(
+    package_info,
+    download_stats: Dict[str, Any],
+    stats_buffer: BulkInsertBuffer,
+    save_records_with_download_count_zero: bool,
+    repo_name: PackageCloudRepo,
+    stat_keys: Set[StatKey],
+):
+    """Saves the download series of the given package. stat_keys should include the keys of the stat records
+    already saved for the package and it is updated with the keys of the added records
+    """
+    if is_ignored_package(package_info["name"]):
+        return
+    today = date.today()
+    package_row = package_record_values(package_info, repo_name)
+    package_row["detail_url"] = package_info["downloads_detail_url"]
+    for stat_date, download_count in download_stats["value"].items():
+        download_date = parse_download_date(stat_date)
+        download_count = int(download_count)
+        stat_key = (
+            download_date,
+            package_info["filename"],
+            package_info["distro_version"],
+        )
         if (
-            download_date != date.today()
-            and not is_ignored_package(package_info["name"])
-            and not stat_records_exists(
-                download_date,
-                package_info["filename"],
-                package_info["distro_version"],
-                session,
-            )
+            download_date != today
+            and stat_key not in stat_keys
             and is_download_count_eligible_for_save(
                 download_count, save_records_with_download_count_zero
             )
         ):
-            pc_stats = PackageCloudDownloadStats(
-                fetch_date=datetime.now(),
-                repo=repo_name,
-                package_full_name=package_info["filename"],
-                package_name=package_info["name"],
-                distro_version=package_info["distro_version"],
-                package_version=package_info["version"],
-                package_release=package_info["release"],
-                package_type=package_info["type"],
-                epoch=package_info["epoch"],
-                download_date=download_date,
-                download_count=download_count,
-                detail_url=package_info["downloads_detail_url"],
+            stats_buffer.add(
+                {
+                    **package_row,
+                    "download_date": download_date,
+                    "download_count": download_count,
+                }
             )
-
-            session.add(pc_stats)
+            stat_keys.add(stat_key)
 
 
 def fetch_and_save_package_download_details(
@@ -232,85 +937,269 @@ def fetch_and_save_package_download_details(
     session,
     repo_name: PackageCloudRepo,
 ):
+    download_details = iter_package_download_details(
+        package_info, package_cloud_admin_api_token, session
+    )
+    details_buffer = BulkInsertBuffer(session, PackageCloudDownloadDetails)
+    save_package_download_details(
+        package_info,
+        download_details,
+        details_buffer,
+        repo_name,
+        existing_stat_keys([package_info], session),
+    )
+    details_buffer.flush()
+
+
+def fetch_package_download_details(
+    package_info,
+    package_cloud_admin_api_token: str,
+    session,
+    watermark: Optional[datetime] = None,
+    request_log_writer: Optional[RequestLogWriter] = None,
+    page_record_count: int = DEFAULT_DETAIL_PAGE_RECORD_COUNT,
+    base_url: str = PC_BASE_URL,
+) -> List[Dict[str, Any]]:
+    """Fetches the download details of the given package page by page. If watermark i.e. the last download time
+    already saved for the package is given, only the details downloaded after the watermark are fetched
+    """
     print(
         f"Download Detail Query for {package_info['filename']}: {package_info['downloads_detail_url']}"
     )
+    all_download_details = []
     page_number = 1
-    record_count = DEFAULT_PAGE_RECORD_COUNT
-    while record_count == DEFAULT_PAGE_RECORD_COUNT:
+    record_count = page_record_count
+    while record_count == page_record_count:
         request_result = stat_get_request(
             package_statistics_detail_request_address(
                 package_cloud_admin_api_token,
                 package_info["downloads_detail_url"],
-                DEFAULT_PAGE_RECORD_COUNT,
+                page_record_count,
                 page_number,
+                watermark.date() if watermark else None,
+                base_url,
             ),
             RequestType.package_cloud_detail_query,
             session,
+            request_log_writer,
         )
         page_number = page_number + 1
-        if request_result.status_code != HTTPStatus.OK:
-            raise ValueError(
-                f"Error while calling detail query for package {package_info['filename']}. "
-                f"Error Code: {request_result.status_code}"
-            )
+        validate_detail_query_result(request_result, package_info)
         download_details = json.loads(request_result.content)
         record_count = len(download_details)
+        all_download_details.extend(
+            download_detail
+            for download_detail in download_details
+            if is_downloaded_after_watermark(download_detail, watermark)
+        )
+    return all_download_details
 
-        for download_detail in download_details:
-            downloaded_at = datetime.strptime(
-                download_detail["downloaded_at"], PC_DOWNLOAD_DETAIL_DATE_FORMAT
+
+def iter_package_download_details(
+    package_info,
+    package_cloud_admin_api_token: str,
+    session,
+    watermark: Optional[datetime] = None,
+    request_log_writer: Optional[RequestLogWriter] = None,
+    page_record_count: int = DEFAULT_DETAIL_PAGE_RECORD_COUNT,
+    base_url: str = PC_BASE_URL,
+) -> Iterator[Dict[str, Any]]:
+    """Streaming version of fetch_package_download_details. Each detail page is parsed incrementally while it is
+    downloaded and details are yielded one by one, so that neither the response body nor the parsed page is held
+    in memory. Response bodies of the detail queries are not logged in this mode
+    """
+    print(
+        f"Download Detail Stream for {package_info['filename']}: {package_info['downloads_detail_url']}"
+    )
+    page_number = 1
+    record_count = page_record_count
+    while record_count == page_record_count:
+        request_result = stat_get_request(
+            package_statistics_detail_request_address(
+                package_cloud_admin_api_token,
+                package_info["downloads_detail_url"],
+                page_record_count,
+                page_number,
+                watermark.date() if watermark else None,
+                base_url,
+            ),
+            RequestType.package_cloud_detail_query,
+            session,
+            request_log_writer,
+            stream=True,
+        )
+        page_number = page_number + 1
+        with request_result:
+            validate_detail_query_result(request_result, package_info)
+            # Decompresses gzip encoded responses while reading from the raw stream
+            request_result.raw.decode_content = True
+            record_count = 0
+            for download_detail in ijson.items(request_result.raw, "item"):
+                record_count = record_count + 1
+                if is_downloaded_after_watermark(download_detail, watermark):
+                    yield download_detail
+
+
+def validate_detail_query_result(request_result, package_info):
+    if request_result.status_code != HTTPStatus.OK:
+        raise ValueError(
+            f"Error while calling detail query for package {package_info['filename']}. "
+            f"Error Code: {request_result.status_code}"
+        )
+
+
+def is_downloaded_after_watermark(
+    download_detail: Dict[str, Any], watermark: Optional[datetime]
+) -> bool:
+    return (
+        not watermark
+        or parse_download_detail_time(download_detail["downloaded_at"]) > watermark
+    )
+
+
+@lru_cache(maxsize=4096)
+def parse_download_date(download_date: str) -> date:
+    """Parses the dates of download series. Dates repeat for every package, so parsed dates are cached"""
+    return datetime.strptime(download_date, PC_DOWNLOAD_DATE_FORMAT).date()
+
+
+def parse_download_detail_time(downloaded_at: str) -> datetime:
+    """Parses download times of the details. Fixed format of packagecloud i.e. 2023-01-01T10:20:30.000Z is parsed
+    with fromisoformat which is much faster than strptime. Other formats fall back to strptime
+    """
+    if len(downloaded_at) == PC_DOWNLOAD_DETAIL_DATE_LENGTH and downloaded_at.endswith(
+        PC_DOWNLOAD_DETAIL_DATE_SUFFIX
+    ):
+        try:
+            return datetime.fromisoformat(
+                downloaded_at[: -len(PC_DOWNLOAD_DETAIL_DATE_SUFFIX)]
+            )
+        except ValueError:
+            pass
+    return datetime.strptime(downloaded_at, PC_DOWNLOAD_DETAIL_DATE_FORMAT)
+
+
+def package_record_values(package_info, repo_name: PackageCloudRepo) -> Dict[str, Any]:
+    """Returns the column values shared by all the stat and detail records of the given package"""
+    return {
+        "fetch_date": datetime.now(),
+        "repo": repo_name,
+        "package_full_name": package_info["filename"],
+        "package_name": package_info["name"],
+        "distro_version": package_info["distro_version"],
+        "package_version": package_info["version"],
+        "package_release": package_info["release"],
+        "package_type": package_info["type"],
+        "epoch": package_info["epoch"],
+    }
+
+
+class PackageDownloadDetailSaver:
+    """Adds the download details of a package into the insert buffer one by one. Details are saved only for the
+    days whose stat records are not in stat_keys. last_downloaded_at is the last download time of the added
+    details before today, which could be used as watermark for the next detail fetch. Values shared by all the
+    details of the package are computed once"""
+
+    def __init__(
+        self,
+        package_info,
+        details_buffer: BulkInsertBuffer,
+        repo_name: PackageCloudRepo,
+        stat_keys: Set[StatKey],
+    ):
+        self.package_info = package_info
+        self.details_buffer = details_buffer
+        self.stat_keys = stat_keys
+        self.today = date.today()
+        self.is_ignored = is_ignored_package(package_info["name"])
+        self.package_full_name = package_info["filename"]
+        self.distro_version = package_info["distro_version"]
+        self.package_row = package_record_values(package_info, repo_name)
+        self.last_downloaded_at = None
+
+    def add(self, download_detail: Dict[str, Any]):
+        downloaded_at = parse_download_detail_time(download_detail["downloaded_at"])
+        download_date = downloaded_at.date()
+        if download_date == self.today:
+            return
+        if not self.last_downloaded_at or downloaded_at > self.last_downloaded_at:
+            self.last_downloaded_at = downloaded_at
+        if (
+            not self.is_ignored
+            and (download_date, self.package_full_name, self.distro_version)
+            not in self.stat_keys
+        ):
+            self.details_buffer.add(
+                {
+                    **self.package_row,
+                    "download_date": download_date,
+                    "downloaded_at": downloaded_at,
+                    "ip_address": download_detail["ip_address"],
+                    "user_agent": download_detail["user_agent"],
+                    "source": download_detail["source"],
+                    "read_token": download_detail["read_token"],
+                }
             )
-            download_date = downloaded_at.date()
-            if (
-                download_date != date.today()
-                and not is_ignored_package(package_info["name"])
-                and not stat_records_exists(
-                    download_date,
-                    package_info["filename"],
-                    package_info["distro_version"],
-                    session,
-                )
-            ):
-                download_detail_record = PackageCloudDownloadDetails(
-                    fetch_date=datetime.now(),
-                    repo=repo_name,
-                    package_full_name=package_info["filename"],
-                    package_name=package_info["name"],
-                    distro_version=package_info["distro_version"],
-                    package_version=package_info["version"],
-                    package_release=package_info["release"],
-                    package_type=package_info["type"],
-                    epoch=package_info["epoch"],
-                    download_date=download_date,
-                    downloaded_at=downloaded_at,
-                    ip_address=download_detail["ip_address"],
-                    user_agent=download_detail["user_agent"],
-                    source=download_detail["source"],
-                    read_token=download_detail["read_token"],
-                )
-                session.add(download_detail_record)
+
+
+def save_package_download_details(
+    package_info,
+    download_details: Iterable[Dict[str, Any]],
+    details_buffer: BulkInsertBuffer,
+    repo_name: PackageCloudRepo,
+    stat_keys: Set[StatKey],
+) -> Optional[datetime]:
+    """Saves the download details of the given package and returns the last download time of the details before
+    today. See PackageDownloadDetailSaver"""
+    detail_saver = PackageDownloadDetailSaver(
+        package_info, details_buffer, repo_name, stat_keys
+    )
+    for download_detail in download_details:
+        detail_saver.add(download_detail)
+    return detail_saver.last_downloaded_at
+
+
+def package_cloud_address(
+    package_cloud_api_token: str, path: str, base_url: str = PC_BASE_URL
+) -> str:
+    scheme, host = base_url.split("://", 1)
+    return f"{scheme}://{package_cloud_api_token}:@{host}/{path}"
 
 
 def package_statistics_request_address(
-    package_cloud_api_token: str, series_query_uri: str
+    package_cloud_api_token: str, series_query_uri: str, base_url: str = PC_BASE_URL
 ):
-    return f"https://{package_cloud_api_token}:@packagecloud.io/{series_query_uri}"
+    return package_cloud_address(package_cloud_api_token, series_query_uri, base_url)
 
 
 def package_statistics_detail_request_address(
-    package_cloud_api_token: str, detail_query_uri: str, per_page: int, page_number: int
+    package_cloud_api_token: str,
+    detail_query_uri: str,
+    per_page: int,
+    page_number: int,
+    start_date: Optional[date] = None,
+    base_url: str = PC_BASE_URL,
 ):
-    return f"https://{package_cloud_api_token}:@packagecloud.io/{detail_query_uri}?per_page={per_page}&page={page_number}"
+    start_date_parameter = (
+        f"&start_date={start_date.strftime(PC_DOWNLOAD_DATE_FORMAT)}"
+        if start_date
+        else ""
+    )
+    return package_cloud_address(
+        package_cloud_api_token,
+        f"{detail_query_uri}?per_page={per_page}&page={page_number}{start_date_parameter}",
+        base_url,
+    )
 
 
 def package_list_with_pagination_request_address(
     package_cloud_params: PackageCloudParams, page_index: int, page_record_count: int
 ) -> str:
-    return (
-        f"https://{package_cloud_params.standard_api_token}:@packagecloud.io/api/v1/repos/"
-        f"{package_cloud_params.organization.name}/{package_cloud_params.repo_name.value}"
-        f"/packages.json?per_page={page_record_count}&page={page_index}"
+    return package_cloud_address(
+        package_cloud_params.standard_api_token,
+        f"api/v1/repos/{package_cloud_params.organization.name}/{package_cloud_params.repo_name.value}"
+        f"/packages.json?per_page={page_record_count}&page={page_index}",
+        package_cloud_params.base_url,
     )
 
 
@@ -345,6 +1234,95 @@ def stat_records_exists(
     return db_record is not None
 
 
+def existing_stat_keys(
+    package_info_list: List[Dict[str, Any]], session
+) -> Set[StatKey]:
+    """Returns (download_date, package_full_name, distro_version) keys of all the stat records saved for the given
+    packages using a single query, so that existence checks can be done in memory"""
+    if not package_info_list:
+        return set()
+    package_full_names = {
+        package_info["filename"] for package_info in package_info_list
+    }
+    distro_versions = {
+        package_info["distro_version"] for package_info in package_info_list
+    }
+    db_records = session.query(
+        PackageCloudDownloadStats.download_date,
+        PackageCloudDownloadStats.package_full_name,
+        PackageCloudDownloadStats.distro_version,
+    ).filter(
+        PackageCloudDownloadStats.package_full_name.in_(package_full_names),
+        PackageCloudDownloadStats.distro_version.in_(distro_versions),
+    )
+    return {tuple(db_record) for db_record in db_records}
+
+
+def watermark_key(package_info) -> Tuple[str, str]:
+    return package_info["filename"], package_info["distro_version"]
+
+
+def detail_watermarks(
+    package_info_list: List[Dict[str, Any]], repo_name: PackageCloudRepo, session
+) -> Dict[Tuple[str, str], datetime]:
+    """Returns the detail watermarks of the given packages keyed by (package_full_name, distro_version)"""
+    if not package_info_list:
+        return {}
+    package_full_names = {
+        package_info["filename"] for package_info in package_info_list
+    }
+    db_records = session.query(PackageCloudDetailWatermark).filter(
+        PackageCloudDetailWatermark.repo == repo_name,
+        PackageCloudDetailWatermark.package_full_name.in_(package_full_names),
+    )
+    return {
+        (
+            db_record.package_full_name,
+            db_record.distro_version,
+        ): db_record.last_downloaded_at
+        for db_record in db_records
+    }
+
+
+def save_detail_watermarks(
+    watermarks: Dict[Tuple[str, str], datetime], repo_name: PackageCloudRepo, session
+):
+    if not watermarks:
+        return
+    update_time = datetime.now()
+    statement = postgresql.insert(PackageCloudDetailWatermark).values(
+        [
+            {
+                "repo": repo_name,
+                "package_full_name": package_full_name,
+                "distro_version": distro_version,
+                "last_downloaded_at": last_downloaded_at,
+                "update_time": update_time,
+            }
+            for (
+                package_full_name,
+                distro_version,
+            ), last_downloaded_at in watermarks.items()
+        ]
+    )
+    session.execute(
+        statement.on_conflict_do_update(
+            index_elements=[
+                PackageCloudDetailWatermark.repo,
+                PackageCloudDetailWatermark.package_full_name,
+                PackageCloudDetailWatermark.distro_version,
+            ],
+            set_={
+                "last_downloaded_at": sqlalchemy.func.greatest(
+                    PackageCloudDetailWatermark.last_downloaded_at,
+                    statement.excluded.last_downloaded_at,
+                ),
+                "update_time": statement.excluded.update_time,
+            },
+        )
+    )
+
+
 def detail_records_exists(
     downloaded_at: datetime,
     ip_address: str,
@@ -398,6 +1376,71 @@ if __name__ == "__main__":
     parser.add_argument(
         "--page_record_count", type=int, choices=range(5, 101), required=True, default=0
     )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        choices=range(1, 65),
+        required=False,
+        default=DEFAULT_CONCURRENCY,
+    )
+    parser.add_argument(
+        "--insert_batch_size",
+        type=int,
+        required=False,
+        default=DEFAULT_INSERT_BATCH_SIZE,
+    )
+    parser.add_argument(
+        "--request_log_response_mode",
+        choices=[m.name for m in RequestLogResponseMode],
+        required=False,
+        default=RequestLogResponseMode.full.name,
+    )
+    parser.add_argument(
+        "--scheduling_mode",
+        choices=[m.value for m in SchedulingMode],
+        required=False,
+        default=SchedulingMode.stride.value,
+        help="stride assigns pages to parallel executions statically. work_queue lets parallel executions claim "
+        "pages from a queue table in the stats database, so that executions finishing early take over the "
+        "remaining pages",
+    )
+    parser.add_argument(
+        "--work_item_claim_timeout_minutes",
+        type=int,
+        required=False,
+        default=DEFAULT_WORK_ITEM_CLAIM_TIMEOUT_MINUTES,
+        help="Pages claimed from the work queue are claimed again by the other executions if their claims are not "
+        "refreshed within this period. Claims are refreshed while the pages are processed",
+    )
+    parser.add_argument(
+        "--detail_page_record_count",
+        type=int,
+        required=False,
+        default=DEFAULT_DETAIL_PAGE_RECORD_COUNT,
+        help="Number of download details requested in a single detail query",
+    )
+    parser.add_argument(
+        "--stream_detail_pages",
+        action="store_true",
+        help="Parse download detail pages incrementally to keep memory usage independent of the detail page size",
+    )
+    parser.add_argument(
+        "--fetch_unchanged_package_details",
+        action="store_true",
+        help="Query download details of all the packages even if their download series do not have new downloads",
+    )
+    parser.add_argument(
+        "--max_requests_per_second",
+        type=float,
+        required=False,
+        help="Upper limit of the packagecloud request rate shared by all the concurrent requests. Rate is "
+        "adjusted automatically below this limit when packagecloud throttles the requests",
+    )
+    parser.add_argument(
+        "--ignore_checkpoint",
+        action="store_true",
+        help="Process all the pages even if the collection was interrupted or completed earlier today",
+    )
     parser.add_argument("--is_test", action="store_true")
 
     arguments = parser.parse_args()
@@ -419,11 +1462,34 @@ if __name__ == "__main__":
         parallel_count=arguments.parallel_count,
         parallel_exec_index=arguments.parallel_exec_index,
         page_record_count=DEFAULT_PAGE_RECORD_COUNT,
+        concurrency=arguments.concurrency,
+        scheduling_mode=SchedulingMode(arguments.scheduling_mode),
+        work_item_claim_timeout=timedelta(
+            minutes=arguments.work_item_claim_timeout_minutes
+        ),
     )
 
+    # Each concurrent request should be able to keep its connection alive in the pool
+    configure_http_session(
+        HttpSessionParams(pool_size=max(arguments.concurrency, DEFAULT_HTTP_POOL_SIZE))
+    )
+    if arguments.max_requests_per_second:
+        configure_rate_limiter(
+            PC_HOST, RateLimiter(max_rate=arguments.max_requests_per_second)
+        )
     fetch_and_save_package_cloud_stats(
         db_parameters,
         package_cloud_params=package_cloud_parameters,
         parallel_execution_params=parallel_execution_params,
         is_test=arguments.is_test,
+        insert_batch_size=arguments.insert_batch_size,
+        request_log_response_mode=RequestLogResponseMode[
+            arguments.request_log_response_mode
+        ],
+        resume_from_checkpoint=not arguments.ignore_checkpoint,
+        detail_query_params=DetailQueryParams(
+            page_record_count=arguments.detail_page_record_count,
+            stream_pages=arguments.stream_detail_pages,
+            skip_unchanged_packages=not arguments.fetch_unchanged_package_details,
+        ),
     )
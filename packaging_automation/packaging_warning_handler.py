@@ -1,8 +1,9 @@
+import functools
 import os
 import re
 import sys
 from enum import Enum
-from typing import List, Tuple
+from typing import Dict, List, Optional, Tuple
 
 import yaml
 
@@ -12,6 +13,16 @@ from .common_tool_methods import (
     DEFAULT_UNICODE_ERROR_HANDLER,
 )
 
+RPM_WARNING_SUMMARY = re.compile(
+    r"\d+ packages and \d+ specfiles checked; \d+ errors, \d+ warnings."
+)
+RPM_LINTIAN_STARTER = 'Executing "/usr/bin/rpmlint -f /rpmlintrc'
+DEBIAN_LINTIAN_STARTER = "Now running lintian"
+LINTIAN_WARNING_ERROR_PATTERN = re.compile(r".*: [W|E]: .*")
+# Patterns with backreferences or global inline flags are matched separately, since group numbers change and the
+# flags would apply to all the patterns when they are combined
+UNCOMBINABLE_PATTERN = re.compile(r"\\[1-9]|\(\?P=|\(\?[aiLmsux]+\)")
+
 
 class PackagingWarningIgnoreType(Enum):
     base = 1
@@ -20,88 +31,133 @@ class PackagingWarningIgnoreType(Enum):
 
 
 def validate_output(output: str, ignore_file_path: str, package_type: PackageType):
-    base_ignore_list, package_type_specific_ignore_list = parse_ignore_lists(
-        ignore_file_path, package_type
-    )
+    output_validator = OutputValidator(ignore_file_path, package_type)
+    for output_line in output.splitlines():
+        output_validator.add_line(output_line)
+    output_validator.check()
 
-    print(f"Package type specific ignore list:{package_type_specific_ignore_list}")
-    print(f"Base ignore list:{base_ignore_list}")
 
-    output_lines = output.splitlines()
-    warning_lines, package_type_specific_warning_lines = filter_warning_lines(
-        output_lines, package_type
-    )
-    print("Checking build output for warnings")
-    print("Package Type:" + package_type.name)
-    print(f"Package type specific warnings:{package_type_specific_warning_lines}")
+class OutputValidator:
+    """Incremental version of validate_output. Lines of the build output are checked while they are added, so that
+    the build can be stopped at the first warning which is not ignored"""
 
-    base_warnings_to_be_raised = get_warnings_to_be_raised(
-        base_ignore_list, warning_lines
-    )
-    package_type_specific_warnings_to_be_raised = get_warnings_to_be_raised(
-        package_type_specific_ignore_list, package_type_specific_warning_lines
-    )
+    def __init__(self, ignore_file_path: str, package_type: PackageType):
+        self.package_type = package_type
+        (
+            self.base_ignore_list,
+            self.package_type_specific_ignore_list,
+        ) = parse_ignore_lists(ignore_file_path, package_type)
+        self.base_ignore_matcher = ignore_matcher(tuple(self.base_ignore_list))
+        self.package_type_specific_ignore_matcher = ignore_matcher(
+            tuple(self.package_type_specific_ignore_list)
+        )
+        self.warning_line_filter = WarningLineFilter(package_type)
+        self.package_type_specific_warning_lines = []
+        self.base_warnings_to_be_raised = []
+        self.package_type_specific_warnings_to_be_raised = []
 
-    print(
-        f"Package type specific warnings to be raised:{package_type_specific_warnings_to_be_raised}"
-    )
-    print(f"Base warnings to be raised:{base_warnings_to_be_raised}")
-
-    if (
-        len(base_warnings_to_be_raised) > 0
-        or len(package_type_specific_warnings_to_be_raised) > 0
-    ):
-        error_message = get_error_message(
-            base_warnings_to_be_raised,
-            package_type_specific_warnings_to_be_raised,
-            package_type,
+        print(
+            f"Package type specific ignore list:{self.package_type_specific_ignore_list}"
+        )
+        print(f"Base ignore list:{self.base_ignore_list}")
+
+    def add_line(self, output_line: str) -> bool:
+        """Returns whether the line is a warning to be raised"""
+        warning_type = self.warning_line_filter.classify(output_line)
+        if warning_type is None:
+            return False
+        if warning_type == PackagingWarningIgnoreType.base:
+            if self.base_ignore_matcher.matches(output_line):
+                return False
+            self.base_warnings_to_be_raised.append(output_line)
+        else:
+            self.package_type_specific_warning_lines.append(output_line)
+            if self.package_type_specific_ignore_matcher.matches(output_line):
+                return False
+            self.package_type_specific_warnings_to_be_raised.append(output_line)
+        return True
+
+    def has_warnings_to_be_raised(self) -> bool:
+        return (
+            len(self.base_warnings_to_be_raised) > 0
+            or len(self.package_type_specific_warnings_to_be_raised) > 0
+        )
+
+    def check(self):
+        """Exits if any of the added lines is a warning to be raised"""
+        print("Checking build output for warnings")
+        print("Package Type:" + self.package_type.name)
+        print(
+            f"Package type specific warnings:{self.package_type_specific_warning_lines}"
+        )
+        print(
+            f"Package type specific warnings to be raised:{self.package_type_specific_warnings_to_be_raised}"
+        )
+        print(f"Base warnings to be raised:{self.base_warnings_to_be_raised}")
+
+        if self.has_warnings_to_be_raised():
+            error_message = get_error_message(
+                self.base_warnings_to_be_raised,
+                self.package_type_specific_warnings_to_be_raised,
+                self.package_type,
+            )
+            print(f"Build output check failed. Error Message: \n{error_message}")
+            sys.exit(1)
+        else:
+            print("Build output check completed succesfully. No warnings")
+
+
+class WarningLineFilter:
+    """Incremental version of filter_warning_lines, which keeps whether the lines following a lintian starter line
+    are lintian output"""
+
+    def __init__(self, package_type: PackageType):
+        self.package_type = package_type
+        self.is_deb_warning_line = False
+        self.is_rpm_warning_line = False
+
+    def classify(self, output_line: str) -> Optional[PackagingWarningIgnoreType]:
+        """Returns base for the base warnings, debian or rpm for the package type specific warnings and None for
+        the other lines"""
+        package_specific_warning_type = (
+            PackagingWarningIgnoreType.debian
+            if self.package_type == PackageType.deb
+            else PackagingWarningIgnoreType.rpm
         )
-        print(f"Build output check failed. Error Message: \n{error_message}")
-        sys.exit(1)
-    else:
-        print("Build output check completed succesfully. No warnings")
+        if self.package_type == PackageType.deb:
+            if DEBIAN_LINTIAN_STARTER in output_line:
+                self.is_deb_warning_line = True
+            elif "warning" in output_line.lower() or self.is_deb_warning_line:
+                if not self.is_deb_warning_line:
+                    return PackagingWarningIgnoreType.base
+                if LINTIAN_WARNING_ERROR_PATTERN.match(output_line):
+                    return package_specific_warning_type
+                self.is_deb_warning_line = False
+        else:
+            if RPM_LINTIAN_STARTER in output_line:
+                self.is_rpm_warning_line = True
+            elif "warning" in output_line.lower() or self.is_rpm_warning_line:
+                if self.is_rpm_warning_line and RPM_WARNING_SUMMARY.match(output_line):
+                    self.is_rpm_warning_line = False
+                    return None
+                if LINTIAN_WARNING_ERROR_PATTERN.match(output_line):
+                    return package_specific_warning_type
+                return PackagingWarningIgnoreType.base
+        return None
 
 
 def filter_warning_lines(
     output_lines: List[str], package_type: PackageType
 ) -> Tuple[List[str], List[str]]:
-    rpm_warning_summary = (
-        r"\d+ packages and \d+ specfiles checked; \d+ errors, \d+ warnings."
-    )
-    rpm_lintian_starter = 'Executing "/usr/bin/rpmlint -f /rpmlintrc'
-    debian_lintian_starter = "Now running lintian"
-    lintian_warning_error_pattern = r".*: [W|E]: .*"
-
     base_warning_lines = []
     package_specific_warning_lines = []
-    is_deb_warning_line = False
-    is_rpm_warning_line = False
+    warning_line_filter = WarningLineFilter(package_type)
     for output_line in output_lines:
-        if package_type == PackageType.deb:
-            if debian_lintian_starter in output_line:
-                is_deb_warning_line = True
-            elif "warning" in output_line.lower() or is_deb_warning_line:
-                if is_deb_warning_line:
-                    match = re.match(lintian_warning_error_pattern, output_line)
-                    if match:
-                        package_specific_warning_lines.append(output_line)
-                    else:
-                        is_deb_warning_line = False
-                else:
-                    base_warning_lines.append(output_line)
-        else:
-            if rpm_lintian_starter in output_line:
-                is_rpm_warning_line = True
-            elif "warning" in output_line.lower() or is_rpm_warning_line:
-                if is_rpm_warning_line and re.match(rpm_warning_summary, output_line):
-                    is_rpm_warning_line = False
-                    continue
-                if re.match(lintian_warning_error_pattern, output_line):
-                    package_specific_warning_lines.append(output_line)
-                else:
-                    base_warning_lines.append(output_line)
-            else:
-                continue
+        warning_type = warning_line_filter.classify(output_line)
+        if warning_type == PackagingWarningIgnoreType.base:
+            base_warning_lines.append(output_line)
+        elif warning_type is not None:
+            package_specific_warning_lines.append(output_line)
 
     return base_warning_lines, package_specific_warning_lines
 
@@ -114,34 +170,74 @@ def parse_ignore_lists(ignore_file_path: str, package_type: PackageType):
         else PackagingWarningIgnoreType.rpm
     )
     package_type_specific_ignore_list = []
+    yaml_content = read_ignore_file(
+        ignore_file_path, os.stat(ignore_file_path).st_mtime_ns
+    )
+    # lists are copied since the parsed file is shared by the callers
+    if PackagingWarningIgnoreType.base.name in yaml_content:
+        base_ignore_list = list(yaml_content[PackagingWarningIgnoreType.base.name])
+    if packaging_warning_type.name in yaml_content:
+        package_type_specific_ignore_list = list(
+            yaml_content[packaging_warning_type.name]
+        )
+
+    return base_ignore_list, package_type_specific_ignore_list
+
+
+@functools.lru_cache(maxsize=None)
+def read_ignore_file(ignore_file_path: str, _modification_time: int) -> Dict:
+    """Parses the ignore file once for each modification time of the file. Modification time is not used in the
+    function and only invalidates the cached content when the file changes"""
     with open(
         ignore_file_path,
         "r",
         encoding=DEFAULT_ENCODING_FOR_FILE_HANDLING,
         errors=DEFAULT_UNICODE_ERROR_HANDLER,
     ) as reader:
-        yaml_content = yaml.load(reader, yaml.BaseLoader)
-    if PackagingWarningIgnoreType.base.name in yaml_content:
-        base_ignore_list = yaml_content[PackagingWarningIgnoreType.base.name]
-    if packaging_warning_type.name in yaml_content:
-        package_type_specific_ignore_list = yaml_content[packaging_warning_type.name]
+        return yaml.load(reader, yaml.BaseLoader)
 
-    return base_ignore_list, package_type_specific_ignore_list
+
+class IgnoreMatcher:
+    """Matches the lines against all the patterns of an ignore list with a single regex, which is equivalent to
+    matching them with each pattern one by one"""
+
+    def __init__(self, ignore_list: Tuple[str, ...]):
+        separate_patterns = [
+            pattern for pattern in ignore_list if UNCOMBINABLE_PATTERN.search(pattern)
+        ]
+        combined_patterns = [
+            pattern for pattern in ignore_list if pattern not in separate_patterns
+        ]
+        self.combined_pattern = None
+        if combined_patterns:
+            try:
+                self.combined_pattern = re.compile(
+                    "|".join(f"(?:{pattern})" for pattern in combined_patterns)
+                )
+            except re.error:
+                separate_patterns = list(ignore_list)
+        self.separate_patterns = [re.compile(pattern) for pattern in separate_patterns]
+
+    def matches(self, line: str) -> bool:
+        if self.combined_pattern is not None and self.combined_pattern.match(line):
+            return True
+        return any(pattern.match(line) for pattern in self.separate_patterns)
+
+
+@functools.lru_cache(maxsize=None)
+def ignore_matcher(ignore_list: Tuple[str, ...]) -> IgnoreMatcher:
+    return IgnoreMatcher(ignore_list)
 
 
 def get_warnings_to_be_raised(
     ignore_list: List[str], warning_lines: List[str]
 ) -> List[str]:
-    warnings_to_be_raised = []
-    for warning_line in warning_lines:
-        has_ignore_match = False
-        for ignore_line in ignore_list:
-            if re.match(ignore_line, warning_line):
-                has_ignore_match = True
-                break
-        if not has_ignore_match:
-            warnings_to_be_raised.append(warning_line)
-    return warnings_to_be_raised
+    matcher = ignore_matcher(tuple(ignore_list))
+    return [
+        warning_line
+        for warning_line in warning_lines
+        if not matcher.matches(warning_line)
+    ]
 
 
 def get_error_message(
@@ -1,25 +1,14 @@
-from sqlalchemy import Column, Integer, String, Date
+from concurrent.futures import ThreadPoolExecutor
+from sqlalchemy import Column, Integer, String, Date, Index, text
+from sqlalchemy.dialects import postgresql
 from datetime import date, datetime
+from typing import Any, Dict, List, Optional, Tuple
 import pypistats
 import json
 from .dbconfig import Base, DbParams, db_session
 import os
 
-
-# Define the database connection
-db_name = os.getenv(
-    "DB_NAME",
-)
-db_user = os.getenv("DB_USER_NAME")
-db_password = os.getenv("DB_PASSWORD")
-db_host_and_port = os.getenv("DB_HOST_AND_PORT")
-
-db_params = DbParams(
-    user_name=db_user,
-    password=db_password,
-    host_and_port=db_host_and_port,
-    db_name=db_name,
-)
+DEFAULT_CONCURRENCY = 4
 
 
 # Define the model for the download numbers
@@ -31,53 +20,133 @@ class DownloadNumbers(Base):
     library_name = Column(String)
     download_count = Column(String)
     download_date = Column(Date)
+    __table_args__ = (
+        Index(
+            "ux_pypi_downloads_library_name_download_date",
+            "library_name",
+            "download_date",
+            unique=True,
+        ),
+    )
 
 
 packages = ["django-multitenant"]
 
 
-def fetch_download_numbers(package_name):
+def deduplicate_download_numbers(conn):
+    """Keeps only the last fetched record of each library and date, so that the unique index of the upserts can be
+    created on the tables having a record for each distinct download count of a date"""
+    if conn.execute(
+        text("SELECT to_regclass(:table_name)"),
+        {"table_name": DownloadNumbers.__tablename__},
+    ).scalar():
+        conn.execute(
+            text(
+                f"DELETE FROM {DownloadNumbers.__tablename__} older USING {DownloadNumbers.__tablename__} newer "
+                f"WHERE older.library_name = newer.library_name AND older.download_date = newer.download_date "
+                f"AND older.id < newer.id"
+            )
+        )
+
+
+def save_download_numbers(
+    package_name: str, download_numbers: List[Dict[str, Any]], session
+) -> Tuple[int, int]:
+    """Upserts the daily download counts of the package, whose records are missing or have a different count, with
+    a single statement and returns the number of new and updated records. Existing counts are loaded with a
+    single query"""
+    saved_download_counts = dict(
+        session.query(DownloadNumbers.download_date, DownloadNumbers.download_count)
+        .filter(DownloadNumbers.library_name == package_name)
+        .all()
+    )
+    # Last count is kept if a date is returned more than once, since a row cannot be upserted twice in a statement
+    download_counts = {
+        date.fromisoformat(downloads["date"]): str(downloads["downloads"])
+        for downloads in download_numbers
+    }
+    changed_download_counts = {
+        download_date: download_count
+        for download_date, download_count in download_counts.items()
+        if saved_download_counts.get(download_date) != download_count
+    }
+    if changed_download_counts:
+        fetch_date = date.today()
+        statement = postgresql.insert(DownloadNumbers).values(
+            [
+                {
+                    "fetch_date": fetch_date,
+                    "library_name": package_name,
+                    "download_count": download_count,
+                    "download_date": download_date,
+                }
+                for download_date, download_count in changed_download_counts.items()
+            ]
+        )
+        session.execute(
+            statement.on_conflict_do_update(
+                index_elements=[
+                    DownloadNumbers.library_name,
+                    DownloadNumbers.download_date,
+                ],
+                set_={
+                    "fetch_date": statement.excluded.fetch_date,
+                    "download_count": statement.excluded.download_count,
+                },
+            )
+        )
+    session.commit()
+    new_record_count = len(changed_download_counts.keys() - saved_download_counts)
+    return new_record_count, len(changed_download_counts) - new_record_count
+
+
+def fetch_download_numbers(package_name, db_params: DbParams, is_test: bool = False):
     print(
         f"Fetching download numbers for {package_name} from pypi.org. Started at {datetime.now()}"
     )
     download_numbers = json.loads(
         pypistats.overall(package_name, format="json", mirrors=True, total=True)
     )
-    session = db_session(db_params=db_params, is_test=False, create_db_objects=True)
+    session = db_session(db_params=db_params, is_test=is_test)
     print(
-        f"{len(download_numbers['data'])} records fetched from pypi.org. Starting to add to database. Started at {datetime.now()}"
+        f"{len(download_numbers['data'])} records fetched from pypi.org for {package_name}. Starting to add to "
+        f"database. Started at {datetime.now()}"
     )
 
-    new_record_count = 0
-    existing_record_count = 0
-    for downloads in download_numbers["data"]:
-        existing_record = (
-            session.query(DownloadNumbers)
-            .filter_by(
-                library_name=package_name,
-                download_count=downloads["downloads"],
-                download_date=downloads["date"],
-            )
-            .first()
-        )
-        if not existing_record:
-            new_record_count += 1
-            print(f"Adding {package_name} {downloads['downloads']} {downloads['date']}")
-            record = DownloadNumbers(
-                fetch_date=date.today(),
-                library_name=package_name,
-                download_count=downloads["downloads"],
-                download_date=downloads["date"],
-            )
-            session.add(record)
-        else:
-            existing_record_count += 1
-
-    session.commit()
+    new_record_count, updated_record_count = save_download_numbers(
+        package_name, download_numbers["data"], session
+    )
+    session.close()
     print(
-        f"Process finished. New records: {new_record_count} Existing records: {existing_record_count}. Finished at {datetime.now()}"
+        f"Process finished for {package_name}. New records: {new_record_count} Updated records: "
+        f"{updated_record_count}. Finished at {datetime.now()}"
     )
 
 
-for package_name in packages:
-    fetch_download_numbers(package_name)
+def fetch_and_save_pypi_stats(
+    db_params: DbParams,
+    is_test: bool = False,
+    package_names: Optional[List[str]] = None,
+    concurrency: int = DEFAULT_CONCURRENCY,
+):
+    """Fetches and saves the download numbers of the packages concurrently"""
+    package_names = packages if package_names is None else package_names
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        futures = [
+            executor.submit(fetch_download_numbers, package_name, db_params, is_test)
+            for package_name in package_names
+        ]
+        for future in futures:
+            future.result()
+
+
+if __name__ == "__main__":
+    # Define the database connection
+    fetch_and_save_pypi_stats(
+        DbParams(
+            user_name=os.getenv("DB_USER_NAME"),
+            password=os.getenv("DB_PASSWORD"),
+            host_and_port=os.getenv("DB_HOST_AND_PORT"),
+            db_name=os.getenv("DB_NAME"),
+        )
+    )
@@ -0,0 +1,79 @@
+import argparse
+from datetime import datetime, timedelta
+from typing import List, Tuple
+
+from sqlalchemy import func
+
+from .dbconfig import DbParams, RequestLog, db_session
+
+DEFAULT_REPORT_DAYS = 7
+LATENCY_PERCENTILES = (0.5, 0.95, 0.99)
+
+
+def request_latency_stats(session, since: datetime) -> List[Tuple]:
+    """Returns request count, latency percentiles in milliseconds, total response size and total retry count of
+    the requests executed after the given time, grouped by request type"""
+    return (
+        session.query(
+            RequestLog.request_type,
+            func.count(RequestLog.id),
+            *[
+                func.percentile_cont(percentile).within_group(RequestLog.duration_ms)
+                for percentile in LATENCY_PERCENTILES
+            ],
+            func.sum(RequestLog.response_size),
+            func.sum(RequestLog.retry_count),
+        )
+        .filter(RequestLog.request_time >= since, RequestLog.duration_ms.isnot(None))
+        .group_by(RequestLog.request_type)
+        .order_by(RequestLog.request_type)
+        .all()
+    )
+
+
+def format_latency_report(latency_stats: List[Tuple]) -> str:
+    header = ("Request Type", "Count", "p50 ms", "p95 ms", "p99 ms", "Bytes", "Retries")
+    rows = [header] + [
+        (
+            request_type.name if request_type else "",
+            str(count),
+            *[f"{percentile_value:.0f}" for percentile_value in percentile_values],
+            str(response_size or 0),
+            str(retry_count or 0),
+        )
+        for request_type, count, *percentile_values, response_size, retry_count in latency_stats
+    ]
+    column_widths = [max(len(row[i]) for row in rows) for i in range(len(header))]
+    return "\n".join(
+        "  ".join(
+            value.ljust(width) for value, width in zip(row, column_widths)
+        ).rstrip()
+        for row in rows
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--db_user_name", required=True)
+    parser.add_argument("--db_password", required=True)
+    parser.add_argument("--db_host_and_port", required=True)
+    parser.add_argument("--db_name", required=True)
+    parser.add_argument("--days", type=int, required=False, default=DEFAULT_REPORT_DAYS)
+    parser.add_argument("--is_test", action="store_true")
+
+    arguments = parser.parse_args()
+
+    db_parameters = DbParams(
+        user_name=arguments.db_user_name,
+        password=arguments.db_password,
+        host_and_port=arguments.db_host_and_port,
+        db_name=arguments.db_name,
+    )
+    report_session = db_session(db_params=db_parameters, is_test=arguments.is_test)
+    print(
+        format_latency_report(
+            request_latency_stats(
+                report_session, datetime.now() - timedelta(days=arguments.days)
+            )
+        )
+    )
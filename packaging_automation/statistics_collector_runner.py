@@ -0,0 +1,296 @@
+import argparse
+import sys
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from enum import Enum
+from functools import partial
+from typing import Callable, Dict, List, Optional, Tuple
+
+from attr import dataclass
+
+from .common_tool_methods import (
+    DEFAULT_HTTP_POOL_SIZE,
+    HttpSessionParams,
+    configure_http_session,
+)
+from .dbconfig import (
+    DEFAULT_DB_MAX_OVERFLOW,
+    DEFAULT_DB_POOL_SIZE,
+    DbParams,
+    DbPoolParams,
+    configure_db_pool,
+)
+from .docker_statistics_collector import (
+    docker_repositories,
+    fetch_and_store_docker_statistics,
+)
+from .github_statistics_collector import (
+    ORGANIZATION_NAME,
+    GithubRepos,
+    fetch_and_store_github_stats,
+)
+from .homebrew_statistics_collector import fetch_and_save_homebrew_stats
+from .migrate_stats_db import migrate_stats_db
+from .package_cloud_rollups import rollup_package_cloud_downloads
+from .package_cloud_statistics_collector import (
+    DEFAULT_CONCURRENCY,
+    DEFAULT_PAGE_RECORD_COUNT,
+    PackageCloudOrganization,
+    PackageCloudParams,
+    PackageCloudRepo,
+    ParallelExecutionParams,
+    fetch_and_save_package_cloud_stats,
+)
+from .pypi_stats_collector import fetch_and_save_pypi_stats
+
+
+class StatsSource(Enum):
+    docker = "docker"
+    github = "github"
+    homebrew = "homebrew"
+    pypi = "pypi"
+    package_cloud = "package_cloud"
+
+
+@dataclass
+class CollectorParams:
+    github_token: str = ""
+    package_cloud_api_token: str = ""
+    package_cloud_admin_api_token: str = ""
+    docker_repos: Tuple[str, ...] = ("citus",)
+    github_repos: Tuple[GithubRepos, ...] = tuple(GithubRepos)
+    package_cloud_repos: Tuple[PackageCloudRepo, ...] = (
+        PackageCloudRepo.community,
+        PackageCloudRepo.enterprise,
+    )
+    package_cloud_concurrency: int = DEFAULT_CONCURRENCY
+
+
+@dataclass
+class CollectionResult:
+    name: str
+    duration_seconds: float
+    error: Optional[BaseException] = None
+
+    @property
+    def succeeded(self) -> bool:
+        return self.error is None
+
+
+def collection_tasks(
+    sources: List[StatsSource],
+    db_params: DbParams,
+    collector_params: CollectorParams,
+    is_test: bool = False,
+) -> Dict[str, Callable[[], None]]:
+    """Returns the collection functions of the given sources keyed by collection name. Sources collected for
+    multiple repos are split into one collection per repo, so that they run concurrently as well
+    """
+    if StatsSource.github in sources and not collector_params.github_token:
+        raise ValueError("github_token is required to collect github statistics")
+    if StatsSource.package_cloud in sources and not (
+        collector_params.package_cloud_api_token
+        and collector_params.package_cloud_admin_api_token
+    ):
+        raise ValueError(
+            "package_cloud_api_token and package_cloud_admin_api_token are required to collect package cloud "
+            "statistics"
+        )
+
+    tasks = {}
+    if StatsSource.docker in sources:
+        for repo_name in collector_params.docker_repos:
+            tasks[f"docker/{repo_name}"] = partial(
+                fetch_and_store_docker_statistics,
+                repository_name=repo_name,
+                db_parameters=db_params,
+                is_test=is_test,
+            )
+    if StatsSource.github in sources:
+        for github_repo in collector_params.github_repos:
+            tasks[f"github/{github_repo.value}"] = partial(
+                fetch_and_store_github_stats,
+                organization_name=ORGANIZATION_NAME,
+                repo_name=github_repo.value,
+                db_parameters=db_params,
+                github_token=collector_params.github_token,
+                is_test=is_test,
+            )
+    if StatsSource.homebrew in sources:
+        tasks["homebrew"] = partial(
+            fetch_and_save_homebrew_stats, db_params=db_params, is_test=is_test
+        )
+    if StatsSource.pypi in sources:
+        tasks["pypi"] = partial(
+            fetch_and_save_pypi_stats, db_params=db_params, is_test=is_test
+        )
+    if StatsSource.package_cloud in sources:
+        for package_cloud_repo in collector_params.package_cloud_repos:
+            tasks[f"package_cloud/{package_cloud_repo.value}"] = partial(
+                fetch_and_save_package_cloud_stats,
+                db_params,
+                package_cloud_params=PackageCloudParams(
+                    admin_api_token=collector_params.package_cloud_admin_api_token,
+                    standard_api_token=collector_params.package_cloud_api_token,
+                    organization=PackageCloudOrganization.citusdata,
+                    repo_name=package_cloud_repo,
+                ),
+                parallel_execution_params=ParallelExecutionParams(
+                    parallel_count=1,
+                    parallel_exec_index=0,
+                    page_record_count=DEFAULT_PAGE_RECORD_COUNT,
+                    concurrency=collector_params.package_cloud_concurrency,
+                ),
+                is_test=is_test,
+            )
+    return tasks
+
+
+def run_collection(name: str, collection: Callable[[], None]) -> CollectionResult:
+    start = time.perf_counter()
+    try:
+        collection()
+    # Failure of a collection should not stop the other collections. Errors are reported after all of them end
+    except Exception as error:  # pylint: disable=broad-except
+        traceback.print_exc()
+        return CollectionResult(
+            name=name, duration_seconds=time.perf_counter() - start, error=error
+        )
+    return CollectionResult(name=name, duration_seconds=time.perf_counter() - start)
+
+
+def run_collections(tasks: Dict[str, Callable[[], None]]) -> List[CollectionResult]:
+    """Runs all the collections concurrently in threads of this process and returns their results in the order of
+    the given tasks. Collections share the database engines and the http session of the process
+    """
+    if not tasks:
+        return []
+    with ThreadPoolExecutor(max_workers=len(tasks)) as executor:
+        futures = [
+            executor.submit(run_collection, name, collection)
+            for name, collection in tasks.items()
+        ]
+        return [future.result() for future in futures]
+
+
+def format_collection_report(
+    results: List[CollectionResult], wall_time_seconds: float
+) -> str:
+    name_width = max([len("Total")] + [len(result.name) for result in results])
+    lines = [
+        f"{result.name.ljust(name_width)}  {'ok' if result.succeeded else 'failed':<6}  "
+        f"{result.duration_seconds:8.1f} s"
+        for result in results
+    ]
+    lines.append(f"{'Total'.ljust(name_width)}  {'':<6}  {wall_time_seconds:8.1f} s")
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Collects the statistics of the given sources concurrently in a single process"
+    )
+    parser.add_argument(
+        "--sources",
+        nargs="+",
+        choices=[s.value for s in StatsSource],
+        default=[s.value for s in StatsSource],
+    )
+    parser.add_argument("--db_user_name", required=True)
+    parser.add_argument("--db_password", required=True)
+    parser.add_argument("--db_host_and_port", required=True)
+    parser.add_argument("--db_name", required=True)
+    parser.add_argument("--github_token", required=False, default="")
+    parser.add_argument("--package_cloud_api_token", required=False, default="")
+    parser.add_argument("--package_cloud_admin_api_token", required=False, default="")
+    parser.add_argument(
+        "--docker_repos", nargs="+", choices=docker_repositories, default=["citus"]
+    )
+    parser.add_argument(
+        "--github_repos",
+        nargs="+",
+        choices=[r.value for r in GithubRepos],
+        default=[r.value for r in GithubRepos],
+    )
+    parser.add_argument(
+        "--package_cloud_repos",
+        nargs="+",
+        choices=[r.value for r in PackageCloudRepo],
+        default=[PackageCloudRepo.community.value, PackageCloudRepo.enterprise.value],
+    )
+    parser.add_argument(
+        "--package_cloud_concurrency",
+        type=int,
+        choices=range(1, 65),
+        required=False,
+        default=DEFAULT_CONCURRENCY,
+    )
+    parser.add_argument(
+        "--db_pool_size", type=int, required=False, default=DEFAULT_DB_POOL_SIZE
+    )
+    parser.add_argument(
+        "--db_max_overflow", type=int, required=False, default=DEFAULT_DB_MAX_OVERFLOW
+    )
+    parser.add_argument("--is_test", action="store_true")
+
+    arguments = parser.parse_args()
+
+    db_parameters = DbParams(
+        user_name=arguments.db_user_name,
+        password=arguments.db_password,
+        host_and_port=arguments.db_host_and_port,
+        db_name=arguments.db_name,
+    )
+    collector_parameters = CollectorParams(
+        github_token=arguments.github_token,
+        package_cloud_api_token=arguments.package_cloud_api_token,
+        package_cloud_admin_api_token=arguments.package_cloud_admin_api_token,
+        docker_repos=tuple(arguments.docker_repos),
+        github_repos=tuple(GithubRepos(r) for r in arguments.github_repos),
+        package_cloud_repos=tuple(
+            PackageCloudRepo(r) for r in arguments.package_cloud_repos
+        ),
+        package_cloud_concurrency=arguments.package_cloud_concurrency,
+    )
+    collections = collection_tasks(
+        [StatsSource(s) for s in arguments.sources],
+        db_parameters,
+        collector_parameters,
+        is_test=arguments.is_test,
+    )
+
+    configure_db_pool(
+        DbPoolParams(
+            pool_size=arguments.db_pool_size, max_overflow=arguments.db_max_overflow
+        )
+    )
+    # Concurrent packagecloud requests of all the repos should be able to keep their connections alive in the pool
+    configure_http_session(
+        HttpSessionParams(
+            pool_size=max(
+                arguments.package_cloud_concurrency
+                * len(collector_parameters.package_cloud_repos),
+                DEFAULT_HTTP_POOL_SIZE,
+            )
+        )
+    )
+    migrate_stats_db(db_parameters, is_test=arguments.is_test)
+
+    run_start = time.perf_counter()
+    collection_results = run_collections(collections)
+    # Rollups are updated after the collections, so that they include all the rows saved by the collections
+    if StatsSource.package_cloud.value in arguments.sources:
+        collection_results.append(
+            run_collection(
+                "package_cloud/rollup",
+                partial(
+                    rollup_package_cloud_downloads,
+                    db_parameters,
+                    is_test=arguments.is_test,
+                ),
+            )
+        )
+    print(format_collection_report(collection_results, time.perf_counter() - run_start))
+    if not all(result.succeeded for result in collection_results):
+        sys.exit(1)
@@ -1,9 +1,12 @@
+import io
 import os
+import subprocess
 
 import pathlib2
 from dotenv import dotenv_values
 
 from .test_utils import generate_new_gpg_key
+from .. import citus_package
 from ..citus_package import (
     POSTGRES_VERSION_FILE,
     BuildType,
@@ -14,8 +17,11 @@ from ..citus_package import (
     get_build_platform,
     get_release_package_folder_name,
     get_postgres_versions,
+    run_build_container,
+    sign_packages_in_batch,
 )
 from ..common_tool_methods import (
+    PackageType,
     define_rpm_public_key_to_machine,
     delete_all_gpg_keys_by_name,
     delete_rpm_key_by_name,
@@ -25,6 +31,7 @@ from ..common_tool_methods import (
     transform_key_into_base64_str,
     verify_rpm_signature_in_dir,
 )
+from ..packaging_warning_handler import OutputValidator
 from ..upload_to_package_cloud import (
     delete_package_from_package_cloud,
     package_exists,
@@ -36,6 +43,7 @@ TEST_BASE_PATH = os.getenv("BASE_PATH", default=pathlib2.Path(__file__).parents[
 PACKAGING_SOURCE_FOLDER = "packaging_test"
 PACKAGING_EXEC_FOLDER = f"{TEST_BASE_PATH}/{PACKAGING_SOURCE_FOLDER}"
 BASE_OUTPUT_FOLDER = f"{PACKAGING_EXEC_FOLDER}/packages"
+PACKAGING_IGNORE_FILE = f"{TEST_BASE_PATH}/packaging_automation/tests/files/packaging_warning/packaging_ignore.yml"
 
 single_postgres_package_counts = {
     "el/7": 2,
@@ -231,3 +239,58 @@ def test_upload_to_package_cloud():
             print(
                 f"{os.path.basename(return_value.file_name)} can not be deleted. Message: {delete_output.message}"
             )
+
+
+def test_run_build_container_validates_only_standard_output():
+    output_file = io.StringIO()
+    output_validator = OutputValidator(PACKAGING_IGNORE_FILE, PackageType.deb)
+
+    return_code, build_errors = run_build_container(
+        "sh -c 'echo building; echo \"warning: not validated\" 1>&2; exit 2'",
+        "not-started-container",
+        output_file,
+        output_validator,
+    )
+
+    assert return_code == 2
+    assert build_errors == "warning: not validated\n"
+    assert sorted(output_file.getvalue().splitlines()) == [
+        "building",
+        "warning: not validated",
+    ]
+    assert not output_validator.has_warnings_to_be_raised()
+
+
+def test_sign_packages_in_batch_validates_only_rpm_signer_output(tmp_path, monkeypatch):
+    for sub_folder, package_file in (
+        ("el-8", "citus.rpm"),
+        ("debian-bullseye", "citus.deb"),
+    ):
+        (tmp_path / sub_folder).mkdir()
+        (tmp_path / sub_folder / package_file).write_text("package")
+    signer_calls = []
+
+    def run_signer(command, **kwargs):
+        signer_calls.append((command[-1], kwargs["stderr"]))
+        # Warnings of the rpm signer on the standard error are not in the validated output
+        return subprocess.CompletedProcess(
+            command, 0, stdout="Signed\n", stderr="warning: not validated\n"
+        )
+
+    monkeypatch.setattr(citus_package.subprocess, "run", run_signer)
+
+    signing_results = sign_packages_in_batch(
+        ["el-8", "debian-bullseye"],
+        SigningCredentials("secret-key", "passphrase"),
+        InputOutputParameters.build(
+            os.path.dirname(PACKAGING_IGNORE_FILE),
+            str(tmp_path),
+            output_validation=True,
+        ),
+    )
+
+    assert signer_calls == [
+        ("citusdata/packaging:rpmsigner", subprocess.PIPE),
+        ("citusdata/packaging:debsigner", subprocess.STDOUT),
+    ]
+    assert len(signing_results) == 2
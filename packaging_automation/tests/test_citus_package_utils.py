@@ -14,6 +14,9 @@ from ..citus_package import (
     BuildType,
     sign_packages,
     SigningCredentials,
+    SigningResult,
+    format_signing_report,
+    signed_file_durations,
     InputOutputParameters,
     get_package_version_without_release_stage_from_pkgvars,
     write_postgres_versions_into_file,
@@ -28,6 +31,7 @@ from ..common_tool_methods import (
     get_private_key_by_fingerprint_with_passphrase,
     verify_rpm_signature_in_dir,
     transform_key_into_base64_str,
+    PackageType,
 )
 
 TEST_BASE_PATH = os.getenv("BASE_PATH", default=pathlib2.Path(__file__).parents[2])
@@ -180,6 +184,35 @@ def test_build_package_rpm():
     )
 
 
+def test_signed_file_durations(tmp_path):
+    for file_name, modification_time in (
+        ("citus_13.rpm", 112),
+        ("citus_14.rpm", 105),
+        ("citus_15.rpm", 115),
+    ):
+        (tmp_path / file_name).write_text(file_name)
+        os.utime(tmp_path / file_name, (modification_time, modification_time))
+    file_paths = [str(file_path) for file_path in tmp_path.iterdir()]
+
+    file_durations = signed_file_durations(file_paths, start_time=100)
+
+    assert list(file_durations.values()) == [5, 7, 3]
+    assert format_signing_report(
+        [
+            SigningResult(
+                package_type=PackageType.rpm,
+                duration_seconds=16,
+                file_durations=file_durations,
+            )
+        ]
+    ).splitlines() == [
+        "3 rpm files are signed in 16.0 s (5.3 s per file)",
+        f"  {tmp_path}/citus_14.rpm: 5.0 s",
+        f"  {tmp_path}/citus_13.rpm: 7.0 s",
+        f"  {tmp_path}/citus_15.rpm: 3.0 s",
+    ]
+
+
 def test_sign_packages():
     delete_all_gpg_keys_by_name(TEST_GPG_KEY_NAME)
     delete_rpm_key_by_name(TEST_GPG_KEY_NAME)
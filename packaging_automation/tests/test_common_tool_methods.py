@@ -1,16 +1,26 @@
 import os
+import time
 import uuid
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from functools import partial
 from shutil import copyfile
 
 import pathlib2
+import pytest
+import requests
 from github import Github
 
 from .test_utils import generate_new_gpg_key
+from .. import common_tool_methods
 from ..common_tool_methods import (
     DEFAULT_ENCODING_FOR_FILE_HANDLING,
     DEFAULT_UNICODE_ERROR_HANDLER,
+    BackgroundIterator,
+    HttpSessionParams,
+    RateLimiter,
     append_line_in_file,
+    configure_http_session,
     define_rpm_public_key_to_machine,
     delete_all_gpg_keys_by_name,
     delete_rpm_key_by_name,
@@ -28,9 +38,11 @@ from ..common_tool_methods import (
     get_supported_postgres_nightly_versions,
     get_upcoming_minor_version,
     get_version_details,
+    http_session,
     is_major_release,
     is_tag_on_branch,
     local_branch_exists,
+    normalize_endpoint,
     prepend_line_in_file,
     process_template_file,
     remote_branch_exists,
@@ -40,8 +52,11 @@ from ..common_tool_methods import (
     rpm_key_matches_summary,
     run,
     run_with_output,
+    stat_get_request,
     str_array_to_str,
+    throttle_backoff_seconds,
 )
+from ..dbconfig import RequestType
 
 GITHUB_TOKEN = os.getenv("GH_TOKEN")
 BASE_PATH = pathlib2.Path(__file__).parents[1]
@@ -53,6 +68,123 @@ def test_find_nth_occurrence_position():
     assert find_nth_occurrence_position("foofoo foofoo", "foofoo", 2) == 7
 
 
+def test_http_session():
+    configure_http_session(HttpSessionParams(pool_size=20, retry_count=2))
+    session = http_session()
+    assert session is http_session()
+    adapter = session.get_adapter("https://packagecloud.io")
+    assert adapter.max_retries.total == 2
+    assert adapter.poolmanager.connection_pool_kw["maxsize"] == 20
+    configure_http_session(HttpSessionParams())
+    assert http_session() is not session
+
+
+def test_normalize_endpoint():
+    assert (
+        normalize_endpoint(
+            "https://token:@packagecloud.io/api/v1/repos/citusdata/community/packages.json?per_page=100&page=2"
+        )
+        == "packagecloud.io/api/v1/repos/citusdata/community/packages.json"
+    )
+    assert normalize_endpoint("http://localhost:8080/stats") == "localhost:8080/stats"
+    # Addresses of different packages are the same endpoint
+    package_detail_addresses = [
+        "https://token:@packagecloud.io/api/v1/repos/citusdata/community/package/deb/debian/bookworm/"
+        "postgresql-15-citus-12.1/amd64/12.1.0.citus-1/stats/downloads/detail.json?per_page=100&page=1",
+        "https://token:@packagecloud.io/api/v1/repos/citusdata/community/package/rpm/el/8/citus121_16/x86_64/"
+        "12.1.0.citus/1.el8/stats/downloads/detail.json?per_page=100&page=3",
+    ]
+    assert {normalize_endpoint(address) for address in package_detail_addresses} == {
+        "packagecloud.io/api/v1/repos/citusdata/community/package/{package}/stats/downloads/detail.json"
+    }
+    assert (
+        normalize_endpoint(
+            "https://token:@packagecloud.io/api/v1/repos/citusdata/enterprise/package/deb/ubuntu/jammy/"
+            "citus-enterprise/amd64/12.1.0/stats/downloads/series/daily.json"
+        )
+        == "packagecloud.io/api/v1/repos/citusdata/enterprise/package/{package}/stats/downloads/series/daily.json"
+    )
+
+
+def test_rate_limiter():
+    rate_limiter = RateLimiter(max_rate=4, min_rate=1, rate_increase_step=1)
+    rate_limiter.on_throttled(0)
+    rate_limiter.on_throttled(0)
+    assert rate_limiter.rate == 1
+    rate_limiter.on_success()
+    assert rate_limiter.rate == 2
+    start = time.monotonic()
+    for _ in range(3):
+        rate_limiter.acquire()
+    # tokens are emptied after throttling, so three requests with the rate of 2 requests/sec should take ~1.5 secs
+    assert 1.2 < time.monotonic() - start < 3
+
+
+def test_throttle_backoff_seconds():
+    throttled_response = requests.Response()
+    throttled_response.headers["Retry-After"] = "7"
+    assert throttle_backoff_seconds(throttled_response, 3) == 7
+    assert 4 <= throttle_backoff_seconds(requests.Response(), 2) <= 6
+
+
+class ListRequestLogWriter:
+    def __init__(self):
+        self.request_logs = []
+
+    def add(self, request_log):
+        self.request_logs.append(request_log)
+
+
+def test_stat_get_request_raises_unexpected_errors(monkeypatch):
+    def failing_get(request_address, stream):
+        raise RuntimeError(f"Rate limiter failed for {request_address}")
+
+    monkeypatch.setattr(common_tool_methods, "rate_limited_get", failing_get)
+    request_log_writer = ListRequestLogWriter()
+    with pytest.raises(RuntimeError):
+        stat_get_request(
+            "https://packagecloud.io/api/v1/repos",
+            RequestType.package_cloud_list_package,
+            None,
+            request_log_writer,
+        )
+    assert request_log_writer.request_logs[0].status_code == -1
+
+
+def test_background_iterator():
+    def numbers(count: int):
+        for number in range(count):
+            yield number
+        if count == 10:
+            raise ValueError("End of numbers")
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        number_iterator = BackgroundIterator(executor, max_buffered_items=2)
+        for count in (3, 5):
+            number_iterator.submit(partial(numbers, count))
+        items = list(number_iterator)
+        assert sorted(
+            item for iterable_index, item in items if iterable_index == 0
+        ) == [
+            0,
+            1,
+            2,
+        ]
+        assert len(items) == 8
+
+        failing_iterator = BackgroundIterator(executor, max_buffered_items=2)
+        failing_iterator.submit(partial(numbers, 10))
+        try:
+            list(failing_iterator)
+            assert False, "Exception of the producer should be raised"
+        except ValueError as e:
+            assert str(e) == "End of numbers"
+        # Cancelled producer should not block the executor shutdown although its queue is full
+        cancelled_iterator = BackgroundIterator(executor, max_buffered_items=2)
+        cancelled_iterator.submit(partial(numbers, 10))
+        cancelled_iterator.cancel()
+
+
 def test_find_nth_matching_line_number_by_regex():
     assert (
         find_nth_matching_line_and_line_number(
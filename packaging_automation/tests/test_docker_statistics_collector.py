@@ -6,6 +6,7 @@ from sqlalchemy.orm import sessionmaker
 
 from ..dbconfig import Base, db_connection_string, DbParams
 from ..docker_statistics_collector import fetch_and_store_docker_statistics, DockerStats
+from ..migrate_stats_db import migrate_stats_db
 
 DB_USER_NAME = os.getenv("DB_USER_NAME")
 DB_PASSWORD = os.getenv("DB_PASSWORD")
@@ -28,6 +29,7 @@ def test_docker_statistics_collector():
     conn.execute(sql)
     conn.commit()
     conn.close()
+    migrate_stats_db(db_params, is_test=True)
     Session = sessionmaker(db)
     session = Session()
     fetch_and_store_docker_statistics(
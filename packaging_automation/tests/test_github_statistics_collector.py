@@ -5,12 +5,15 @@ from sqlalchemy import text, create_engine
 
 from ..dbconfig import db_connection_string, DbParams, db_session
 from ..github_statistics_collector import (
+    fetch_and_store_all_github_stats,
     fetch_and_store_github_stats,
+    GithubRepos,
     GithubCloneStatsTransactionsDetail,
     GithubCloneStatsTransactionsMain,
     GithubCloneStats,
     GitHubReleases,
 )
+from ..migrate_stats_db import migrate_stats_db
 
 DB_USER_NAME = os.getenv("DB_USER_NAME")
 DB_PASSWORD = os.getenv("DB_PASSWORD")
@@ -38,10 +41,12 @@ def test_github_stats_collector():
         text(f"DROP TABLE IF EXISTS {GithubCloneStatsTransactionsMain.__tablename__}")
     )
     conn.execute(text(f"DROP TABLE IF EXISTS {GithubCloneStats.__tablename__}"))
+    conn.execute(text(f"DROP TABLE IF EXISTS {GitHubReleases.__tablename__}"))
 
     conn.commit()
 
     conn.close()
+    migrate_stats_db(db_params, is_test=True)
 
     fetch_and_store_github_stats(
         organization_name=ORGANIZATION_NAME,
@@ -86,3 +91,31 @@ def test_github_stats_collector():
     release_records = session.query(GitHubReleases).filter_by(tag_name="v10.0.3").all()
 
     assert len(release_records) > 0
+    release_count = session.query(GitHubReleases).count()
+
+    fetch_and_store_all_github_stats(
+        organization_name=ORGANIZATION_NAME,
+        github_token=GH_TOKEN,
+        db_parameters=db_params,
+        is_test=True,
+    )
+    session.expire_all()
+    for repo in GithubRepos:
+        assert session.query(GithubCloneStats).filter_by(repo_name=repo.value).count()
+        assert session.query(GitHubReleases).filter_by(repo_name=repo.value).count()
+    # releases of citus are not saved again
+    assert (
+        session.query(GitHubReleases).filter_by(repo_name=REPO_NAME).count()
+        == release_count
+    )
+
+
+def test_fetch_and_store_all_github_stats_without_repos():
+    # Nothing is fetched, so the database and the token are not used
+    fetch_and_store_all_github_stats(
+        organization_name=ORGANIZATION_NAME,
+        github_token="",
+        db_parameters=DbParams(user_name="", password="", host_and_port="", db_name=""),
+        is_test=True,
+        repo_names=[],
+    )
@@ -4,6 +4,7 @@ from sqlalchemy import text, create_engine
 
 from ..dbconfig import db_session, DbParams, db_connection_string
 from ..homebrew_statistics_collector import fetch_and_save_homebrew_stats, HomebrewStats
+from ..migrate_stats_db import migrate_stats_db
 
 DB_USER_NAME = os.getenv("DB_USER_NAME")
 DB_PASSWORD = os.getenv("DB_PASSWORD")
@@ -24,6 +25,7 @@ def test_fetch_and_save_homebrew_stats():
     conn.execute(text(f"DROP TABLE IF EXISTS {HomebrewStats.__tablename__}"))
     conn.commit()
     conn.close()
+    migrate_stats_db(db_parameters, is_test=True)
 
     session = db_session(db_params=db_parameters, is_test=True)
 
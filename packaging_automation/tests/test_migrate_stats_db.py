@@ -0,0 +1,153 @@
+import os
+from datetime import date, datetime
+
+from sqlalchemy import create_engine, text
+
+from ..dbconfig import DbParams, db_connection_string, db_session
+from ..migrate_stats_db import (
+    DOWNLOAD_DATE_RANGE_CHECK,
+    PARTITION_KEY_INDEX,
+    UNPARTITIONED_DOWNLOAD_DETAILS_TABLE,
+    download_details_partition_name,
+    is_partitioned,
+    migrate_stats_db,
+    month_start,
+)
+from ..package_cloud_statistics_collector import (
+    PackageCloudDownloadDetails,
+    PackageCloudDownloadStats,
+    PackageCloudRepo,
+)
+
+DB_USER_NAME = os.getenv("DB_USER_NAME")
+DB_PASSWORD = os.getenv("DB_PASSWORD")
+DB_HOST_AND_PORT = os.getenv("DB_HOST_AND_PORT")
+DB_NAME = os.getenv("DB_NAME")
+
+db_parameters = DbParams(
+    user_name=DB_USER_NAME,
+    password=DB_PASSWORD,
+    host_and_port=DB_HOST_AND_PORT,
+    db_name=DB_NAME,
+)
+
+
+def download_detail(download_date: date) -> PackageCloudDownloadDetails:
+    return PackageCloudDownloadDetails(
+        fetch_date=datetime.now(),
+        repo=PackageCloudRepo.community,
+        package_name="citus",
+        package_full_name="citus_12.0.0_amd64.deb",
+        package_version="12.0.0",
+        distro_version="debian/bookworm",
+        epoch="0",
+        package_type="deb",
+        downloaded_at=datetime.combine(download_date, datetime.min.time()),
+        download_date=download_date,
+    )
+
+
+def test_month_start():
+    assert month_start(date(2023, 12, 15)) == date(2023, 12, 1)
+    assert month_start(date(2023, 12, 15), month_shift=1) == date(2024, 1, 1)
+    assert month_start(date(2024, 1, 31), month_shift=-1) == date(2023, 12, 1)
+
+
+def test_migrate_stats_db_builds_new_indexes_of_existing_tables():
+    migrate_stats_db(db_parameters, is_test=True)
+    db = create_engine(db_connection_string(db_params=db_parameters, is_test=True))
+    index_name = "ix_package_cloud_download_stats_package"
+    with db.connect() as conn:
+        # Index is introduced after the table was created
+        conn.execute(text(f"DROP INDEX {index_name}"))
+        conn.commit()
+
+    migrate_stats_db(db_parameters, is_test=True)
+
+    with db.connect() as conn:
+        index_definition = conn.execute(
+            text(
+                "SELECT pg_get_indexdef(indexrelid) FROM pg_index "
+                "WHERE indexrelid = to_regclass(:index_name) AND indisvalid"
+            ),
+            {"index_name": index_name},
+        ).scalar()
+    assert index_definition.startswith(
+        f"CREATE INDEX {index_name} ON public.{PackageCloudDownloadStats.__tablename__}"
+    )
+    db.dispose()
+
+
+def test_migrate_stats_db_with_partitioned_download_details():
+    db = create_engine(db_connection_string(db_params=db_parameters, is_test=True))
+    with db.connect() as conn:
+        conn.execute(
+            text(f"DROP TABLE IF EXISTS {PackageCloudDownloadDetails.__tablename__}")
+        )
+        conn.commit()
+    migrate_stats_db(db_parameters, is_test=True)
+
+    session = db_session(db_params=db_parameters, is_test=True)
+    session.add(download_detail(date(2020, 1, 15)))
+    session.commit()
+
+    migrate_stats_db(db_parameters, is_test=True, partition_download_details=True)
+    # partitions already exist in the second run
+    migrate_stats_db(
+        db_parameters,
+        is_test=True,
+        partition_download_details=True,
+        partition_months_ahead=2,
+    )
+
+    next_month = month_start(date.today(), month_shift=1)
+    later_month = month_start(date.today(), month_shift=4)
+    session.add(download_detail(next_month))
+    # Saved into the default partition, since the partition of its month is not created yet
+    session.add(download_detail(later_month))
+    session.commit()
+    # Row in the default partition is moved into the created partition of its month
+    migrate_stats_db(
+        db_parameters,
+        is_test=True,
+        partition_download_details=True,
+        partition_months_ahead=4,
+    )
+
+    with db.connect() as conn:
+        assert is_partitioned(conn, PackageCloudDownloadDetails.__tablename__)
+        partition_counts = dict(
+            conn.execute(
+                text(
+                    f"SELECT tableoid::regclass::text, count(*) FROM {PackageCloudDownloadDetails.__tablename__} "
+                    f"GROUP BY 1"
+                )
+            ).all()
+        )
+        # Range check is only needed while attaching the old table
+        check_constraint_count = conn.execute(
+            text("SELECT count(*) FROM pg_constraint WHERE conname = :constraint_name"),
+            {"constraint_name": DOWNLOAD_DATE_RANGE_CHECK},
+        ).scalar()
+        # Primary key of the old table is added using the index built concurrently before the conversion
+        unpartitioned_primary_key = conn.execute(
+            text(
+                "SELECT pg_get_constraintdef(oid) FROM pg_constraint "
+                "WHERE conrelid = to_regclass(:table_name) AND contype = 'p'"
+            ),
+            {"table_name": UNPARTITIONED_DOWNLOAD_DETAILS_TABLE},
+        ).scalar()
+        partition_key_index_count = conn.execute(
+            text("SELECT count(*) FROM pg_class WHERE relname LIKE :index_name"),
+            {"index_name": f"{PARTITION_KEY_INDEX}%"},
+        ).scalar()
+    assert partition_counts == {
+        UNPARTITIONED_DOWNLOAD_DETAILS_TABLE: 1,
+        download_details_partition_name(next_month): 1,
+        download_details_partition_name(later_month): 1,
+    }
+    assert check_constraint_count == 0
+    assert unpartitioned_primary_key == "PRIMARY KEY (id, download_date)"
+    assert partition_key_index_count == 0
+    session.close()
+    db.dispose()
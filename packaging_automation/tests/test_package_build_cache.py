@@ -0,0 +1,56 @@
+import os
+import time
+
+from ..package_build_cache import (
+    artifact_snapshot,
+    build_cache_key,
+    restore_build_artifacts,
+    save_build_artifacts,
+)
+
+
+def write_file(file_path: str, content: str):
+    with open(file_path, "w", encoding="utf8") as writer:
+        writer.write(content)
+
+
+def test_build_cache_key(tmp_path):
+    input_files_dir = tmp_path / "input"
+    (input_files_dir / ".git").mkdir(parents=True)
+    write_file(f"{input_files_dir}/pkgvars", "pkgname=citus\n")
+    write_file(f"{input_files_dir}/.git/FETCH_HEAD", "1")
+
+    key = build_cache_key(str(input_files_dir), "release", "15", "sha256:1")
+    assert key == build_cache_key(str(input_files_dir), "release", "15", "sha256:1")
+    assert key != build_cache_key(str(input_files_dir), "nightly", "15", "sha256:1")
+    assert key != build_cache_key(str(input_files_dir), "release", "16", "sha256:1")
+    assert key != build_cache_key(str(input_files_dir), "release", "15", "sha256:2")
+
+    # Git metadata of the packaging checkout does not change the packages
+    write_file(f"{input_files_dir}/.git/FETCH_HEAD", "2")
+    assert key == build_cache_key(str(input_files_dir), "release", "15", "sha256:1")
+    write_file(f"{input_files_dir}/pkgvars", "pkgname=citus-enterprise\n")
+    assert key != build_cache_key(str(input_files_dir), "release", "15", "sha256:1")
+
+
+def test_save_and_restore_build_artifacts(tmp_path):
+    cache_dir = f"{tmp_path}/cache"
+    output_dir = tmp_path / "output"
+    output_dir.mkdir()
+    write_file(f"{output_dir}/citus_11.deb", "pg 14")
+    artifacts_before_build = artifact_snapshot(str(output_dir))
+
+    time.sleep(0.01)
+    write_file(f"{output_dir}/citus_12.deb", "pg 15")
+    write_file(f"{output_dir}/build.log", "log")
+    assert not restore_build_artifacts(cache_dir, "key", str(output_dir))
+    # Only the packages created by the build are cached
+    assert (
+        save_build_artifacts(cache_dir, "key", str(output_dir), artifacts_before_build)
+        == 1
+    )
+    assert os.listdir(f"{cache_dir}/key") == ["citus_12.deb"]
+
+    restored_output_dir = tmp_path / "restored"
+    assert restore_build_artifacts(cache_dir, "key", str(restored_output_dir))
+    assert os.listdir(restored_output_dir) == ["citus_12.deb"]
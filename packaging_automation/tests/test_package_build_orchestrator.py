@@ -0,0 +1,207 @@
+import argparse
+import os
+
+import pytest
+
+from .. import package_build_orchestrator
+from ..citus_package import BuildType, InputOutputParameters, SigningCredentials
+from ..package_build_orchestrator import (
+    BuildJob,
+    BuildJobResult,
+    build_platforms,
+    default_job_limit,
+    format_build_summary,
+    move_directory_contents,
+    plan_build_jobs,
+    positive_int,
+    run_build_job,
+)
+
+INPUT_FILES_DIR = (
+    f"{os.getcwd()}/packaging_automation/tests/files/get_postgres_versions_tests"
+)
+
+
+def test_default_job_limit(tmp_path, monkeypatch):
+    meminfo_path = tmp_path / "meminfo"
+    # 20 GB
+    meminfo_path.write_text(
+        "MemTotal:       65536000 kB\nMemAvailable:   20971520 kB\n"
+    )
+    monkeypatch.setattr(package_build_orchestrator, "MEMINFO_PATH", str(meminfo_path))
+    monkeypatch.setattr(os, "cpu_count", lambda: 16)
+
+    # cpu bound
+    assert default_job_limit(cpus_per_build=4, memory_per_build_gb=2) == 4
+    # memory bound
+    assert default_job_limit(cpus_per_build=2, memory_per_build_gb=4) == 5
+    # At least one build runs even if a build needs more resources than the host has
+    assert default_job_limit(cpus_per_build=32, memory_per_build_gb=64) == 1
+
+    # Only the cpus are used if the available memory is not known
+    monkeypatch.setattr(
+        package_build_orchestrator, "MEMINFO_PATH", str(tmp_path / "missing")
+    )
+    assert default_job_limit(cpus_per_build=2, memory_per_build_gb=4) == 8
+    monkeypatch.setattr(os, "cpu_count", lambda: None)
+    assert default_job_limit(cpus_per_build=2, memory_per_build_gb=4) == 1
+
+
+def test_positive_int():
+    assert positive_int("3") == 3
+    with pytest.raises(argparse.ArgumentTypeError):
+        positive_int("0")
+    with pytest.raises(argparse.ArgumentTypeError):
+        positive_int("-1")
+
+
+def test_plan_build_jobs(tmp_path):
+    jobs = plan_build_jobs(
+        ["el/7", "debian/bullseye"],
+        BuildType.nightly,
+        INPUT_FILES_DIR,
+        str(tmp_path),
+    )
+
+    assert [(job.output_sub_folder, job.postgres_version) for job in jobs] == [
+        ("el-7", "14"),
+        ("el-7", "15"),
+        ("debian-bullseye", "all"),
+    ]
+    assert jobs[0].docker_image_name == "centos-7"
+    assert jobs[2].docker_image_name == "debian-bullseye"
+    # Each platform has its own versions file, so that parallel builds do not share the file of the input directory
+    assert not os.path.exists(f"{INPUT_FILES_DIR}/supported-postgres")
+    with open(jobs[0].postgres_versions_file, encoding="utf8") as reader:
+        assert reader.read() == "release_versions=13,14\nnightly_versions=14,15\n"
+    assert jobs[0].postgres_versions_file != jobs[2].postgres_versions_file
+
+
+def test_format_build_summary():
+    job = BuildJob(
+        platform="el/7",
+        postgres_version="14",
+        docker_image_name="centos-7",
+        output_sub_folder="el-7",
+    )
+    summary = format_build_summary(
+        [
+            BuildJobResult(
+                job=job, duration_seconds=61.2, log_path="/logs/el-7-14.log"
+            ),
+            BuildJobResult(
+                job=job,
+                duration_seconds=3,
+                log_path="/logs/el-7-14.log",
+                error="ValueError()",
+            ),
+        ]
+    )
+
+    assert summary.splitlines() == [
+        "Build    Status  Duration  Log",
+        "el-7-14  ok      61 s      /logs/el-7-14.log",
+        "el-7-14  failed  3 s       /logs/el-7-14.log",
+    ]
+
+
+def test_move_directory_contents(tmp_path):
+    job_output_dir = tmp_path / ".el-7-14"
+    job_output_dir.mkdir()
+    (job_output_dir / "citus_14.rpm").write_text("new")
+    platform_output_dir = tmp_path / "el-7"
+    platform_output_dir.mkdir()
+    (platform_output_dir / "citus_14.rpm").write_text("old")
+    (platform_output_dir / "citus_15.rpm").write_text("pg 15")
+
+    move_directory_contents(str(job_output_dir), str(platform_output_dir))
+
+    assert not job_output_dir.exists()
+    assert sorted(os.listdir(platform_output_dir)) == ["citus_14.rpm", "citus_15.rpm"]
+    assert (platform_output_dir / "citus_14.rpm").read_text() == "new"
+
+
+def test_run_build_job_removes_output_of_failed_build(tmp_path, monkeypatch):
+    # pylint: disable=unused-argument
+    def failing_build_package(
+        github_token,
+        build_type,
+        docker_platform,
+        postgres_version,
+        input_output_parameters,
+        *args,
+        **kwargs,
+    ):
+        os.makedirs(input_output_parameters.output_dir)
+        with open(
+            f"{input_output_parameters.output_dir}/citus_14.rpm", "w", encoding="utf8"
+        ) as writer:
+            writer.write("partial")
+        raise SystemExit("Output has warnings")
+
+    monkeypatch.setattr(
+        package_build_orchestrator, "build_package", failing_build_package
+    )
+    job = BuildJob(
+        platform="el/7",
+        postgres_version="14",
+        docker_image_name="centos-7",
+        output_sub_folder="el-7",
+    )
+
+    result = run_build_job(
+        job,
+        "token",
+        BuildType.nightly,
+        InputOutputParameters.build(INPUT_FILES_DIR, str(tmp_path / "output")),
+        str(tmp_path / "logs"),
+        is_test=True,
+    )
+
+    assert not result.succeeded
+    assert not (tmp_path / "output" / ".el-7-14").exists()
+
+
+def test_build_platforms_keeps_versions_files_out_of_log_dir(tmp_path, monkeypatch):
+    output_dir = tmp_path / "output"
+    log_dir = tmp_path / "logs"
+    versions_files = []
+
+    # pylint: disable=unused-argument
+    def run_build_jobs(jobs, *args):
+        for job in jobs:
+            assert os.path.isfile(job.postgres_versions_file)
+            versions_files.append(job.postgres_versions_file)
+        return [
+            BuildJobResult(
+                job=job, duration_seconds=1, log_path=f"{log_dir}/{job.name}.log"
+            )
+            for job in jobs
+        ]
+
+    monkeypatch.setattr(package_build_orchestrator, "run_build_jobs", run_build_jobs)
+    monkeypatch.setattr(
+        package_build_orchestrator, "get_signing_credentials", SigningCredentials
+    )
+    monkeypatch.setattr(
+        package_build_orchestrator, "sign_packages_in_batch", lambda *args: []
+    )
+
+    build_platforms(
+        "token",
+        ["el/7"],
+        BuildType.nightly,
+        SigningCredentials("secret-key", "passphrase"),
+        InputOutputParameters.build(INPUT_FILES_DIR, str(output_dir)),
+        job_limit=1,
+        log_dir=str(log_dir),
+    )
+
+    assert len(versions_files) == 2
+    assert all(
+        os.path.dirname(os.path.dirname(versions_file)) == str(output_dir)
+        for versions_file in versions_files
+    )
+    # Versions files are removed after the builds
+    assert os.listdir(output_dir) == []
+    assert not log_dir.exists() or os.listdir(log_dir) == []
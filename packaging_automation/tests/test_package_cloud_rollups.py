@@ -0,0 +1,155 @@
+import os
+from datetime import date, datetime
+
+from sqlalchemy import create_engine, text
+
+from ..dbconfig import DbParams, db_connection_string, db_session
+from ..migrate_stats_db import migrate_stats_db
+from ..package_cloud_rollups import (
+    PackageCloudDailyDownloads,
+    PackageCloudRollupWatermark,
+    PackageCloudWeeklyDownloads,
+    rollup_package_cloud_downloads,
+    week_start,
+)
+from ..package_cloud_statistics_collector import (
+    PackageCloudDownloadDetails,
+    PackageCloudDownloadStats,
+    PackageCloudRepo,
+)
+
+DB_USER_NAME = os.getenv("DB_USER_NAME")
+DB_PASSWORD = os.getenv("DB_PASSWORD")
+DB_HOST_AND_PORT = os.getenv("DB_HOST_AND_PORT")
+DB_NAME = os.getenv("DB_NAME")
+
+db_parameters = DbParams(
+    user_name=DB_USER_NAME,
+    password=DB_PASSWORD,
+    host_and_port=DB_HOST_AND_PORT,
+    db_name=DB_NAME,
+)
+
+PACKAGE_FIELDS = {
+    "repo": PackageCloudRepo.community,
+    "package_name": "citus",
+    "package_version": "12.0.0",
+    "distro_version": "debian/bookworm",
+    "epoch": "0",
+    "package_type": "deb",
+}
+
+
+def download_stat(
+    package_full_name: str, download_date: date, download_count: int
+) -> PackageCloudDownloadStats:
+    return PackageCloudDownloadStats(
+        fetch_date=datetime.now(),
+        package_full_name=package_full_name,
+        download_date=download_date,
+        download_count=download_count,
+        detail_url="detail_url",
+        **PACKAGE_FIELDS,
+    )
+
+
+def download_detail(
+    download_date: date, ip_address: str
+) -> PackageCloudDownloadDetails:
+    return PackageCloudDownloadDetails(
+        fetch_date=datetime.now(),
+        package_full_name="citus_12.0.0_amd64.deb",
+        downloaded_at=datetime.combine(download_date, datetime.min.time()),
+        download_date=download_date,
+        ip_address=ip_address,
+        **PACKAGE_FIELDS,
+    )
+
+
+def test_week_start():
+    assert week_start(date(2023, 5, 7)) == date(2023, 5, 1)
+    assert week_start(date(2023, 5, 8)) == date(2023, 5, 8)
+
+
+def test_rollup_package_cloud_downloads():
+    db = create_engine(db_connection_string(db_params=db_parameters, is_test=True))
+    with db.connect() as conn:
+        for table_name in (
+            PackageCloudDownloadStats.__tablename__,
+            PackageCloudDownloadDetails.__tablename__,
+            PackageCloudDailyDownloads.__tablename__,
+            PackageCloudWeeklyDownloads.__tablename__,
+            PackageCloudRollupWatermark.__tablename__,
+        ):
+            conn.execute(text(f"DROP TABLE IF EXISTS {table_name}"))
+        conn.commit()
+    db.dispose()
+    migrate_stats_db(db_parameters, is_test=True)
+
+    monday = date(2023, 5, 1)
+    tuesday = date(2023, 5, 2)
+    session = db_session(db_params=db_parameters, is_test=True)
+    session.add_all(
+        [
+            download_stat("citus_12.0.0_amd64.deb", monday, 3),
+            download_stat("citus_12.0.0_arm64.deb", monday, 2),
+            download_stat("citus_12.0.0_amd64.deb", tuesday, 1),
+            download_detail(monday, "10.0.0.1"),
+            download_detail(monday, "10.0.0.1"),
+            download_detail(tuesday, "10.0.0.2"),
+        ]
+    )
+    session.commit()
+    rollup_package_cloud_downloads(db_parameters, is_test=True)
+
+    daily_rollups = {
+        record.download_date: (
+            record.download_count,
+            record.detail_count,
+            record.unique_ip_count,
+        )
+        for record in session.query(PackageCloudDailyDownloads)
+    }
+    assert daily_rollups == {monday: (5, 2, 1), tuesday: (1, 1, 1)}
+    weekly_rollup = session.query(PackageCloudWeeklyDownloads).one()
+    assert (
+        weekly_rollup.week_start,
+        weekly_rollup.download_count,
+        weekly_rollup.detail_count,
+        weekly_rollup.unique_ip_count,
+    ) == (monday, 6, 3, 2)
+
+    # Only the rollups of tuesday are recomputed after a detail of tuesday is saved
+    session.query(PackageCloudDailyDownloads).filter_by(download_date=monday).update(
+        {"download_count": 0}
+    )
+    session.add(download_detail(tuesday, "10.0.0.3"))
+    session.commit()
+    rollup_package_cloud_downloads(db_parameters, is_test=True)
+    session.expire_all()
+
+    assert (
+        session.get(
+            PackageCloudDailyDownloads,
+            (PackageCloudRepo.community, "citus", "12.0.0", "debian/bookworm", monday),
+        ).download_count
+        == 0
+    )
+    tuesday_rollup = session.get(
+        PackageCloudDailyDownloads,
+        (PackageCloudRepo.community, "citus", "12.0.0", "debian/bookworm", tuesday),
+    )
+    assert (tuesday_rollup.detail_count, tuesday_rollup.unique_ip_count) == (2, 2)
+    weekly_rollup = session.query(PackageCloudWeeklyDownloads).one()
+    assert (weekly_rollup.detail_count, weekly_rollup.unique_ip_count) == (4, 3)
+
+    rollup_package_cloud_downloads(db_parameters, is_test=True, rebuild=True)
+    session.expire_all()
+    assert (
+        session.get(
+            PackageCloudDailyDownloads,
+            (PackageCloudRepo.community, "citus", "12.0.0", "debian/bookworm", monday),
+        ).download_count
+        == 5
+    )
+    session.close()
@@ -1,20 +1,41 @@
 import json
 import os
+import time
+from datetime import date, datetime, timedelta
 
 from sqlalchemy import text, create_engine
 
+from ..benchmarks.package_cloud_simulator import PackageCloudSimulator, SimulatorParams
 from ..common_tool_methods import stat_get_request
 from ..dbconfig import db_session, DbParams, db_connection_string
+from ..migrate_stats_db import migrate_stats_db
 from ..package_cloud_statistics_collector import (
+    DetailQueryParams,
+    PackageCloudDownloadDetails,
+    package_count,
     fetch_and_save_package_cloud_stats,
+    has_unsaved_downloads,
     PackageCloudRepo,
     PackageCloudOrganization,
     PackageCloudDownloadStats,
+    PackageCloudDetailWatermark,
+    PackageCloudCollectionCheckpoint,
+    PackageCloudWorkItem,
     package_list_with_pagination_request_address,
     RequestType,
     is_ignored_package,
+    parse_download_date,
+    parse_download_detail_time,
     PackageCloudParams,
     ParallelExecutionParams,
+    SchedulingMode,
+    WorkItemClaimRefresher,
+    WorkItemStatus,
+    claim_work_item,
+    complete_work_item,
+    seed_work_queue,
+    shard_page_indexes,
+    work_item_key,
 )
 
 DB_USER_NAME = os.getenv("DB_USER_NAME")
@@ -49,8 +70,15 @@ def test_fetch_and_save_package_cloud_stats():
     conn.execute(
         text(f"DROP TABLE IF EXISTS {PackageCloudDownloadStats.__tablename__}")
     )
+    conn.execute(
+        text(f"DROP TABLE IF EXISTS {PackageCloudDetailWatermark.__tablename__}")
+    )
+    conn.execute(
+        text(f"DROP TABLE IF EXISTS {PackageCloudCollectionCheckpoint.__tablename__}")
+    )
     conn.commit()
     conn.close()
+    migrate_stats_db(db_parameters, is_test=True)
 
     session = db_session(db_params=db_parameters, is_test=True)
     page_record_count = 3
@@ -75,6 +103,178 @@ def test_fetch_and_save_package_cloud_stats():
     assert len(records) > 0
 
 
+def test_fetch_and_save_package_cloud_stats_with_work_queue():
+    db = create_engine(db_connection_string(db_params=db_parameters, is_test=True))
+    conn = db.connect()
+    conn.execute(
+        text(f"DROP TABLE IF EXISTS {PackageCloudDownloadStats.__tablename__}")
+    )
+    conn.execute(
+        text(f"DROP TABLE IF EXISTS {PackageCloudDetailWatermark.__tablename__}")
+    )
+    conn.execute(text(f"DROP TABLE IF EXISTS {PackageCloudWorkItem.__tablename__}"))
+    conn.commit()
+    conn.close()
+    migrate_stats_db(db_parameters, is_test=True)
+
+    session = db_session(db_params=db_parameters, is_test=True)
+    parallel_count = 2
+
+    for index in range(0, parallel_count):
+        parallel_exec_parameters = ParallelExecutionParams(
+            parallel_count=parallel_count,
+            parallel_exec_index=index,
+            page_record_count=3,
+            scheduling_mode=SchedulingMode.work_queue,
+        )
+        fetch_and_save_package_cloud_stats(
+            db_params=db_parameters,
+            package_cloud_params=PACKAGE_CLOUD_PARAMETERS,
+            parallel_execution_params=parallel_exec_parameters,
+            is_test=True,
+            save_records_with_download_count_zero=True,
+        )
+
+    work_items = session.query(PackageCloudWorkItem).all()
+    records = session.query(PackageCloudDownloadStats).all()
+
+    assert len(work_items) > 0
+    assert all(
+        work_item.status == WorkItemStatus.completed and work_item.claim_count == 1
+        for work_item in work_items
+    )
+    assert len(records) > 0
+
+
+def test_work_item_claim_refresh_and_completion():
+    db = create_engine(db_connection_string(db_params=db_parameters, is_test=True))
+    with db.connect() as conn:
+        conn.execute(text(f"DROP TABLE IF EXISTS {PackageCloudWorkItem.__tablename__}"))
+        conn.commit()
+    migrate_stats_db(db_parameters, is_test=True)
+    first_session = db_session(db_params=db_parameters, is_test=True)
+    second_session = db_session(db_params=db_parameters, is_test=True)
+    seed_work_queue(REPO, 3, 3, first_session)
+    claim_timeout = timedelta(minutes=1)
+
+    first_work_item = claim_work_item(REPO, 3, "first", first_session, claim_timeout)
+    first_session.execute(
+        text(
+            f"UPDATE {PackageCloudWorkItem.__tablename__} SET claimed_at = now() - interval '1 hour'"
+        )
+    )
+    first_session.commit()
+    with WorkItemClaimRefresher(
+        first_session.get_bind(), first_work_item, "first", timedelta(milliseconds=10)
+    ):
+        time.sleep(0.5)
+    # Claim is refreshed while the page is processed, so it is not claimed again
+    assert claim_work_item(REPO, 3, "second", second_session, claim_timeout) is None
+
+    # Claim is taken over if it is not refreshed within the claim timeout
+    second_work_item = claim_work_item(REPO, 3, "second", second_session, timedelta(0))
+    assert second_work_item.claimed_by == "second"
+
+    # First completion is kept even if the claim was taken over
+    complete_work_item(first_work_item, "first", first_session)
+    complete_work_item(second_work_item, "second", second_session)
+    completed_work_item = (
+        first_session.query(PackageCloudWorkItem)
+        .filter_by(**work_item_key(first_work_item))
+        .one()
+    )
+    assert completed_work_item.status == WorkItemStatus.completed
+    assert completed_work_item.claimed_by == "first"
+    assert completed_work_item.claim_count == 2
+
+
+def test_fetch_and_save_package_cloud_stats_with_simulator():
+    db = create_engine(db_connection_string(db_params=db_parameters, is_test=True))
+    conn = db.connect()
+    for table_name in (
+        PackageCloudDownloadStats.__tablename__,
+        PackageCloudDownloadDetails.__tablename__,
+        PackageCloudDetailWatermark.__tablename__,
+        PackageCloudCollectionCheckpoint.__tablename__,
+    ):
+        conn.execute(text(f"DROP TABLE IF EXISTS {table_name}"))
+    conn.commit()
+    conn.close()
+    migrate_stats_db(db_parameters, is_test=True)
+
+    simulator_params = SimulatorParams(
+        package_count=7, detail_count_per_package=250, series_day_count=10
+    )
+    with PackageCloudSimulator(simulator_params) as simulator:
+        package_cloud_params = PackageCloudParams(
+            admin_api_token="admin-token",
+            standard_api_token="standard-token",
+            organization=ORGANIZATION,
+            repo_name=REPO,
+            base_url=simulator.base_url,
+        )
+        for stream_pages in (True, False):
+            fetch_and_save_package_cloud_stats(
+                db_params=db_parameters,
+                package_cloud_params=package_cloud_params,
+                parallel_execution_params=ParallelExecutionParams(
+                    parallel_count=1,
+                    parallel_exec_index=0,
+                    page_record_count=3,
+                    concurrency=4,
+                ),
+                is_test=True,
+                resume_from_checkpoint=False,
+                detail_query_params=DetailQueryParams(
+                    page_record_count=100, stream_pages=stream_pages
+                ),
+            )
+        # Second run should not query the details since series of the packages do not have any new downloads
+        assert simulator.request_counts["detail"] == 7 * 3
+
+    session = db_session(db_params=db_parameters, is_test=True)
+    assert session.query(PackageCloudDownloadDetails).count() == 7 * 250
+    assert session.query(PackageCloudDownloadStats).count() == 7 * 10
+
+
+def test_package_count_with_simulator():
+    with PackageCloudSimulator(SimulatorParams(package_count=42)) as simulator:
+        assert (
+            package_count(ORGANIZATION, REPO, "standard-token", simulator.base_url)
+            == 42
+        )
+
+
+def test_shard_page_indexes():
+    parallel_exec_parameters = ParallelExecutionParams(
+        parallel_count=3, parallel_exec_index=1, page_record_count=10
+    )
+    assert shard_page_indexes(75, parallel_exec_parameters) == [2, 5, 8]
+    assert shard_page_indexes(5, parallel_exec_parameters) == []
+
+
+def test_parse_download_times():
+    assert parse_download_detail_time("2023-02-03T04:05:06.000Z") == datetime(
+        2023, 2, 3, 4, 5, 6
+    )
+    assert parse_download_date("20230203Z") == date(2023, 2, 3)
+
+
+def test_has_unsaved_downloads():
+    package_info = {
+        "name": "citus",
+        "filename": "citus_12.1.deb",
+        "distro_version": "debian/bookworm",
+    }
+    download_stats = {"value": {"20230101Z": 3, "20230102Z": 0, "20230103Z": 1}}
+    stat_keys = {
+        (date(2023, 1, 1), "citus_12.1.deb", "debian/bookworm"),
+    }
+    assert has_unsaved_downloads(package_info, download_stats, stat_keys)
+    stat_keys.add((date(2023, 1, 3), "citus_12.1.deb", "debian/bookworm"))
+    assert not has_unsaved_downloads(package_info, download_stats, stat_keys)
+
+
 def get_filtered_package_count(session) -> int:
     # Since package count for our test repo is lower than 500, we get the total package details by getting all the
     # packages in one call
@@ -1,3 +1,5 @@
+import re
+
 import pathlib2
 import pytest
 
@@ -12,6 +14,8 @@ from ..packaging_warning_handler import (
     get_warnings_to_be_raised,
     get_error_message,
     validate_output,
+    OutputValidator,
+    IgnoreMatcher,
 )
 
 TEST_BASE_PATH = pathlib2.Path(__file__).parent
@@ -205,3 +209,46 @@ def test_validate_output_rpm_success():
             f"{TEST_BASE_PATH}/files/packaging_warning/packaging_ignore.yml",
             PackageType.rpm,
         )
+
+
+def test_output_validator_stops_at_first_warning_to_be_raised():
+    with open(
+        f"{TEST_BASE_PATH}/files/packaging_warning/sample_warning_build_output_deb.txt",
+        "r",
+        encoding=DEFAULT_ENCODING_FOR_FILE_HANDLING,
+        errors=DEFAULT_UNICODE_ERROR_HANDLER,
+    ) as reader:
+        output_validator = OutputValidator(
+            f"{TEST_BASE_PATH}/files/packaging_warning/packaging_ignore.yml",
+            PackageType.deb,
+        )
+        for output_line in reader:
+            if output_validator.add_line(output_line.rstrip("\n")):
+                break
+        assert output_validator.has_warnings_to_be_raised()
+        # Rest of the output is not needed to fail the build
+        assert reader.read()
+        with pytest.raises(SystemExit):
+            output_validator.check()
+
+
+def test_ignore_matcher():
+    ignore_list = (
+        "warning: line \\d+: multiple %files for package *",
+        "(a+)-\\1 warning",
+        "(?i)configure: warning",
+    )
+    ignore_matcher = IgnoreMatcher(ignore_list)
+    # Patterns with backreferences and inline flags are not combined into a single regex
+    assert len(ignore_matcher.separate_patterns) == 2
+    for line in (
+        "warning: line 12: multiple %files for package citus",
+        "aa-aa warning",
+        "aa-a warning",
+        "sh: warning: line 12: multiple %files for package citus",
+        "CONFIGURE: WARNING",
+        "WARNING: LINE 12: MULTIPLE %FILES FOR PACKAGE CITUS",
+    ):
+        assert ignore_matcher.matches(line) == any(
+            re.match(pattern, line) for pattern in ignore_list
+        )
@@ -0,0 +1,73 @@
+import os
+from datetime import date
+
+from sqlalchemy import create_engine, text
+
+from ..dbconfig import DbParams, db_connection_string, db_session
+from ..migrate_stats_db import migrate_stats_db
+from ..pypi_stats_collector import DownloadNumbers, save_download_numbers
+
+DB_USER_NAME = os.getenv("DB_USER_NAME")
+DB_PASSWORD = os.getenv("DB_PASSWORD")
+DB_HOST_AND_PORT = os.getenv("DB_HOST_AND_PORT")
+DB_NAME = os.getenv("DB_NAME")
+
+db_parameters = DbParams(
+    user_name=DB_USER_NAME,
+    password=DB_PASSWORD,
+    host_and_port=DB_HOST_AND_PORT,
+    db_name=DB_NAME,
+)
+
+
+def test_save_download_numbers():
+    db = create_engine(db_connection_string(db_params=db_parameters, is_test=True))
+    with db.connect() as conn:
+        conn.execute(text(f"DROP TABLE IF EXISTS {DownloadNumbers.__tablename__}"))
+        conn.commit()
+        # table created before the unique index may have a record for each count of a date
+        conn.execute(
+            text(
+                f"CREATE TABLE {DownloadNumbers.__tablename__} (id SERIAL PRIMARY KEY, fetch_date DATE, "
+                f"library_name VARCHAR, download_count VARCHAR, download_date DATE)"
+            )
+        )
+        conn.execute(
+            text(
+                f"INSERT INTO {DownloadNumbers.__tablename__} (library_name, download_count, download_date) "
+                f"VALUES ('django-multitenant', '5', '2023-05-01'), ('django-multitenant', '7', '2023-05-01')"
+            )
+        )
+        conn.commit()
+    db.dispose()
+    migrate_stats_db(db_parameters, is_test=True)
+
+    session = db_session(db_params=db_parameters, is_test=True)
+    assert session.query(DownloadNumbers).one().download_count == "7"
+
+    assert save_download_numbers(
+        "django-multitenant",
+        [
+            {"category": "with_mirrors", "date": "2023-05-01", "downloads": 7},
+            {"category": "with_mirrors", "date": "2023-05-02", "downloads": 3},
+        ],
+        session,
+    ) == (1, 0)
+    assert save_download_numbers(
+        "django-multitenant",
+        [
+            {"category": "with_mirrors", "date": "2023-05-02", "downloads": 4},
+            {"category": "with_mirrors", "date": "2023-05-03", "downloads": 2},
+        ],
+        session,
+    ) == (1, 1)
+
+    download_counts = dict(
+        session.query(DownloadNumbers.download_date, DownloadNumbers.download_count)
+    )
+    assert download_counts == {
+        date(2023, 5, 1): "7",
+        date(2023, 5, 2): "4",
+        date(2023, 5, 3): "2",
+    }
+    session.close()
@@ -0,0 +1,69 @@
+import time
+
+import pytest
+
+from ..dbconfig import DbParams
+from ..statistics_collector_runner import (
+    CollectorParams,
+    StatsSource,
+    collection_tasks,
+    format_collection_report,
+    run_collections,
+)
+
+COLLECTION_SLEEP_SECONDS = 0.5
+
+DB_PARAMETERS = DbParams(
+    user_name="user", password="password", host_and_port="localhost", db_name="stats"
+)
+
+
+def failing_collection():
+    time.sleep(COLLECTION_SLEEP_SECONDS)
+    raise ValueError("Collection failed")
+
+
+def test_run_collections():
+    start = time.perf_counter()
+    results = run_collections(
+        {
+            "first": lambda: time.sleep(COLLECTION_SLEEP_SECONDS),
+            "second": lambda: time.sleep(COLLECTION_SLEEP_SECONDS),
+            "failing": failing_collection,
+        }
+    )
+    wall_time = time.perf_counter() - start
+
+    assert [result.name for result in results] == ["first", "second", "failing"]
+    assert [result.succeeded for result in results] == [True, True, False]
+    assert isinstance(results[2].error, ValueError)
+    assert all(
+        result.duration_seconds >= COLLECTION_SLEEP_SECONDS for result in results
+    )
+    # collections run concurrently, so total time is close to the slowest collection instead of the sum
+    assert wall_time < 2 * COLLECTION_SLEEP_SECONDS
+
+    report = format_collection_report(results, wall_time)
+    assert "failing" in report and "failed" in report
+    assert run_collections({}) == []
+
+
+def test_collection_tasks():
+    tasks = collection_tasks(
+        [StatsSource.docker, StatsSource.homebrew, StatsSource.package_cloud],
+        DB_PARAMETERS,
+        CollectorParams(
+            package_cloud_api_token="token", package_cloud_admin_api_token="token"
+        ),
+    )
+    assert list(tasks) == [
+        "docker/citus",
+        "homebrew",
+        "package_cloud/community",
+        "package_cloud/enterprise",
+    ]
+
+    with pytest.raises(ValueError):
+        collection_tasks([StatsSource.github], DB_PARAMETERS, CollectorParams())
+    with pytest.raises(ValueError):
+        collection_tasks([StatsSource.package_cloud], DB_PARAMETERS, CollectorParams())
@@ -6,9 +6,10 @@ from dataclasses import dataclass
 from typing import List
 
 import pathlib2
-import requests
 from requests.auth import HTTPBasicAuth
 
+from .common_tool_methods import DEFAULT_HTTP_TIMEOUT, http_session
+
 supported_distros = {
     "el/7": 140,
     "el/8": 205,
@@ -71,7 +72,9 @@ def upload_to_package_cloud(
 
         package_query_url = f"https://{package_cloud_token}:@packagecloud.io/api/v1/repos/{repo_name}/packages.json"
         print(f"Uploading package {os.path.basename(package_name)}")
-        response = requests.post(package_query_url, files=files, timeout=60)
+        response = http_session().post(
+            package_query_url, files=files, timeout=DEFAULT_HTTP_TIMEOUT
+        )
         print(f"Response from package cloud: {response.content}")
         return ReturnValue(
             response.ok,
@@ -125,7 +128,7 @@ def delete_package_from_package_cloud(
         f"{distro_name}/{distro_version}/{package_name}"
     )
 
-    response = requests.delete(delete_url, timeout=60)
+    response = http_session().delete(delete_url, timeout=DEFAULT_HTTP_TIMEOUT)
     return ReturnValue(
         response.ok, response.content, package_name, distro_name, repo_name
     )
@@ -142,8 +145,10 @@ def package_exists(
         f"https://packagecloud.io/api/v1/repos/{repo_owner}/{repo_name}/search?"
         f"q={package_name}&filter=all&dist={urllib.parse.quote(platform, safe='')}"
     )
-    response = requests.get(
-        query_url, auth=HTTPBasicAuth(package_cloud_token, ""), timeout=60
+    response = http_session().get(
+        query_url,
+        auth=HTTPBasicAuth(package_cloud_token, ""),
+        timeout=DEFAULT_HTTP_TIMEOUT,
     )
     return response.ok
 